@@ -15,11 +15,13 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 
 from .config import Config
+from .services.db_routing import RoutingSession
 
 # Create the database and JWT manager at module scope so they can be
 # imported in model and route modules without circular imports. They
-# will be bound to the application in ``create_app``.
-db = SQLAlchemy()
+# will be bound to the application in ``create_app``. The session class
+# sends GET reads to the read replica when one is configured.
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 
 
@@ -32,6 +34,46 @@ def create_app() -> Flask:
     db.init_app(app)
     jwt.init_app(app)
 
+    # WAL, busy timeout and cache pragmas on every SQLite connection
+    from .services import sqlite_tuning
+    sqlite_tuning.init_app(app, db)
+
+    # CLI: ``flask snapshot-replica`` refreshes a local SQLite replica,
+    # ``flask generate-load-data`` fills the schema for load tests
+    from .services import db_routing
+    from . import commands
+    db_routing.init_app(app)
+    commands.init_app(app)
+
+    # Password hashing and roster import process pools (started on first use)
+    from .services.passwords import password_hasher
+    from .services.roster import roster_imports
+    password_hasher.init_app(app)
+    roster_imports.init_app(app)
+
+    # ``current_user`` of JWT-protected endpoints comes from a
+    # per-process profile cache; the row is only read on a miss
+    from .models.user import User
+    from .services.identity_cache import identity_cache
+    identity_cache.init_app(app, jwt, db, User, ('username', 'email'))
+
+    # Revoked (logged-out, rotated) tokens, checked through a Bloom filter
+    from .models.revoked_token import RevokedToken
+    from .services.revocation import revocation_list
+    revocation_list.init_app(app, jwt, db, RevokedToken)
+
+    @jwt.user_lookup_error_loader
+    def user_not_found(jwt_header, jwt_data):
+        return jsonify({"error": "User not found"}), 404
+
+    # Token-bucket limits on the expensive endpoints (RATE_LIMITS)
+    from .services.rate_limit import rate_limiter
+    rate_limiter.init_app(app)
+
+    # Outbound HTTP pool shared by every blueprint
+    from .services.http_client import outbound
+    outbound.init_app(app)
+
     # Configure CORS. Here we allow credentials and only enable CORS on
     # ``/api/*`` routes. The allowed origins are read from the config.
     CORS(
@@ -60,6 +102,15 @@ def create_app() -> Flask:
     app.register_blueprint(vizyon_ai_bp, url_prefix='/api')
     app.register_blueprint(adaptive_video_bp, url_prefix='/api')
 
+    # Start the background worker pool. Job handlers are registered by
+    # the blueprints imported above, so this must come after them.
+    from .services.jobs import job_queue
+    from .services.scenario_cache import scenario_cache
+    from .services.storage import video_store
+    scenario_cache.init_app(app)
+    video_store.init_app(app)
+    job_queue.init_app(app)
+
     # A simple health check endpoint used for monitoring and automation
     @app.route('/api/health', methods=['GET'])
     def health():
@@ -77,6 +128,7 @@ if __name__ == '__main__':
     with flask_app.app_context():
         # Create database tables if they don't exist. In a real
         # deployment you would use migrations (e.g. Alembic), but
-        # ``create_all`` provides a fast and easy starting point.
-        db.create_all()
+        # ``create_all`` provides a fast and easy starting point. Only the
+        # primary is touched; a replica gets its schema from the primary.
+        db.create_all(bind_key=None)
     flask_app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -7,9 +7,23 @@ from flask import Flask, jsonify, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
+from sqlalchemy import bindparam, case, event, func, select, union, union_all, update
+from sqlalchemy.orm import object_session
+import click
 import os
+import threading
+from collections import defaultdict
 from datetime import datetime
 
+from services.conditional import conditional
+from services import activity, heatmap, sqlite_tuning
+from services.counters import ShardedCounter
+from services.leaderboard import Leaderboard
+from services.pagination import PaginationError, paginate
+from services.upsert import increment
+from services.analytics_events import InvalidEvent, clean_event
+from services.write_buffer import WriteBuffer
+
 # Flask app oluştur
 app = Flask(__name__)
 
@@ -19,8 +33,39 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///mac
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
 
+# Bağlantı havuzu (bellek içi SQLite hariç)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_tuning.engine_options(
+    app.config['SQLALCHEMY_DATABASE_URI'],
+    pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+    max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '20'))
+)
+
+# SQLite: her bağlantıda WAL (okuyucular yazımı beklemez), NORMAL sync,
+# busy_timeout ve önbellek pragma'ları. Boş değer SQLite varsayılanını bırakır
+app.config['SQLITE_JOURNAL_MODE'] = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')
+app.config['SQLITE_CACHE_SIZE'] = os.getenv('SQLITE_CACHE_SIZE', '-64000')  # negatif = KiB
+app.config['SQLITE_MMAP_SIZE'] = os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))
+
+# Analytics write-behind buffer: olaylar toplu yazılır
+app.config['ANALYTICS_BATCH_SIZE'] = int(os.getenv('ANALYTICS_BATCH_SIZE', '500'))
+app.config['ANALYTICS_FLUSH_SECONDS'] = float(os.getenv('ANALYTICS_FLUSH_SECONDS', '2'))
+app.config['ANALYTICS_BUFFER_CAPACITY'] = int(os.getenv('ANALYTICS_BUFFER_CAPACITY', '20000'))
+app.config['ANALYTICS_MAX_EVENTS_PER_REQUEST'] = int(os.getenv('ANALYTICS_MAX_EVENTS_PER_REQUEST', '500'))
+
+# İzlenme sayaçları bellekte toplanır, bu aralıkla veritabanına yazılır
+app.config['VIEW_COUNT_FLUSH_SECONDS'] = float(os.getenv('VIEW_COUNT_FLUSH_SECONDS', '5'))
+
+# Sıralama tablosu bellekte tutulur; diğer worker'ların yazımları için bu aralıkla yeniden yüklenir
+app.config['LEADERBOARD_REFRESH_SECONDS'] = float(os.getenv('LEADERBOARD_REFRESH_SECONDS', '300'))
+
+# Seri (streak) günleri bu saat dilimine göre sayılır (Türkiye: UTC+3)
+app.config['STREAK_UTC_OFFSET_HOURS'] = float(os.getenv('STREAK_UTC_OFFSET_HOURS', '3'))
+
 # Extensions
 db = SQLAlchemy(app)
+sqlite_tuning.init_app(app, db)
 jwt = JWTManager(app)
 CORS(app, supports_credentials=True, resources={r"/api/*": {"origins": "*"}})
 
@@ -50,6 +95,7 @@ class Performance(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Video(db.Model):
+    __table_args__ = (db.Index('ix_video_user_created', 'user_id', 'created_at'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     topic_id = db.Column(db.String(100))
@@ -72,6 +118,214 @@ class VideoAnalytics(db.Model):
     completed = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class UserVideoStats(db.Model):
+    """Kullanıcı bazlı video özeti - her analytics yazımında artırılır"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total_videos = db.Column(db.Integer, default=0, nullable=False)
+    sessions = db.Column(db.Integer, default=0, nullable=False)
+    total_watch_time = db.Column(db.Integer, default=0, nullable=False)
+    completed_count = db.Column(db.Integer, default=0, nullable=False)
+    # Video/VideoAnalytics yazımlarında artar; ETag bu sayıdan üretilir
+    version = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class VideoStats(db.Model):
+    """Video bazlı izleme özeti - her analytics yazımında artırılır"""
+    video_id = db.Column(db.Integer, db.ForeignKey('video.id'), primary_key=True)
+    sessions = db.Column(db.Integer, default=0, nullable=False)
+    total_watch_time = db.Column(db.Integer, default=0, nullable=False)
+    completed_count = db.Column(db.Integer, default=0, nullable=False)
+    # Saniye başına duraklatma sayısı, paketlenmiş uint32 dizisi (services.heatmap)
+    pause_heatmap = db.Column(db.LargeBinary)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class UserActivity(db.Model):
+    """Günlük aktivite bitmap'i - bit i = start_day + i. gün (services.activity)"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    start_day = db.Column(db.Integer)
+    last_day = db.Column(db.Integer)
+    bits = db.Column(db.LargeBinary)
+
+@event.listens_for(Video, 'after_insert')
+def _count_new_video(mapper, connection, video):
+    """Yeni video kullanıcının özetine aynı transaction içinde eklenir"""
+    increment(connection, UserVideoStats.__table__,
+              {'user_id': video.user_id}, {'total_videos': 1, 'version': 1})
+
+def record_video_analytics(user_id, video_id, sessions, watch_time, completed_count):
+    """Analytics kayıtlarını kullanıcı ve video özetlerine atomik olarak ekle"""
+    deltas = {
+        'sessions': sessions,
+        'total_watch_time': watch_time,
+        'completed_count': completed_count
+    }
+    increment(db.session, UserVideoStats.__table__, {'user_id': user_id}, dict(deltas, version=1))
+    increment(db.session, VideoStats.__table__, {'video_id': video_id}, deltas)
+
+def record_pause_heatmaps(pauses):
+    """Duraklatma konumlarını video histogramlarına ekle (VideoStats satırları mevcut olmalı)"""
+    durations = dict(db.session.execute(
+        select(Video.id, Video.duration_seconds).where(Video.id.in_(list(pauses)))
+    ).all())
+    for video_id, positions in pauses.items():
+        counts = heatmap.histogram(positions, heatmap.bucket_count(durations.get(video_id)))
+        if not counts.any():
+            continue
+        # Oku-birleştir-yaz aynı transaction'da; satır kilitli (SQLite zaten tek yazıcı)
+        current = db.session.execute(
+            select(VideoStats.pause_heatmap)
+            .where(VideoStats.video_id == video_id)
+            .with_for_update()
+        ).scalar()
+        db.session.execute(
+            update(VideoStats.__table__)
+            .where(VideoStats.__table__.c.video_id == video_id)
+            .values(pause_heatmap=heatmap.merge(current, counts))
+        )
+
+def today_number():
+    return activity.day_number(datetime.utcnow(), app.config['STREAK_UTC_OFFSET_HOURS'])
+
+def record_activity(executor, user_id, when=None):
+    """Öğrenme olayının gününü işaretle; yeni gün ise dashboard ETag'ini geçersiz kıl"""
+    day = activity.day_number(when or datetime.utcnow(), app.config['STREAK_UTC_OFFSET_HOURS'])
+    changed = activity.mark_active(executor, UserActivity.__table__, user_id, day)[2]
+    if changed:
+        increment(executor, UserVideoStats.__table__, {'user_id': user_id}, {'version': 1})
+
+@event.listens_for(Performance, 'after_insert')
+def _mark_learning_day(mapper, connection, performance):
+    record_activity(connection, performance.user_id, performance.created_at)
+
+def video_data_version():
+    """Kullanıcının video verisinin sürümü: tek primary key okuması (ETag için)"""
+    user_id = get_jwt_identity()
+    version = db.session.execute(
+        select(UserVideoStats.version).where(UserVideoStats.user_id == user_id)
+    ).scalar()
+    # Gün değişince seri (streak) değişebilir
+    return user_id, version or 0, today_number()
+
+# ============================================
+# ANALYTICS BUFFER
+# ============================================
+
+def analytics_row(user_id, video_id, data):
+    """İzleme olayını toplu insert için satıra çevir (zaman damgası kabul anında)
+
+    Alanlar burada tiplerine çevrilir; hatalı olay InvalidEvent ile
+    reddedilir, ortak buffer'a hiç girmez.
+    """
+    return dict(
+        clean_event(data),
+        video_id=video_id,
+        user_id=int(user_id),
+        created_at=datetime.utcnow()
+    )
+
+def unowned_video_ids(user_id, video_ids):
+    """Kullanıcıya ait olmayan (veya olmayan) video id'leri - tek sorgu"""
+    video_ids = set(video_ids)
+    owned = db.session.execute(
+        select(Video.id).where(Video.id.in_(video_ids), Video.user_id == int(user_id))
+    ).scalars().all()
+    return sorted(video_ids - set(owned))
+
+def flush_analytics(rows):
+    """Biriken olayları tek transaction'da yaz: toplu INSERT + (kullanıcı, video) başına tek özet güncellemesi"""
+    with app.app_context():
+        db.session.execute(VideoAnalytics.__table__.insert(), rows)
+        
+        totals = defaultdict(lambda: [0, 0, 0])
+        pauses = defaultdict(list)
+        for row in rows:
+            total = totals[(row['user_id'], row['video_id'])]
+            total[0] += 1
+            total[1] += row['watch_duration'] or 0
+            total[2] += 1 if row['completed'] else 0
+            if isinstance(row['pause_timestamps'], list):
+                pauses[row['video_id']].extend(row['pause_timestamps'])
+        for (user_id, video_id), (sessions, watch_time, completed_count) in totals.items():
+            record_video_analytics(user_id, video_id, sessions, watch_time, completed_count)
+        if pauses:
+            record_pause_heatmaps(pauses)
+        for row in rows:
+            if row['completed']:
+                record_activity(db.session, row['user_id'], row['created_at'])
+        db.session.commit()
+
+analytics_buffer = WriteBuffer(
+    flush_analytics,
+    max_batch=app.config['ANALYTICS_BATCH_SIZE'],
+    max_delay=app.config['ANALYTICS_FLUSH_SECONDS'],
+    capacity=app.config['ANALYTICS_BUFFER_CAPACITY'],
+    name='analytics-buffer'
+)
+
+def flush_view_counts(counts):
+    """Biriken izlenmeleri video başına tek UPDATE ile yaz (executemany)"""
+    with app.app_context():
+        stmt = update(Video.__table__)\
+            .where(Video.__table__.c.id == bindparam('video_id'))\
+            .values(view_count=Video.__table__.c.view_count + bindparam('views'))
+        db.session.execute(stmt, [
+            {'video_id': video_id, 'views': views} for video_id, views in counts.items()
+        ])
+        # Listede view_count gösterildiği için sahiplerin ETag'i de değişmeli
+        stats = UserVideoStats.__table__
+        db.session.execute(
+            update(stats)
+            .where(stats.c.user_id.in_(select(Video.user_id).where(Video.id.in_(list(counts)))))
+            .values(version=stats.c.version + 1)
+        )
+        db.session.commit()
+
+view_counter = ShardedCounter(
+    flush_view_counts,
+    interval=app.config['VIEW_COUNT_FLUSH_SECONDS'],
+    name='view-counter'
+)
+
+# ============================================
+# LEADERBOARD
+# ============================================
+
+leaderboard = Leaderboard()
+_leaderboard_lock = threading.Lock()
+
+def leaderboard_rows():
+    """Sıralama için (id, xp, exam_type) satırları"""
+    with app.app_context():
+        return db.session.execute(
+            select(User.id, User.xp, User.exam_type).execution_options(yield_per=10000)
+        ).all()
+
+def ensure_leaderboard():
+    """İlk kullanımda veritabanından yükle ve periyodik yenilemeyi başlat"""
+    if leaderboard.loaded_at is not None:
+        return
+    with _leaderboard_lock:
+        if leaderboard.loaded_at is None:
+            leaderboard.load(leaderboard_rows())
+            leaderboard.auto_refresh(leaderboard_rows, app.config['LEADERBOARD_REFRESH_SECONDS'])
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+def _queue_rank_update(mapper, connection, user):
+    """XP değişikliği commit sonrası sıralamaya işlenir (SQL ifadeleri yenilemede yakalanır)"""
+    xp = user.__dict__.get('xp')
+    if isinstance(xp, int):
+        object_session(user).info.setdefault('rank_updates', {})[user.id] = (xp, user.exam_type)
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_rank_updates(session):
+    for user_id, (xp, exam_type) in session.info.pop('rank_updates', {}).items():
+        leaderboard.update(user_id, xp, exam_type)
+
+@event.listens_for(db.session, 'after_rollback')
+def _drop_rank_updates(session):
+    session.info.pop('rank_updates', None)
+
 # ============================================
 # ROUTES - CORE
 # ============================================
@@ -168,29 +422,37 @@ def video_quiz_completed():
 
 @app.route('/api/video/list', methods=['GET'])
 @jwt_required()
+@conditional(video_data_version)
 def video_list():
-    """Kullanıcının videolarını listele"""
+    """Kullanıcının videolarını listele (?limit=, ?cursor=, ?fields=)"""
     try:
         user_id = get_jwt_identity()
         
-        videos = Video.query.filter_by(user_id=user_id).order_by(Video.created_at.desc()).all()
-        
-        video_list = [{
-            'id': v.id,
-            'title': v.title,
-            'thumbnail_url': v.thumbnail_url or 'https://via.placeholder.com/320x180',
-            'duration_seconds': v.duration_seconds,
-            'topic': v.topic_id,
-            'created_at': v.created_at.isoformat(),
-            'view_count': v.view_count,
-            'status': v.status
-        } for v in videos]
+        video_list, next_cursor = paginate(
+            Video.query.filter_by(user_id=user_id),
+            {
+                'id': Video.id,
+                'title': Video.title,
+                'thumbnail_url': func.coalesce(Video.thumbnail_url, 'https://via.placeholder.com/320x180'),
+                'duration_seconds': Video.duration_seconds,
+                'topic': Video.topic_id,
+                'created_at': Video.created_at,
+                'view_count': Video.view_count,
+                'status': Video.status
+            },
+            request.args,
+            Video.created_at,
+            Video.id
+        )
         
         return jsonify({
             'total': len(video_list),
-            'videos': video_list
+            'videos': video_list,
+            'next_cursor': next_cursor
         }), 200
         
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -206,9 +468,8 @@ def get_video(video_id):
         if not video:
             return jsonify({'error': 'Video bulunamadı'}), 404
         
-        # View count artır
-        video.view_count += 1
-        db.session.commit()
+        # View count artır (bellekte; periyodik olarak toplu yazılır)
+        view_counter.incr(video.id)
         
         return jsonify({
             'id': video.id,
@@ -217,7 +478,7 @@ def get_video(video_id):
             'thumbnail_url': video.thumbnail_url,
             'duration_seconds': video.duration_seconds,
             'scenario_metadata': video.scenario_metadata,
-            'view_count': video.view_count,
+            'view_count': video.view_count + view_counter.pending(video.id),
             'created_at': video.created_at.isoformat()
         }), 200
         
@@ -230,43 +491,111 @@ def track_analytics(video_id):
     """Video izleme analitiğini kaydet"""
     try:
         user_id = get_jwt_identity()
-        data = request.get_json()
+        data = request.get_json(silent=True)
         
-        analytics = VideoAnalytics(
-            video_id=video_id,
-            user_id=user_id,
-            watch_duration=data.get('watch_duration'),
-            watch_percentage=data.get('watch_percentage'),
-            pause_timestamps=data.get('pause_timestamps', []),
-            completed=data.get('completed', False)
-        )
-        db.session.add(analytics)
-        db.session.commit()
+        try:
+            row = analytics_row(user_id, video_id, data)
+        except InvalidEvent as e:
+            return jsonify({'error': str(e)}), 400
+        if unowned_video_ids(user_id, [video_id]):
+            return jsonify({'error': 'Video bulunamadı'}), 404
+        
+        # Buffer'a ekle; kayıt ve özetler toplu flush sırasında yazılır
+        analytics_buffer.add(row)
         
         return jsonify({'status': 'success'}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/video/<int:video_id>/heatmap', methods=['GET'])
+@jwt_required()
+def video_heatmap(video_id):
+    """Videonun duraklatma ısı haritası (saniye başına duraklatma sayısı)"""
+    try:
+        user_id = get_jwt_identity()
+        
+        row = db.session.execute(
+            select(Video.duration_seconds, VideoStats.pause_heatmap)
+            .outerjoin(VideoStats, VideoStats.video_id == Video.id)
+            .where(Video.id == video_id, Video.user_id == user_id)
+        ).first()
+        
+        if not row:
+            return jsonify({'error': 'Video bulunamadı'}), 404
+        
+        counts = heatmap.decode(row.pause_heatmap)
+        
+        return jsonify({
+            'video_id': video_id,
+            'duration_seconds': row.duration_seconds,
+            'bucket_seconds': heatmap.BUCKET_SECONDS,
+            'total_pauses': int(counts.sum()),
+            'counts': counts.tolist()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/video/analytics/batch', methods=['POST'])
+@jwt_required()
+def track_analytics_batch():
+    """Birden fazla video izleme olayını tek istekte kaydet"""
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        events = data.get('events')
+        
+        if not isinstance(events, list) or not events:
+            return jsonify({'error': 'events listesi gerekli'}), 400
+        if len(events) > app.config['ANALYTICS_MAX_EVENTS_PER_REQUEST']:
+            return jsonify({'error': 'Çok fazla olay'}), 413
+        
+        rows = []
+        for index, item in enumerate(events):
+            try:
+                video_id = int(item['video_id'])
+            except (KeyError, TypeError, ValueError):
+                return jsonify({'error': 'Her olayda geçerli video_id gerekli'}), 400
+            try:
+                rows.append(analytics_row(user_id, video_id, item))
+            except InvalidEvent as e:
+                return jsonify({'error': str(e), 'index': index}), 400
+        
+        unknown = unowned_video_ids(user_id, [row['video_id'] for row in rows])
+        if unknown:
+            return jsonify({'error': 'Video bulunamadı', 'video_ids': unknown}), 404
+        
+        analytics_buffer.extend(rows)
+        
+        return jsonify({'status': 'accepted', 'accepted': len(rows)}), 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/video/dashboard', methods=['GET'])
 @jwt_required()
+@conditional(video_data_version)
 def video_dashboard():
     """Video dashboard istatistikleri"""
     try:
         user_id = get_jwt_identity()
         
-        # Video sayısı
-        total_videos = Video.query.filter_by(user_id=user_id).count()
-        
-        # Toplam izleme süresi
-        analytics = VideoAnalytics.query.filter_by(user_id=user_id).all()
-        total_watch_time = sum(a.watch_duration or 0 for a in analytics)
+        # Video sayısı, izleme süresi ve tamamlama: tek primary key okuması
+        stats = UserVideoStats.query.get(user_id)
+        total_videos = stats.total_videos if stats else 0
+        total_watch_time = stats.total_watch_time if stats else 0
         
         # Tamamlama oranı
-        completed_count = sum(1 for a in analytics if a.completed)
-        completion_rate = (completed_count / len(analytics) * 100) if analytics else 0
+        completion_rate = (stats.completed_count / stats.sessions * 100) if stats and stats.sessions else 0
         
-        # Son videolar
+        # Seri: aktivite bitmap'inden bit işlemleriyle
+        days = UserActivity.query.get(user_id)
+        streak_days = activity.current_streak(
+            days.start_day, activity.decode(days.bits), today_number()
+        ) if days else 0
+        
+        # Son videolar (user_id, created_at) indeksinden
         recent_videos = Video.query.filter_by(user_id=user_id)\
             .order_by(Video.created_at.desc())\
             .limit(5).all()
@@ -276,7 +605,7 @@ def video_dashboard():
             'total_watch_time': total_watch_time,
             'completion_rate': int(completion_rate),
             'average_score_improvement': 15,  # Mock
-            'streak_days': 7,  # Mock
+            'streak_days': streak_days,
             'recent_videos': [{
                 'title': v.title,
                 'created_at': v.created_at.isoformat(),
@@ -287,6 +616,23 @@ def video_dashboard():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/activity', methods=['GET'])
+@jwt_required()
+def get_activity():
+    """Seri bilgisi ve son 365 günün aktivite takvimi (bitmap'ten)"""
+    try:
+        user_id = get_jwt_identity()
+        days = UserActivity.query.get(user_id)
+        
+        return jsonify(activity.summary(
+            days.start_day if days else None,
+            activity.decode(days.bits) if days else 0,
+            today_number()
+        )), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # ============================================
 # ROUTES - AI PERSONALITY
 # ============================================
@@ -298,6 +644,10 @@ def ai_chat():
     data = request.get_json()
     message = data.get('message')
     
+    # Öğrenme günü olarak işaretle (seri)
+    record_activity(db.session, get_jwt_identity())
+    db.session.commit()
+    
     # Mock response (gerçek implementasyon OpenAI API kullanır)
     response = {
         'message': f'DopingHafıza tarzında yanıt: {message}',
@@ -315,6 +665,10 @@ def ai_chat():
 @jwt_required()
 def photo_solve():
     """Fotoğraftan soru çöz"""
+    # Öğrenme günü olarak işaretle (seri)
+    record_activity(db.session, get_jwt_identity())
+    db.session.commit()
+    
     # Fotoğraf işleme (Vision API)
     return jsonify({
         'solution': 'Adım adım çözüm...',
@@ -367,15 +721,137 @@ def reflex_challenges():
 @jwt_required()
 def live_metrics():
     """Canlı metrikler"""
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
+    ensure_leaderboard()
+    exam_type = leaderboard.exam_type(user_id)
     
     return jsonify({
         'active_users': 1247,
         'videos_generated_today': 342,
         'avg_score_improvement': 18.5,
-        'user_rank': 156
+        'user_rank': leaderboard.rank(user_id),
+        'exam_rank': leaderboard.rank(user_id, exam_type) if exam_type else None,
+        'exam_type': exam_type
     })
 
+@app.route('/api/leaderboard', methods=['GET'])
+@jwt_required()
+def get_leaderboard():
+    """XP sıralaması (?exam_type=YKS&limit=10)"""
+    try:
+        user_id = int(get_jwt_identity())
+        exam_type = request.args.get('exam_type') or None
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        
+        ensure_leaderboard()
+        top = leaderboard.top(limit, exam_type)
+        names = dict(db.session.execute(
+            select(User.id, User.name).where(User.id.in_([row['user_id'] for row in top]))
+        ).all())
+        
+        return jsonify({
+            'exam_type': exam_type,
+            'total': leaderboard.size(exam_type),
+            'top': [dict(row, name=names.get(row['user_id'])) for row in top],
+            'my_rank': leaderboard.rank(user_id, exam_type)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ============================================
+# CLI
+# ============================================
+
+@app.cli.command('backfill-video-stats')
+def backfill_video_stats():
+    """Video özet tablolarını mevcut Video/VideoAnalytics kayıtlarından yeniden oluştur"""
+    db.create_all()
+    completed = func.sum(case((VideoAnalytics.completed, 1), else_=0))
+    watch_time = func.coalesce(func.sum(VideoAnalytics.watch_duration), 0)
+    
+    UserVideoStats.query.delete()
+    VideoStats.query.delete()
+    
+    # Video bazlı özet: tek GROUP BY
+    db.session.execute(VideoStats.__table__.insert().from_select(
+        ['video_id', 'sessions', 'total_watch_time', 'completed_count'],
+        select(VideoAnalytics.video_id, func.count(), watch_time, completed)
+        .group_by(VideoAnalytics.video_id)
+    ))
+    
+    # Kullanıcı bazlı özet: videosu veya analytics kaydı olan herkes için satır aç
+    user_ids = union(select(Video.user_id), select(VideoAnalytics.user_id)).subquery()
+    db.session.execute(UserVideoStats.__table__.insert().from_select(
+        ['user_id'], select(user_ids.c.user_id)
+    ))
+    
+    def for_user(model, column):
+        return select(column).where(model.user_id == UserVideoStats.user_id).scalar_subquery()
+    
+    db.session.execute(UserVideoStats.__table__.update().values(
+        total_videos=for_user(Video, func.count()),
+        sessions=for_user(VideoAnalytics, func.count()),
+        total_watch_time=for_user(VideoAnalytics, watch_time),
+        completed_count=for_user(VideoAnalytics, completed),
+        # Eski ETag'lerle çakışmasın diye sürüm sıfırlanmaz, zamandan başlatılır
+        version=int(datetime.utcnow().timestamp()),
+        updated_at=datetime.utcnow()
+    ))
+    
+    # Duraklatma histogramları: ham listeler yalnızca burada bir kez okunur
+    pauses = defaultdict(list)
+    for video_id, positions in db.session.execute(
+        select(VideoAnalytics.video_id, VideoAnalytics.pause_timestamps)
+        .where(VideoAnalytics.pause_timestamps.isnot(None))
+        .execution_options(yield_per=1000)
+    ):
+        if isinstance(positions, list):
+            pauses[video_id].extend(positions)
+    if pauses:
+        record_pause_heatmaps(pauses)
+    db.session.commit()
+    
+    print(f"✅ {UserVideoStats.query.count()} kullanıcı, {VideoStats.query.count()} video özeti oluşturuldu")
+
+@app.cli.command('backfill-activity')
+@click.option('--chunk', default=1000, show_default=True, help='Parça başına kullanıcı')
+def backfill_activity(chunk):
+    """Aktivite bitmap'lerini mevcut kayıtların created_at sütunlarından oluştur"""
+    db.create_all()
+    offset = app.config['STREAK_UTC_OFFSET_HOURS']
+    
+    last_id = 0
+    rebuilt = 0
+    while True:
+        user_ids = db.session.execute(
+            select(User.id).where(User.id > last_id).order_by(User.id).limit(chunk)
+        ).scalars().all()
+        if not user_ids:
+            break
+        
+        events = union_all(
+            select(Performance.user_id, Performance.created_at)
+            .where(Performance.user_id.in_(user_ids)),
+            select(VideoAnalytics.user_id, VideoAnalytics.created_at)
+            .where(VideoAnalytics.user_id.in_(user_ids), VideoAnalytics.completed.is_(True))
+        )
+        days = defaultdict(set)
+        for user_id, created_at in db.session.execute(events):
+            if created_at is not None:
+                days[user_id].add(activity.day_number(created_at, offset))
+        
+        for user_id in user_ids:
+            start_day, bits = activity.from_days(days.get(user_id, ()))
+            activity.store(db.session, UserActivity.__table__, user_id, start_day, bits)
+            increment(db.session, UserVideoStats.__table__, {'user_id': user_id}, {'version': 1})
+        db.session.commit()
+        
+        last_id = user_ids[-1]
+        rebuilt += len(user_ids)
+    
+    print(f"✅ {rebuilt} kullanıcının aktivite bitmap'i oluşturuldu")
+
 # ============================================
 # INITIALIZE DATABASE
 # ============================================
@@ -6,12 +6,31 @@ Tüm özelliklerin tam entegrasyonu
 from flask import Flask, jsonify, request, send_file
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity, create_access_token
+from flask_jwt_extended import JWTManager, jwt_required, get_jwt, get_jwt_identity, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
+from collections import Counter, defaultdict
+from sqlalchemy import MetaData, and_, bindparam, create_engine, event, exists, func, inspect, literal, or_, select, text, update
+import click
 import os
+import math
+import random
 import json
 import base64
+import hashlib
+import zlib
+
+from services import activity, archive, sqlite_tuning, synthetic
+from services.counters import ShardedCounter
+from services.identity_cache import identity_cache
+from services.levels import level_for
+from services.pagination import PaginationError, paginate, parse_fields
+from services.query_plans import check_plans
+from services.rate_limit import rate_limiter
+from services.revocation import issue_tokens, revocation_list
+from services.upsert import increment
+from services.analytics_events import InvalidEvent, clean_event
+from services.write_buffer import WriteBuffer
 
 app = Flask(__name__)
 
@@ -20,11 +39,69 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'macigscool-ultimate-2025')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///macigscool_ultimate.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-ultimate-key')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=7)
+# Kısa ömürlü access token + refresh token (/api/auth/refresh). Çıkış
+# yapılan ve yenilenen token'lar revoked_tokens tablosunda tutulur; her
+# istekte bellek içi Bloom filtresinden kontrol edilir (services.revocation)
+app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', '15')))
+app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', '30')))
+app.config['JWT_REVOCATION_CAPACITY'] = int(os.getenv('JWT_REVOCATION_CAPACITY', '100000'))
+app.config['JWT_REVOCATION_ERROR_RATE'] = float(os.getenv('JWT_REVOCATION_ERROR_RATE', '0.001'))
+app.config['JWT_REVOCATION_REFRESH_SECONDS'] = float(os.getenv('JWT_REVOCATION_REFRESH_SECONDS', '5'))
+
+# Bağlantı havuzu (bellek içi SQLite hariç)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_tuning.engine_options(
+    app.config['SQLALCHEMY_DATABASE_URI'],
+    pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+    max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '20'))
+)
+
+# SQLite: her bağlantıda WAL (okuyucular yazımı beklemez), NORMAL sync,
+# busy_timeout ve önbellek pragma'ları. Boş değer SQLite varsayılanını bırakır
+app.config['SQLITE_JOURNAL_MODE'] = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')
+app.config['SQLITE_CACHE_SIZE'] = os.getenv('SQLITE_CACHE_SIZE', '-64000')  # negatif = KiB
+app.config['SQLITE_MMAP_SIZE'] = os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))
+
+# Analytics write-behind buffer: olaylar toplu yazılır
+app.config['ANALYTICS_BATCH_SIZE'] = int(os.getenv('ANALYTICS_BATCH_SIZE', '500'))
+app.config['ANALYTICS_FLUSH_SECONDS'] = float(os.getenv('ANALYTICS_FLUSH_SECONDS', '2'))
+app.config['ANALYTICS_BUFFER_CAPACITY'] = int(os.getenv('ANALYTICS_BUFFER_CAPACITY', '20000'))
+app.config['ANALYTICS_MAX_EVENTS_PER_REQUEST'] = int(os.getenv('ANALYTICS_MAX_EVENTS_PER_REQUEST', '500'))
+
+# İzlenme sayaçları bellekte toplanır, bu aralıkla veritabanına yazılır
+app.config['VIEW_COUNT_FLUSH_SECONDS'] = float(os.getenv('VIEW_COUNT_FLUSH_SECONDS', '5'))
+
+# Seri (streak) günleri bu saat dilimine göre sayılır (Türkiye: UTC+3)
+app.config['STREAK_UTC_OFFSET_HOURS'] = float(os.getenv('STREAK_UTC_OFFSET_HOURS', '3'))
+
+# Bu günden eski analitik ve sohbet kayıtları aylık arşiv tablolarına taşınır
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+
+# current_user profilleri süreç başına bu süre önbellekte tutulur; XP
+# yazımları kaydı hemen düşürür, diğer süreçler TTL sonunda görür
+app.config['IDENTITY_CACHE_TTL_SECONDS'] = float(os.getenv('IDENTITY_CACHE_TTL_SECONDS', '30'))
+app.config['IDENTITY_CACHE_SIZE'] = int(os.getenv('IDENTITY_CACHE_SIZE', '10000'))
+
+# Pahalı endpoint'ler için token-bucket limitleri ('N/period': N'lik
+# patlama, sonra dönem başına N; JWT varsa kullanıcı, yoksa IP başına).
+# URL olmayan anahtarlar (video-generation) handler içinde kullanılır:
+# quiz-completed quiz'i her zaman kaydeder, yalnızca videoyu erteler.
+# RATE_LIMIT_BACKEND=sqlite: kovalar tüm gunicorn worker'larında ortak
+app.config['RATE_LIMIT_ENABLED'] = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+app.config['RATE_LIMIT_BACKEND'] = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+app.config['RATE_LIMIT_SQLITE_PATH'] = os.getenv('RATE_LIMIT_SQLITE_PATH')
+app.config['RATE_LIMITS'] = os.getenv('RATE_LIMITS') or {
+    '/api/photo-solver/solve': '10/minute',
+    '/api/ai-tutor/chat': '30/minute',
+    'video-generation': '10/hour',
+}
 
 # Extensions
 db = SQLAlchemy(app)
+sqlite_tuning.init_app(app, db)
 jwt = JWTManager(app)
+rate_limiter.init_app(app)
 CORS(app, supports_credentials=True, resources={r"/api/*": {"origins": "*"}})
 
 # ============================================
@@ -56,6 +133,7 @@ class User(db.Model):
 
 class Performance(db.Model):
     __tablename__ = 'performance'
+    __table_args__ = (db.Index('ix_performance_user_created', 'user_id', 'created_at'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
@@ -73,6 +151,7 @@ class Performance(db.Model):
 
 class Video(db.Model):
     __tablename__ = 'videos'
+    __table_args__ = (db.Index('ix_videos_user_created', 'user_id', 'created_at'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
@@ -94,6 +173,10 @@ class Video(db.Model):
 
 class VideoAnalytics(db.Model):
     __tablename__ = 'video_analytics'
+    __table_args__ = (
+        db.Index('ix_video_analytics_user_created', 'user_id', 'created_at'),
+        db.Index('ix_video_analytics_video_created', 'video_id', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     video_id = db.Column(db.Integer, db.ForeignKey('videos.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -107,6 +190,10 @@ class VideoAnalytics(db.Model):
 
 class AIConversation(db.Model):
     __tablename__ = 'ai_conversations'
+    __table_args__ = (
+        db.Index('ix_ai_conversations_user_created', 'user_id', 'created_at'),
+        db.Index('ix_ai_conversations_session_created', 'user_id', 'session_id', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
@@ -114,6 +201,10 @@ class AIConversation(db.Model):
     message = db.Column(db.Text)
     response = db.Column(db.Text)
     
+    # Eski kayıtlarda metin zlib ile sıkıştırılıp buraya taşınır (compress-transcripts)
+    message_z = db.Column(db.LargeBinary)
+    response_z = db.Column(db.LargeBinary)
+    
     # Emotion detection
     student_emotion = db.Column(db.String(50))  # happy, confused, frustrated
     ai_emotion = db.Column(db.String(50))       # supportive, encouraging
@@ -123,8 +214,26 @@ class AIConversation(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class TutorSession(db.Model):
+    """AI öğretmen oturumu - her mesajda sayaç ve önizleme güncellenir"""
+    __tablename__ = 'tutor_sessions'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'session_id', name='uq_tutor_sessions_user_session'),
+        db.Index('ix_tutor_sessions_user_created', 'user_id', 'created_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    session_id = db.Column(db.String(100), nullable=False)
+    
+    message_count = db.Column(db.Integer, default=0, nullable=False)
+    last_message_preview = db.Column(db.String(200))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class PhotoSolution(db.Model):
     __tablename__ = 'photo_solutions'
+    __table_args__ = (db.Index('ix_photo_solutions_user_created', 'user_id', 'created_at'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
@@ -142,6 +251,7 @@ class PhotoSolution(db.Model):
 
 class Achievement(db.Model):
     __tablename__ = 'achievements'
+    __table_args__ = (db.Index('ix_achievements_user_earned', 'user_id', 'earned_at'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
@@ -154,6 +264,7 @@ class Achievement(db.Model):
 
 class WeeklyGoal(db.Model):
     __tablename__ = 'weekly_goals'
+    __table_args__ = (db.Index('ix_weekly_goals_user_completed', 'user_id', 'completed'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
@@ -164,10 +275,788 @@ class WeeklyGoal(db.Model):
     week_start = db.Column(db.Date)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class DashboardSnapshot(db.Model):
+    """Dashboard'un hazır hali - ilgili her yazımda parça parça güncellenir"""
+    __tablename__ = 'dashboard_snapshots'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    
+    subject_averages = db.Column(db.JSON)      # Son 10 quiz, ders bazında
+    total_quizzes = db.Column(db.Integer, default=0, nullable=False)
+    videos_watched = db.Column(db.Integer, default=0, nullable=False)
+    photos_solved = db.Column(db.Integer, default=0, nullable=False)
+    recent_achievements = db.Column(db.JSON)   # Son 5 başarı
+    open_goals = db.Column(db.JSON)            # Tamamlanmamış haftalık hedefler
+    
+    built_at = db.Column(db.DateTime)          # Tam hesaplama zamanı; boşsa ilk okumada hesaplanır
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class XPEvent(db.Model):
+    """XP defteri - yalnızca eklenir; User.xp bu kayıtların toplamıdır"""
+    __tablename__ = 'xp_events'
+    __table_args__ = (db.Index('ix_xp_events_user_created', 'user_id', 'created_at'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    amount = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(50))  # photo_solved, quiz_completed, video_completed
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class UserActivity(db.Model):
+    """Günlük aktivite bitmap'i - bit i = start_day + i. gün (services.activity)"""
+    __tablename__ = 'user_activity'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    start_day = db.Column(db.Integer)
+    last_day = db.Column(db.Integer)
+    bits = db.Column(db.LargeBinary)
+
+class ArchivedMonth(db.Model):
+    """Arşiv kataloğu - kaynak tablo ve ay başına bir arşiv tablosu"""
+    __tablename__ = 'archived_months'
+    __table_args__ = (db.UniqueConstraint('source', 'month', name='uq_archived_months_source_month'),)
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(50), nullable=False)   # video_analytics, ai_conversations
+    month = db.Column(db.String(7), nullable=False)     # YYYY-MM
+    row_count = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class MonthlyRollup(db.Model):
+    """Arşivlenen satırların kullanıcı/ay özeti - ham satırlar taşındıktan sonra kalır"""
+    __tablename__ = 'monthly_rollups'
+    __table_args__ = (db.UniqueConstraint('user_id', 'month', name='uq_monthly_rollups_user_month'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    month = db.Column(db.String(7), nullable=False)
+    
+    video_events = db.Column(db.Integer, default=0, nullable=False)
+    videos_completed = db.Column(db.Integer, default=0, nullable=False)
+    watch_seconds = db.Column(db.Integer, default=0, nullable=False)
+    ai_messages = db.Column(db.Integer, default=0, nullable=False)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# ============================================
+# ACTIVITY / STREAK
+# ============================================
+
+def today_number():
+    return activity.day_number(datetime.utcnow(), app.config['STREAK_UTC_OFFSET_HOURS'])
+
+def record_activity(executor, user_id, when=None):
+    """Öğrenme olayının gününü işaretle ve User.streak_days'i güncelle"""
+    offset = app.config['STREAK_UTC_OFFSET_HOURS']
+    start_day, bits, changed = activity.mark_active(
+        executor, UserActivity.__table__, user_id,
+        activity.day_number(when or datetime.utcnow(), offset)
+    )
+    if not changed:
+        return
+    streak = activity.current_streak(start_day, bits, today_number())
+    users = User.__table__
+    executor.execute(
+        update(users)
+        .where(users.c.id == user_id, or_(users.c.streak_days.is_(None), users.c.streak_days != streak))
+        .values(streak_days=streak)
+    )
+
+@event.listens_for(Performance, 'after_insert')
+@event.listens_for(PhotoSolution, 'after_insert')
+@event.listens_for(AIConversation, 'after_insert')
+def _mark_learning_day(mapper, connection, target):
+    record_activity(connection, target.user_id, target.created_at)
+
+@app.cli.command('backfill-activity')
+@click.option('--chunk', default=1000, show_default=True, help='Parça başına kullanıcı')
+def backfill_activity(chunk):
+    """Aktivite bitmap'lerini mevcut kayıtların created_at sütunlarından oluştur"""
+    upgrade_schema()
+    users = User.__table__
+    offset = app.config['STREAK_UTC_OFFSET_HOURS']
+    today = today_number()
+    
+    last_id = 0
+    rebuilt = 0
+    while True:
+        user_ids = db.session.execute(
+            select(users.c.id).where(users.c.id > last_id).order_by(users.c.id).limit(chunk)
+        ).scalars().all()
+        if not user_ids:
+            break
+        
+        # Her tablo (user_id, created_at) indeksinden okunur
+        days = defaultdict(set)
+        for query in (
+            select(Performance.user_id, Performance.created_at),
+            select(PhotoSolution.user_id, PhotoSolution.created_at),
+            select(AIConversation.user_id, AIConversation.created_at),
+            select(VideoAnalytics.user_id, VideoAnalytics.created_at).where(VideoAnalytics.completed.is_(True)),
+            *archived_activity_queries()
+        ):
+            rows = db.session.execute(query.where(query.selected_columns[0].in_(user_ids)))
+            for user_id, created_at in rows:
+                if created_at is not None:
+                    days[user_id].add(activity.day_number(created_at, offset))
+        
+        streaks = []
+        for user_id in user_ids:
+            start_day, bits = activity.from_days(days.get(user_id, ()))
+            activity.store(db.session, UserActivity.__table__, user_id, start_day, bits)
+            streaks.append({'uid': user_id, 'streak': activity.current_streak(start_day, bits, today)})
+        db.session.execute(
+            update(users).where(users.c.id == bindparam('uid')).values(streak_days=bindparam('streak')),
+            streaks
+        )
+        db.session.commit()
+        
+        last_id = user_ids[-1]
+        rebuilt += len(user_ids)
+    
+    print(f"✅ {rebuilt} kullanıcının aktivite bitmap'i oluşturuldu")
+
+# ============================================
+# ARCHIVE (soğuk veriler)
+# ============================================
+
+archive_metadata = MetaData()
+ARCHIVE_SOURCES = {
+    'video-analytics': VideoAnalytics.__table__,
+    'ai-conversations': AIConversation.__table__
+}
+
+def _rollup_video_analytics(rows):
+    rollups = defaultdict(Counter)
+    for row in rows:
+        rollup = rollups[(row.user_id, archive.month_key(row.created_at))]
+        rollup['video_events'] += 1
+        rollup['videos_completed'] += 1 if row.completed else 0
+        rollup['watch_seconds'] += row.watch_duration or 0
+    return rollups
+
+def _rollup_ai_conversations(rows):
+    rollups = defaultdict(Counter)
+    for row in rows:
+        rollups[(row.user_id, archive.month_key(row.created_at))]['ai_messages'] += 1
+    return rollups
+
+ARCHIVE_ROLLUPS = {
+    'video_analytics': _rollup_video_analytics,
+    'ai_conversations': _rollup_ai_conversations
+}
+
+def archived_table(source, month):
+    return archive.archive_table(archive_metadata, source, month)
+
+def archived_activity_queries():
+    """backfill-activity için arşiv tablolarındaki (user_id, created_at) sorguları"""
+    queries = []
+    for source, month in db.session.execute(select(ArchivedMonth.source, ArchivedMonth.month)):
+        table = archived_table(db.metadata.tables[source], month)
+        query = select(table.c.user_id, table.c.created_at)
+        if source == 'video_analytics':
+            query = query.where(table.c.completed.is_(True))
+        queries.append(query)
+    return queries
+
+@app.cli.command('archive-cold-data')
+@click.option('--days', default=None, type=int, help='Bu günden eski satırlar taşınır (varsayılan: ARCHIVE_AFTER_DAYS)')
+@click.option('--chunk', default=5000, show_default=True, help='Transaction başına satır')
+def archive_cold_data(days, chunk):
+    """Eski video analitiği ve AI sohbet satırlarını aylık arşiv tablolarına taşı"""
+    upgrade_schema()
+    cutoff = datetime.utcnow() - timedelta(days=days or app.config['ARCHIVE_AFTER_DAYS'])
+    
+    for source in ARCHIVE_SOURCES.values():
+        last_id = 0
+        moved = 0
+        while True:
+            # Arşive yazma, özet ve silme aynı transaction'da
+            rows, months = archive.archive_chunk(
+                db.session.connection(), archive_metadata, source, cutoff, last_id, chunk
+            )
+            if not rows:
+                break
+            for month, count in months.items():
+                increment(db.session, ArchivedMonth.__table__,
+                          {'source': source.name, 'month': month}, {'row_count': count})
+            for (user_id, month), deltas in ARCHIVE_ROLLUPS[source.name](rows).items():
+                increment(db.session, MonthlyRollup.__table__,
+                          {'user_id': user_id, 'month': month}, dict(deltas))
+            db.session.commit()
+            
+            last_id = rows[-1].id
+            moved += len(rows)
+        
+        print(f"✅ {source.name}: {moved} satır arşivlendi ({cutoff:%Y-%m-%d} öncesi)")
+
+# ============================================
+# AI TUTOR SESSIONS
+# ============================================
+
+PREVIEW_LENGTH = 120
+
+def pack_text(text):
+    return zlib.compress(text.encode('utf-8'), 9)
+
+def unpack_text(blob):
+    return zlib.decompress(blob).decode('utf-8')
+
+@event.listens_for(AIConversation, 'after_insert')
+def _update_tutor_session(mapper, connection, conversation):
+    """Oturum satırını aynı transaction'da oluştur/güncelle"""
+    if conversation.session_id is None:
+        return
+    now = conversation.created_at or datetime.utcnow()
+    increment(
+        connection, TutorSession.__table__,
+        {'user_id': conversation.user_id, 'session_id': conversation.session_id},
+        {'message_count': 1},
+        assign={
+            'last_message_preview': (conversation.message or '')[:PREVIEW_LENGTH],
+            'updated_at': now
+        }
+    )
+
+def rebuild_tutor_sessions():
+    """tutor_sessions tablosunu mevcut ai_conversations kayıtlarından oluştur"""
+    conversations = AIConversation.__table__
+    
+    TutorSession.query.delete()
+    latest = select(func.max(conversations.c.id).label('id'))\
+        .group_by(conversations.c.user_id, conversations.c.session_id).subquery()
+    sessions = select(
+        conversations.c.user_id,
+        conversations.c.session_id,
+        func.count().label('message_count'),
+        func.min(conversations.c.created_at).label('created_at'),
+        func.max(conversations.c.created_at).label('updated_at')
+    ).where(conversations.c.session_id.isnot(None))\
+        .group_by(conversations.c.user_id, conversations.c.session_id).subquery()
+    last = conversations.alias('last')
+    
+    db.session.execute(TutorSession.__table__.insert().from_select(
+        ['user_id', 'session_id', 'message_count', 'created_at', 'updated_at', 'last_message_preview'],
+        select(
+            sessions.c.user_id, sessions.c.session_id, sessions.c.message_count,
+            sessions.c.created_at, sessions.c.updated_at,
+            func.substr(last.c.message, 1, PREVIEW_LENGTH)
+        ).select_from(sessions)
+        .join(last, and_(last.c.user_id == sessions.c.user_id, last.c.session_id == sessions.c.session_id))
+        .join(latest, latest.c.id == last.c.id)
+    ))
+    
+    # Sıkıştırılmış son mesajların önizlemesi SQL'de çıkarılamaz
+    missing = db.session.execute(
+        select(TutorSession.id, conversations.c.message_z)
+        .join(conversations, and_(
+            conversations.c.user_id == TutorSession.user_id,
+            conversations.c.session_id == TutorSession.session_id
+        ))
+        .join(latest, latest.c.id == conversations.c.id)
+        .where(TutorSession.last_message_preview.is_(None), conversations.c.message_z.isnot(None))
+    ).all()
+    if missing:
+        db.session.execute(
+            update(TutorSession.__table__)
+            .where(TutorSession.__table__.c.id == bindparam('row_id'))
+            .values(last_message_preview=bindparam('preview')),
+            [{'row_id': row.id, 'preview': unpack_text(row.message_z)[:PREVIEW_LENGTH]} for row in missing]
+        )
+    db.session.commit()
+    return TutorSession.query.count()
+
+@app.cli.command('backfill-tutor-sessions')
+def backfill_tutor_sessions():
+    """tutor_sessions tablosunu mevcut ai_conversations kayıtlarından oluştur"""
+    upgrade_schema()
+    print(f"✅ {rebuild_tutor_sessions()} AI oturumu oluşturuldu")
+
+@app.cli.command('compress-transcripts')
+@click.option('--days', default=30, show_default=True, help='Bu günden eski mesajlar sıkıştırılır')
+@click.option('--chunk', default=1000, show_default=True, help='Transaction başına satır')
+def compress_transcripts(days, chunk):
+    """Eski AI sohbet metinlerini zlib ile sıkıştır (message/response -> *_z)"""
+    upgrade_schema()
+    conversations = AIConversation.__table__
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    
+    last_id = 0
+    compressed = 0
+    saved = 0
+    while True:
+        rows = db.session.execute(
+            select(conversations.c.id, conversations.c.message, conversations.c.response)
+            .where(conversations.c.id > last_id, conversations.c.created_at < cutoff,
+                   or_(conversations.c.message.isnot(None), conversations.c.response.isnot(None)))
+            .order_by(conversations.c.id).limit(chunk)
+        ).all()
+        if not rows:
+            break
+        
+        updates = []
+        for row in rows:
+            message_z = pack_text(row.message) if row.message is not None else None
+            response_z = pack_text(row.response) if row.response is not None else None
+            saved += len((row.message or '').encode('utf-8')) + len((row.response or '').encode('utf-8'))
+            saved -= len(message_z or b'') + len(response_z or b'')
+            updates.append({'row_id': row.id, 'mz': message_z, 'rz': response_z})
+        
+        db.session.execute(
+            update(conversations)
+            .where(conversations.c.id == bindparam('row_id'))
+            .values(message=None, response=None,
+                    message_z=bindparam('mz'), response_z=bindparam('rz')),
+            updates
+        )
+        db.session.commit()
+        
+        last_id = rows[-1].id
+        compressed += len(rows)
+    
+    print(f"✅ {compressed} mesaj sıkıştırıldı ({saved // 1024} KB kazanıldı)")
+
+# ============================================
+# XP LEDGER
+# ============================================
+
+def award_xp(executor, awards, reason):
+    """
+    XP ver: deftere yaz, User.xp'yi SQL tarafında artır, seviyeyi güncelle
+    
+    awards: {user_id: miktar}. Commit çağıranın transaction'ındadır; eş
+    zamanlı istekler artış kaybetmez (read-modify-write yok).
+    """
+    awards = {user_id: amount for user_id, amount in awards.items() if amount}
+    if not awards:
+        return
+    users = User.__table__
+    now = datetime.utcnow()
+    
+    executor.execute(XPEvent.__table__.insert(), [
+        {'user_id': user_id, 'amount': amount, 'reason': reason, 'created_at': now}
+        for user_id, amount in awards.items()
+    ])
+    executor.execute(
+        update(users)
+        .where(users.c.id == bindparam('uid'))
+        .values(xp=func.coalesce(users.c.xp, 0) + bindparam('amount')),
+        [{'uid': user_id, 'amount': amount} for user_id, amount in awards.items()]
+    )
+    
+    # Artış sonrası toplamdan seviye; yalnızca yükseltilir, böylece
+    # eş zamanlı yazımlar en yüksek seviyede birleşir
+    totals = executor.execute(
+        select(users.c.id, users.c.xp).where(users.c.id.in_(list(awards)))
+    ).all()
+    executor.execute(
+        update(users)
+        .where(users.c.id == bindparam('uid'),
+               or_(users.c.level.is_(None), users.c.level < bindparam('new_level')))
+        .values(level=bindparam('new_level')),
+        [{'uid': user_id, 'new_level': level_for(xp)} for user_id, xp in totals]
+    )
+    
+    # Önbellekteki profiller commit sonrası yeniden okunur
+    identity_cache.invalidate_on_commit(executor, awards)
+
+@app.cli.command('rebuild-xp')
+@click.option('--chunk', default=1000, show_default=True, help='Parça başına kullanıcı')
+def rebuild_xp(chunk):
+    """Tüm kullanıcıların XP ve seviyesini defterden yeniden hesapla"""
+    upgrade_schema()
+    users = User.__table__
+    events = XPEvent.__table__
+    
+    # Defterden önce kazanılmış XP'yi bir kez açılış kaydı olarak taşı
+    ledger_total = select(func.coalesce(func.sum(events.c.amount), 0))\
+        .where(events.c.user_id == users.c.id).scalar_subquery()
+    opening = (func.coalesce(users.c.xp, 0) - ledger_total).label('amount')
+    db.session.execute(events.insert().from_select(
+        ['user_id', 'amount', 'reason', 'created_at'],
+        select(users.c.id, opening, literal('opening_balance'), literal(datetime.utcnow()))
+        .where(opening > 0, ~exists().where(
+            events.c.user_id == users.c.id, events.c.reason == 'opening_balance'
+        ))
+    ))
+    db.session.commit()
+    
+    last_id = 0
+    rebuilt = 0
+    while True:
+        user_ids = db.session.execute(
+            select(users.c.id).where(users.c.id > last_id).order_by(users.c.id).limit(chunk)
+        ).scalars().all()
+        if not user_ids:
+            break
+        
+        sums = dict(db.session.execute(
+            select(events.c.user_id, func.sum(events.c.amount))
+            .where(events.c.user_id.in_(user_ids))
+            .group_by(events.c.user_id)
+        ).all())
+        db.session.execute(
+            update(users)
+            .where(users.c.id == bindparam('uid'))
+            .values(xp=bindparam('new_xp'), level=bindparam('new_level')),
+            [{'uid': user_id, 'new_xp': sums.get(user_id, 0), 'new_level': level_for(sums.get(user_id, 0))}
+             for user_id in user_ids]
+        )
+        db.session.commit()
+        
+        last_id = user_ids[-1]
+        rebuilt += len(user_ids)
+    
+    print(f"✅ {rebuilt} kullanıcının XP ve seviyesi yeniden hesaplandı")
+
+@app.cli.command('check-xp-concurrency')
+@click.option('--threads', default=8, show_default=True, help='Eşzamanlı thread')
+@click.option('--awards', default=50, show_default=True, help='Thread başına award_xp çağrısı')
+def check_xp_concurrency(threads, awards):
+    """Aynı kullanıcıya eşzamanlı XP ver; kayıp artış olmadığını doğrula
+
+    Yapılandırılmış veritabanında geçici bir kullanıcı oluşturulur ve iş
+    bitince defteriyle birlikte silinir. Kilit nedeniyle başarısız olan
+    çağrılar sayılır ve beklenen toplama katılmaz.
+    """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    
+    upgrade_schema()
+    user = User(name='XP eşzamanlılık kontrolü', email=f'xp-check-{os.urandom(6).hex()}@example.invalid', xp=0, level=1)
+    db.session.add(user)
+    db.session.commit()
+    user_id = user.id
+    lock = threading.Lock()
+    awarded = [0]
+    errors = [0]
+    
+    def worker(n):
+        with app.app_context():
+            for i in range(awards):
+                amount = (n * awards + i) % 25 + 1
+                try:
+                    award_xp(db.session, {user_id: amount}, 'concurrency_check')
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    with lock:
+                        errors[0] += 1
+                    continue
+                with lock:
+                    awarded[0] += amount
+    
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, range(threads)))
+        db.session.expire_all()
+        xp, level = db.session.execute(select(User.xp, User.level).where(User.id == user_id)).one()
+        ledger = db.session.execute(
+            select(func.coalesce(func.sum(XPEvent.amount), 0)).where(XPEvent.user_id == user_id)
+        ).scalar()
+    finally:
+        db.session.execute(XPEvent.__table__.delete().where(XPEvent.user_id == user_id))
+        db.session.execute(User.__table__.delete().where(User.id == user_id))
+        db.session.commit()
+    
+    ok = xp == ledger == awarded[0] and level == level_for(xp)
+    print(f"{'✅' if ok else '❌'} {threads}x{awards} çağrı: beklenen {awarded[0]} XP, "
+          f"User.xp {xp}, defter {ledger}, seviye {level} ({errors[0]} başarısız çağrı)")
+    if not ok:
+        raise SystemExit(1)
+
+# ============================================
+# DASHBOARD SNAPSHOT
+# ============================================
+
+def _performance_part(connection, user_id):
+    performances = connection.execute(
+        select(Performance.subject, Performance.score)
+        .where(Performance.user_id == user_id)
+        .order_by(Performance.created_at.desc())
+        .limit(10)
+    ).all()
+    
+    subject_progress = {}
+    for subject, score in performances:
+        if score is not None:
+            subject_progress.setdefault(subject, []).append(score)
+    
+    return {
+        'subject_averages': {
+            subject: sum(scores) / len(scores)
+            for subject, scores in subject_progress.items()
+        },
+        'total_quizzes': len(performances)
+    }
+
+def _achievements_part(connection, user_id):
+    achievements = connection.execute(
+        select(Achievement.name, Achievement.icon, Achievement.earned_at)
+        .where(Achievement.user_id == user_id)
+        .order_by(Achievement.earned_at.desc())
+        .limit(5)
+    ).all()
+    return {'recent_achievements': [{
+        'name': a.name,
+        'icon': a.icon,
+        'date': a.earned_at.strftime('%d %B')
+    } for a in achievements]}
+
+def _goals_part(connection, user_id):
+    goals = connection.execute(
+        select(WeeklyGoal.task, WeeklyGoal.progress)
+        .where(WeeklyGoal.user_id == user_id, WeeklyGoal.completed.is_(False))
+        .order_by(WeeklyGoal.id)
+    ).all()
+    return {'open_goals': [{'task': g.task, 'progress': g.progress} for g in goals]}
+
+def _counts_part(connection, user_id):
+    def count(model):
+        return connection.execute(
+            select(func.count()).select_from(model).where(model.user_id == user_id)
+        ).scalar()
+    return {'videos_watched': count(Video), 'photos_solved': count(PhotoSolution)}
+
+def refresh_dashboard_snapshot(connection, user_id, *parts):
+    """Snapshot'ın verilen parçalarını (indeksli, LIMIT'li sorgularla) yeniden yaz"""
+    values = {}
+    for part in parts:
+        values.update(part(connection, user_id))
+    increment(connection, DashboardSnapshot.__table__, {'user_id': user_id}, {}, assign=values)
+
+def build_dashboard_snapshot(connection, user_id):
+    """Snapshot'ı baştan hesapla (ilk okuma veya yeniden oluşturma)"""
+    refresh_dashboard_snapshot(
+        connection, user_id,
+        _performance_part, _achievements_part, _goals_part, _counts_part,
+        lambda connection, user_id: {'built_at': datetime.utcnow()}
+    )
+
+# Yazım tarafı: ilgili kayıt aynı transaction içinde snapshot'a yansıtılır
+
+@event.listens_for(User, 'after_insert')
+def _snapshot_new_user(mapper, connection, user):
+    build_dashboard_snapshot(connection, user.id)
+
+@event.listens_for(Performance, 'after_insert')
+def _snapshot_performance(mapper, connection, performance):
+    refresh_dashboard_snapshot(connection, performance.user_id, _performance_part)
+
+@event.listens_for(Video, 'after_insert')
+def _snapshot_video(mapper, connection, video):
+    increment(connection, DashboardSnapshot.__table__,
+              {'user_id': video.user_id}, {'videos_watched': 1})
+
+@event.listens_for(PhotoSolution, 'after_insert')
+def _snapshot_photo(mapper, connection, photo):
+    increment(connection, DashboardSnapshot.__table__,
+              {'user_id': photo.user_id}, {'photos_solved': 1})
+
+@event.listens_for(Achievement, 'after_insert')
+@event.listens_for(Achievement, 'after_update')
+@event.listens_for(Achievement, 'after_delete')
+def _snapshot_achievement(mapper, connection, achievement):
+    refresh_dashboard_snapshot(connection, achievement.user_id, _achievements_part)
+
+@event.listens_for(WeeklyGoal, 'after_insert')
+@event.listens_for(WeeklyGoal, 'after_update')
+@event.listens_for(WeeklyGoal, 'after_delete')
+def _snapshot_goal(mapper, connection, goal):
+    refresh_dashboard_snapshot(connection, goal.user_id, _goals_part)
+
+@app.cli.command('rebuild-dashboards')
+@click.option('--batch-size', default=500, show_default=True, help='Commit başına kullanıcı')
+def rebuild_dashboards(batch_size):
+    """Tüm kullanıcıların dashboard snapshot'larını yeniden hesapla
+
+    Kullanıcılar id sırasıyla parti parti okunur ve her parti kendi
+    transaction'ında yazılır; yazım kilidi kısa tutulur, bellek sabit kalır.
+    """
+    upgrade_schema()
+    total = 0
+    last_id = 0
+    while True:
+        user_ids = db.session.execute(
+            select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+        ).scalars().all()
+        if not user_ids:
+            break
+        for user_id in user_ids:
+            build_dashboard_snapshot(db.session, user_id)
+        db.session.commit()
+        total += len(user_ids)
+        last_id = user_ids[-1]
+    print(f"✅ {total} dashboard snapshot'ı oluşturuldu")
+
+# ============================================
+# ANALYTICS BUFFER
+# ============================================
+
+def analytics_row(user_id, video_id, data):
+    """İzleme olayını toplu insert için satıra çevir (zaman damgası kabul anında)
+
+    Alanlar burada tiplerine çevrilir; hatalı olay InvalidEvent ile
+    reddedilir, ortak buffer'a hiç girmez.
+    """
+    return dict(
+        clean_event(data),
+        video_id=video_id,
+        user_id=int(user_id),
+        created_at=datetime.utcnow()
+    )
+
+def unowned_video_ids(user_id, video_ids):
+    """Kullanıcıya ait olmayan (veya olmayan) video id'leri - tek sorgu"""
+    video_ids = set(video_ids)
+    owned = db.session.execute(
+        select(Video.id).where(Video.id.in_(video_ids), Video.user_id == int(user_id))
+    ).scalars().all()
+    return sorted(video_ids - set(owned))
+
+def flush_analytics(rows):
+    """Biriken olayları tek transaction'da yaz: toplu INSERT + toplu XP ödülü"""
+    with app.app_context():
+        db.session.execute(VideoAnalytics.__table__.insert(), rows)
+        
+        # Video tamamlandıysa XP ver (kullanıcı başına tek defter kaydı)
+        completed = Counter(row['user_id'] for row in rows if row['completed'])
+        award_xp(db.session, {user_id: 50 * count for user_id, count in completed.items()}, 'video_completed')
+        for row in rows:
+            if row['completed']:
+                record_activity(db.session, row['user_id'], row['created_at'])
+        db.session.commit()
+
+analytics_buffer = WriteBuffer(
+    flush_analytics,
+    max_batch=app.config['ANALYTICS_BATCH_SIZE'],
+    max_delay=app.config['ANALYTICS_FLUSH_SECONDS'],
+    capacity=app.config['ANALYTICS_BUFFER_CAPACITY'],
+    name='analytics-buffer'
+)
+
+@app.cli.command('benchmark-heartbeats')
+@click.option('--events', default=5000, show_default=True, help='Her modda gönderilen olay')
+@click.option('--threads', default=8, show_default=True, help='Eşzamanlı istek thread\'i')
+def benchmark_heartbeats(events, threads):
+    """Heartbeat başına commit ile buffer'lı toplu yazımı geçici bir veritabanında karşılaştır
+
+    İstek tarafı gecikmesi olayın kabul süresidir (commit veya buffer'a
+    ekleme); olay/sn buffer'ın son flush'ı dahil tüm olaylar yazılana
+    kadar ölçülür.
+    """
+    import tempfile
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    engine = create_engine(f'sqlite:///{path}', pool_size=threads + 1, max_overflow=0)
+    sqlite_tuning.apply_pragmas(engine, sqlite_tuning.pragmas_from_config(app.config))
+    insert = VideoAnalytics.__table__.insert()
+    
+    def heartbeat(n):
+        return analytics_row(n % 500 + 1, n % 2000 + 1, {
+            'watch_duration': n % 600, 'watch_percentage': n % 100,
+            'pause_timestamps': [n % 600], 'completed': False
+        })
+    
+    def per_event(row):
+        with engine.begin() as connection:
+            connection.execute(insert, row)
+    
+    def write_batch(rows):
+        with engine.begin() as connection:
+            connection.execute(insert, rows)
+    
+    try:
+        db.metadata.create_all(engine)
+        buffer = WriteBuffer(
+            write_batch,
+            max_batch=app.config['ANALYTICS_BATCH_SIZE'],
+            max_delay=app.config['ANALYTICS_FLUSH_SECONDS'],
+            capacity=app.config['ANALYTICS_BUFFER_CAPACITY'],
+            name='benchmark-heartbeats'
+        )
+        modes = {
+            'commit per heartbeat': per_event,
+            f"buffered (batch {app.config['ANALYTICS_BATCH_SIZE']})": buffer.add,
+        }
+        print(f"{'mode':<28}{'events/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'commits':>9}")
+        for label, accept in modes.items():
+            rows = [heartbeat(n) for n in range(events)]
+            
+            def timed(row):
+                started = time.perf_counter()
+                accept(row)
+                return (time.perf_counter() - started) * 1000
+            
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                latencies = sorted(executor.map(timed, rows))
+            if accept == buffer.add:
+                buffer.close()
+                commits = buffer.flushed_batches
+            else:
+                commits = events
+            elapsed = time.perf_counter() - started
+            p50 = latencies[len(latencies) // 2]
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(f"{label:<28}{events / elapsed:>10,.0f}{p50:>9.2f}{p99:>9.2f}{latencies[-1]:>9.2f}{commits:>9}")
+        with engine.connect() as connection:
+            written = connection.execute(select(func.count()).select_from(VideoAnalytics.__table__)).scalar()
+        print(f"✅ {written} olay yazıldı (beklenen {2 * events})")
+    finally:
+        engine.dispose()
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            try:
+                os.remove(path + suffix)
+            except OSError:
+                pass
+
+def flush_view_counts(counts):
+    """Biriken izlenmeleri video başına tek UPDATE ile yaz (executemany)"""
+    with app.app_context():
+        stmt = update(Video.__table__)\
+            .where(Video.__table__.c.id == bindparam('video_id'))\
+            .values(view_count=Video.__table__.c.view_count + bindparam('views'))
+        db.session.execute(stmt, [
+            {'video_id': video_id, 'views': views} for video_id, views in counts.items()
+        ])
+        db.session.commit()
+
+view_counter = ShardedCounter(
+    flush_view_counts,
+    interval=app.config['VIEW_COUNT_FLUSH_SECONDS'],
+    name='view-counter'
+)
+
+class RevokedToken(db.Model):
+    """İptal edilen token'lar (çıkış, refresh rotasyonu) - süresi dolunca silinir"""
+    __tablename__ = 'revoked_tokens'
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), unique=True, nullable=False)
+    token_type = db.Column(db.String(16), nullable=False)  # access, refresh
+    user_id = db.Column(db.Integer, index=True)
+    expires_at = db.Column(db.DateTime, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 # ============================================
 # AUTH ROUTES
 # ============================================
 
+# JWT korumalı isteklerde current_user önbellekten gelir (veritabanı
+# yalnızca önbellekte yoksa okunur); silinmiş kullanıcı 401 alır
+PROFILE_FIELDS = ('name', 'email', 'level', 'xp', 'exam_type', 'grade_level',
+                  'learning_style', 'emotional_state', 'ai_personality')
+identity_cache.init_app(app, jwt, db, User, PROFILE_FIELDS)
+
+@jwt.user_lookup_error_loader
+def user_not_found(jwt_header, jwt_data):
+    return jsonify({'error': 'Kullanıcı bulunamadı'}), 401
+
+# İptal listesi: korumalı her istekte Bloom filtresi (sorgu yok)
+revocation_list.init_app(app, jwt, db, RevokedToken)
+
 @app.route('/api/auth/register', methods=['POST'])
 def register():
     """Kullanıcı kaydı"""
@@ -189,10 +1078,11 @@ def register():
     db.session.add(user)
     db.session.commit()
     
-    token = create_access_token(identity=user.id)
+    tokens = issue_tokens(user.id)
     
     return jsonify({
-        'token': token,
+        'token': tokens['access_token'],
+        'refresh_token': tokens['refresh_token'],
         'user': {
             'id': user.id,
             'name': user.name,
@@ -212,10 +1102,11 @@ def login():
     if not user or not check_password_hash(user.password_hash, data['password']):
         return jsonify({'error': 'Email veya şifre hatalı'}), 401
     
-    token = create_access_token(identity=user.id)
+    tokens = issue_tokens(user.id)
     
     return jsonify({
-        'token': token,
+        'token': tokens['access_token'],
+        'refresh_token': tokens['refresh_token'],
         'user': {
             'id': user.id,
             'name': user.name,
@@ -226,6 +1117,38 @@ def login():
         }
     })
 
+@app.route('/api/auth/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """Refresh token ile yeni token çifti; kullanılan refresh token iptal edilir"""
+    identity = get_jwt_identity()
+    revocation_list.revoke(db.session, get_jwt())
+    db.session.commit()
+    
+    tokens = issue_tokens(identity)
+    return jsonify({'token': tokens['access_token'], 'refresh_token': tokens['refresh_token']})
+
+@app.route('/api/auth/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    """Çıkış: access token ve onunla verilen refresh token iptal edilir"""
+    revocation_list.logout(db.session, get_jwt())
+    db.session.commit()
+    return jsonify({'status': 'success'})
+
+@app.cli.command('purge-revoked-tokens')
+def purge_revoked_tokens():
+    """Süresi dolmuş token'ların iptal kayıtlarını sil"""
+    upgrade_schema()
+    deleted = revocation_list.purge()
+    print(f"✅ {deleted} süresi dolmuş iptal kaydı silindi")
+
+@app.route('/api/auth/me', methods=['GET'])
+@jwt_required()
+def me():
+    """Oturumdaki kullanıcının profili (önbellekten, veritabanına gitmeden)"""
+    return jsonify({'user': current_user.to_dict()})
+
 # ============================================
 # AI TUTOR ROUTES - Sokratik Yöntem
 # ============================================
@@ -301,29 +1224,86 @@ def ai_tutor_chat():
 @app.route('/api/ai-tutor/sessions', methods=['GET'])
 @jwt_required()
 def get_ai_sessions():
-    """Kullanıcının AI sohbet geçmişi"""
+    """
+    Kullanıcının AI oturumları, en yeni başlatılan önce (sayfalı)
+    
+    Query: ?limit=20&cursor=<next_cursor>&fields=session_id,message_count
+    
+    Sayfalama değişmeyen (created_at, id) üzerindedir: her mesaj
+    updated_at'i değiştirdiği için ona göre sıralamak, istemci sayfa
+    gezerken oturumları sayfalar arasında kaydırır (tekrar/atlama).
+    Son aktiviteye göre sıralama gerekiyorsa updated_at alanı dönülür.
+    """
     user_id = get_jwt_identity()
     
-    conversations = AIConversation.query\
-        .filter_by(user_id=user_id)\
-        .order_by(AIConversation.created_at.desc())\
-        .limit(50).all()
+    try:
+        sessions, next_cursor = paginate(
+            TutorSession.query.filter_by(user_id=user_id),
+            {
+                'session_id': TutorSession.session_id,
+                'message_count': TutorSession.message_count,
+                'last_message_preview': TutorSession.last_message_preview,
+                'created_at': TutorSession.created_at,
+                'updated_at': TutorSession.updated_at
+            },
+            request.args,
+            TutorSession.created_at,
+            TutorSession.id
+        )
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'total': len(sessions),
+        'sessions': sessions,
+        'next_cursor': next_cursor
+    })
+
+TRANSCRIPT_FIELDS = {
+    'id': AIConversation.id,
+    'message': AIConversation.message,
+    'response': AIConversation.response,
+    'question_type': AIConversation.question_type,
+    'timestamp': AIConversation.created_at
+}
+
+@app.route('/api/ai-tutor/sessions/<session_id>/messages', methods=['GET'])
+@jwt_required()
+def get_ai_session_messages(session_id):
+    """
+    Bir oturumun mesajları, yeniden eskiye (sayfalı)
     
-    # Session'lara göre grupla
-    sessions = {}
-    for conv in conversations:
-        if conv.session_id not in sessions:
-            sessions[conv.session_id] = []
-        
-        sessions[conv.session_id].append({
-            'message': conv.message,
-            'response': conv.response,
-            'timestamp': conv.created_at.isoformat()
-        })
+    Query: ?limit=50&cursor=<next_cursor>&fields=message,response,timestamp
+    """
+    user_id = get_jwt_identity()
+    
+    try:
+        # Sıkıştırılmış sütunlar yalnızca metin istendiğinde okunur
+        requested = parse_fields(request.args.get('fields'), TRANSCRIPT_FIELDS)
+        packed = [f'{name}_z' for name in ('message', 'response') if name in requested]
+        messages, next_cursor = paginate(
+            AIConversation.query.filter_by(user_id=user_id, session_id=session_id),
+            dict(TRANSCRIPT_FIELDS, message_z=AIConversation.message_z, response_z=AIConversation.response_z),
+            request.args,
+            AIConversation.created_at,
+            AIConversation.id,
+            default_fields=list(TRANSCRIPT_FIELDS),
+            always=packed,
+            default_limit=50
+        )
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    for message in messages:
+        for name in ('message', 'response'):
+            blob = message.pop(f'{name}_z', None)
+            if blob is not None and message.get(name) is None:
+                message[name] = unpack_text(blob)
     
     return jsonify({
-        'total_sessions': len(sessions),
-        'sessions': sessions
+        'session_id': session_id,
+        'messages': messages,
+        'next_cursor': next_cursor
     })
 
 # ============================================
@@ -393,11 +1373,9 @@ def photo_solve():
         difficulty=solution['difficulty']
     )
     db.session.add(photo_solution)
-    db.session.commit()
     
-    # XP ver
-    user = User.query.get(user_id)
-    user.xp += 20
+    # XP ver (aynı commit içinde)
+    award_xp(db.session, {user_id: 20}, 'photo_solved')
     db.session.commit()
     
     return jsonify(solution)
@@ -405,25 +1383,120 @@ def photo_solve():
 @app.route('/api/photo-solver/history', methods=['GET'])
 @jwt_required()
 def photo_history():
-    """Çözülen fotoğraf geçmişi"""
+    """
+    Çözülen fotoğraf geçmişi (sayfalı)
+    
+    Query: ?limit=20&cursor=<next_cursor>&fields=id,problem_text
+    """
     user_id = get_jwt_identity()
     
-    solutions = PhotoSolution.query\
-        .filter_by(user_id=user_id)\
-        .order_by(PhotoSolution.created_at.desc())\
-        .limit(20).all()
+    try:
+        solutions, next_cursor = paginate(
+            PhotoSolution.query.filter_by(user_id=user_id),
+            {
+                'id': PhotoSolution.id,
+                'problem_text': PhotoSolution.problem_text,
+                'problem_type': PhotoSolution.problem_type,
+                'difficulty': PhotoSolution.difficulty,
+                'created_at': PhotoSolution.created_at
+            },
+            request.args,
+            PhotoSolution.created_at,
+            PhotoSolution.id
+        )
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
         'total': len(solutions),
-        'solutions': [{
-            'id': s.id,
-            'problem_text': s.problem_text,
-            'problem_type': s.problem_type,
-            'difficulty': s.difficulty,
-            'created_at': s.created_at.isoformat()
-        } for s in solutions]
+        'solutions': solutions,
+        'next_cursor': next_cursor
+    })
+
+# ============================================
+# HISTORY (arşiv)
+# ============================================
+
+@app.route('/api/history', methods=['GET'])
+@jwt_required()
+def history_summary():
+    """Arşivlenmiş aylar: kullanıcının aylık özetleri ve sorgulanabilir aylar"""
+    user_id = get_jwt_identity()
+    
+    rollups = MonthlyRollup.query.filter_by(user_id=user_id)\
+        .order_by(MonthlyRollup.month.desc()).all()
+    months = db.session.execute(
+        select(ArchivedMonth.source, ArchivedMonth.month).order_by(ArchivedMonth.month.desc())
+    ).all()
+    
+    return jsonify({
+        'months': [{
+            'month': r.month,
+            'video_events': r.video_events,
+            'videos_completed': r.videos_completed,
+            'watch_seconds': r.watch_seconds,
+            'ai_messages': r.ai_messages
+        } for r in rollups],
+        'archives': {
+            name: [month for source, month in months if source == table.name]
+            for name, table in ARCHIVE_SOURCES.items()
+        }
     })
 
+@app.route('/api/history/<source>/<month>', methods=['GET'])
+@jwt_required()
+def history_rows(source, month):
+    """
+    Bir ayın arşivlenmiş satırları (sayfalı)
+    
+    source: video-analytics | ai-conversations, month: YYYY-MM
+    Query: ?limit=50&cursor=<next_cursor>&fields=...&session_id=
+    """
+    user_id = get_jwt_identity()
+    
+    table = ARCHIVE_SOURCES.get(source)
+    if table is None:
+        return jsonify({'error': 'Bilinmeyen arşiv'}), 404
+    try:
+        month = archive.parse_month(month)
+    except ValueError:
+        return jsonify({'error': 'Ay YYYY-AA biçiminde olmalı'}), 400
+    if not ArchivedMonth.query.filter_by(source=table.name, month=month).first():
+        return jsonify({'month': month, 'rows': [], 'next_cursor': None})
+    
+    rows = archived_table(table, month)
+    fields = {
+        name: column for name, column in rows.c.items()
+        if name not in ('user_id', 'message_z', 'response_z')
+    }
+    query = db.session.query(rows).filter(rows.c.user_id == user_id)
+    if 'session_id' in rows.c and request.args.get('session_id'):
+        query = query.filter(rows.c.session_id == request.args['session_id'])
+    
+    try:
+        requested = parse_fields(request.args.get('fields'), fields)
+        packed = [f'{name}_z' for name in ('message', 'response') if name in requested]
+        items, next_cursor = paginate(
+            query,
+            dict(fields, **{name: rows.c[name] for name in packed}),
+            request.args,
+            rows.c.created_at,
+            rows.c.id,
+            default_fields=list(fields),
+            always=packed,
+            default_limit=50
+        )
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    for item in items:
+        for name in ('message', 'response'):
+            blob = item.pop(f'{name}_z', None)
+            if blob is not None and item.get(name) is None:
+                item[name] = unpack_text(blob)
+    
+    return jsonify({'month': month, 'rows': items, 'next_cursor': next_cursor})
+
 # ============================================
 # VIDEO ROUTES
 # ============================================
@@ -431,7 +1504,12 @@ def photo_history():
 @app.route('/api/video/quiz-completed', methods=['POST'])
 @jwt_required()
 def video_quiz_completed():
-    """Quiz sonrası video tetikle"""
+    """Quiz sonrası video tetikle
+
+    Quiz sonucu ve XP her zaman kaydedilir. Video üretimi kullanıcı başına
+    'video-generation' limitine tabidir; limit dolduysa video oluşturulmaz
+    ve yanıtta video_deferred + retry_after döner.
+    """
     user_id = get_jwt_identity()
     data = request.get_json()
     
@@ -450,6 +1528,19 @@ def video_quiz_completed():
     db.session.add(performance)
     db.session.commit()
     
+    # Video üretimi limitli; quiz kaydı ve XP limitten etkilenmez
+    video_allowed, retry_after = rate_limiter.try_acquire('video-generation')
+    if not video_allowed:
+        award_xp(db.session, {user_id: data.get('score') or 0}, 'quiz_completed')
+        db.session.commit()
+        return jsonify({
+            'status': 'success',
+            'message': 'Quiz kaydedildi; video üretim limiti doldu',
+            'video_id': None,
+            'video_deferred': True,
+            'retry_after': math.ceil(retry_after)
+        })
+    
     # Video üretimi tetikle (async background task)
     # Şimdilik demo video oluştur
     
@@ -470,11 +1561,9 @@ def video_quiz_completed():
         status='processing'
     )
     db.session.add(video)
-    db.session.commit()
     
-    # XP ver
-    user = User.query.get(user_id)
-    user.xp += data.get('score', 0)
+    # XP ver (aynı commit içinde)
+    award_xp(db.session, {user_id: data.get('score') or 0}, 'quiz_completed')
     db.session.commit()
     
     return jsonify({
@@ -487,26 +1576,37 @@ def video_quiz_completed():
 @app.route('/api/video/list', methods=['GET'])
 @jwt_required()
 def video_list():
-    """Video listesi"""
+    """
+    Video listesi (sayfalı)
+    
+    Query: ?limit=20&cursor=<next_cursor>&fields=id,title,status
+    """
     user_id = get_jwt_identity()
     
-    videos = Video.query\
-        .filter_by(user_id=user_id)\
-        .order_by(Video.created_at.desc())\
-        .all()
+    try:
+        videos, next_cursor = paginate(
+            Video.query.filter_by(user_id=user_id),
+            {
+                'id': Video.id,
+                'title': Video.title,
+                'thumbnail_url': Video.thumbnail_url,
+                'duration_seconds': Video.duration_seconds,
+                'topic': Video.topic,
+                'status': Video.status,
+                'view_count': Video.view_count,
+                'created_at': Video.created_at
+            },
+            request.args,
+            Video.created_at,
+            Video.id
+        )
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
         'total': len(videos),
-        'videos': [{
-            'id': v.id,
-            'title': v.title,
-            'thumbnail_url': v.thumbnail_url,
-            'duration_seconds': v.duration_seconds,
-            'topic': v.topic,
-            'status': v.status,
-            'view_count': v.view_count,
-            'created_at': v.created_at.isoformat()
-        } for v in videos]
+        'videos': videos,
+        'next_cursor': next_cursor
     })
 
 @app.route('/api/video/<int:video_id>', methods=['GET'])
@@ -520,9 +1620,8 @@ def get_video(video_id):
     if not video:
         return jsonify({'error': 'Video bulunamadı'}), 404
     
-    # View count artır
-    video.view_count += 1
-    db.session.commit()
+    # View count artır (bellekte; periyodik olarak toplu yazılır)
+    view_counter.incr(video.id)
     
     return jsonify({
         'id': video.id,
@@ -538,66 +1637,85 @@ def get_video(video_id):
 def video_analytics(video_id):
     """Video izleme analitiği"""
     user_id = get_jwt_identity()
-    data = request.get_json()
+    data = request.get_json(silent=True)
     
-    analytics = VideoAnalytics(
-        video_id=video_id,
-        user_id=user_id,
-        watch_duration=data.get('watch_duration'),
-        watch_percentage=data.get('watch_percentage'),
-        pause_timestamps=data.get('pause_timestamps', []),
-        completed=data.get('completed', False)
-    )
-    db.session.add(analytics)
-    db.session.commit()
+    try:
+        row = analytics_row(user_id, video_id, data)
+    except InvalidEvent as e:
+        return jsonify({'error': str(e)}), 400
+    if unowned_video_ids(user_id, [video_id]):
+        return jsonify({'error': 'Video bulunamadı'}), 404
     
-    # Video tamamlandıysa XP ver
-    if data.get('completed'):
-        user = User.query.get(user_id)
-        user.xp += 50
-        db.session.commit()
+    # Buffer'a ekle; kayıt ve XP toplu flush sırasında yazılır
+    analytics_buffer.add(row)
     
     return jsonify({'status': 'success'})
 
+@app.route('/api/video/analytics/batch', methods=['POST'])
+@jwt_required()
+def video_analytics_batch():
+    """
+    Birden fazla izleme olayını tek istekte kaydet
+    
+    Body:
+    {
+        "events": [
+            {"video_id": 1, "watch_duration": 150, "watch_percentage": 83,
+             "pause_timestamps": [45, 120], "completed": false}
+        ]
+    }
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    events = data.get('events')
+    
+    if not isinstance(events, list) or not events:
+        return jsonify({'error': 'events listesi gerekli'}), 400
+    if len(events) > app.config['ANALYTICS_MAX_EVENTS_PER_REQUEST']:
+        return jsonify({'error': 'Çok fazla olay'}), 413
+    
+    rows = []
+    for index, item in enumerate(events):
+        try:
+            video_id = int(item['video_id'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'Her olayda geçerli video_id gerekli'}), 400
+        try:
+            rows.append(analytics_row(user_id, video_id, item))
+        except InvalidEvent as e:
+            return jsonify({'error': str(e), 'index': index}), 400
+    
+    unknown = unowned_video_ids(user_id, [row['video_id'] for row in rows])
+    if unknown:
+        return jsonify({'error': 'Video bulunamadı', 'video_ids': unknown}), 404
+    
+    analytics_buffer.extend(rows)
+    
+    return jsonify({'status': 'accepted', 'accepted': len(rows)}), 202
+
 # ============================================
 # DASHBOARD & GAMIFICATION
 # ============================================
 
+def dashboard_query(user_id):
+    """Profil + snapshot + aktivite bitmap'i; check-query-plans de bunu kontrol eder"""
+    return select(User, DashboardSnapshot, UserActivity)\
+        .outerjoin(DashboardSnapshot, DashboardSnapshot.user_id == User.id)\
+        .outerjoin(UserActivity, UserActivity.user_id == User.id)\
+        .where(User.id == user_id)
+
 @app.route('/api/dashboard', methods=['GET'])
 @jwt_required()
 def dashboard():
-    """Adaptif öğrenme dashboard"""
+    """Adaptif öğrenme dashboard (profil + hazır snapshot, tek primary key okuması)"""
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    # Performans analizi
-    performances = Performance.query\
-        .filter_by(user_id=user_id)\
-        .order_by(Performance.created_at.desc())\
-        .limit(10).all()
-    
-    subject_progress = {}
-    for perf in performances:
-        if perf.subject not in subject_progress:
-            subject_progress[perf.subject] = []
-        subject_progress[perf.subject].append(perf.score)
-    
-    # Her ders için ortalama
-    subject_averages = {
-        subject: sum(scores) / len(scores)
-        for subject, scores in subject_progress.items()
-    }
+    user, snapshot, days = db.session.execute(dashboard_query(user_id)).one()
     
-    # Başarılar
-    achievements = Achievement.query\
-        .filter_by(user_id=user_id)\
-        .order_by(Achievement.earned_at.desc())\
-        .limit(5).all()
-    
-    # Haftalık hedefler
-    weekly_goals = WeeklyGoal.query\
-        .filter_by(user_id=user_id, completed=False)\
-        .all()
+    # Snapshot henüz yoksa (eski kullanıcı) bir kez hesapla
+    if snapshot is None or snapshot.built_at is None:
+        build_dashboard_snapshot(db.session, user.id)
+        db.session.commit()
+        snapshot = DashboardSnapshot.query.get(user.id)
     
     return jsonify({
         'profile': {
@@ -607,46 +1725,66 @@ def dashboard():
             'grade_level': user.grade_level,
             'emotional_state': user.emotional_state,
             'learning_style': user.learning_style,
-            'streak_days': user.streak_days
+            # Kayıtlı değer olay olmayan günlerde eskir; bitmap'ten hesapla
+            'streak_days': activity.current_streak(
+                days.start_day, activity.decode(days.bits), today_number()
+            ) if days else 0
         },
         'progress': {
-            'subject_averages': subject_averages,
-            'total_quizzes': len(performances),
-            'videos_watched': Video.query.filter_by(user_id=user_id).count(),
-            'photos_solved': PhotoSolution.query.filter_by(user_id=user_id).count()
+            'subject_averages': snapshot.subject_averages or {},
+            'total_quizzes': snapshot.total_quizzes,
+            'videos_watched': snapshot.videos_watched,
+            'photos_solved': snapshot.photos_solved
         },
-        'achievements': [{
-            'name': a.name,
-            'icon': a.icon,
-            'date': a.earned_at.strftime('%d %B')
-        } for a in achievements],
-        'weekly_goals': [{
-            'task': g.task,
-            'progress': g.progress
-        } for g in weekly_goals]
+        'achievements': snapshot.recent_achievements or [],
+        'weekly_goals': snapshot.open_goals or []
     })
 
+@app.route('/api/activity', methods=['GET'])
+@jwt_required()
+def get_activity():
+    """Seri bilgisi ve son 365 günün aktivite takvimi (bitmap'ten)"""
+    user_id = get_jwt_identity()
+    days = UserActivity.query.get(user_id)
+    
+    return jsonify(activity.summary(
+        days.start_day if days else None,
+        activity.decode(days.bits) if days else 0,
+        today_number()
+    ))
+
 @app.route('/api/achievements', methods=['GET'])
 @jwt_required()
 def get_achievements():
-    """Tüm başarılar"""
+    """
+    Tüm başarılar (sayfalı)
+    
+    Query: ?limit=20&cursor=<next_cursor>&fields=name,icon
+    """
     user_id = get_jwt_identity()
     
-    achievements = Achievement.query\
-        .filter_by(user_id=user_id)\
-        .order_by(Achievement.earned_at.desc())\
-        .all()
+    try:
+        achievements, next_cursor = paginate(
+            Achievement.query.filter_by(user_id=user_id),
+            {
+                'id': Achievement.id,
+                'name': Achievement.name,
+                'icon': Achievement.icon,
+                'description': Achievement.description,
+                'category': Achievement.category,
+                'earned_at': Achievement.earned_at
+            },
+            request.args,
+            Achievement.earned_at,
+            Achievement.id
+        )
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
         'total': len(achievements),
-        'achievements': [{
-            'id': a.id,
-            'name': a.name,
-            'icon': a.icon,
-            'description': a.description,
-            'category': a.category,
-            'earned_at': a.earned_at.isoformat()
-        } for a in achievements]
+        'achievements': achievements,
+        'next_cursor': next_cursor
     })
 
 # ============================================
@@ -739,18 +1877,331 @@ def health():
             '✅ Achievement System',
             '✅ Weekly Goals'
         ],
+        'identity_cache': identity_cache.stats(),
+        'revocation': revocation_list.stats(),
+        'rate_limits': rate_limiter.stats(),
         'timestamp': datetime.utcnow().isoformat()
     })
 
+# ============================================
+# QUERY PLAN CHECKS
+# ============================================
+
+def hot_queries(user_id=1, cursor_time=None, cursor_id=10 ** 9):
+    """Endpoint'lerin sıcak sorguları (EXPLAIN QUERY PLAN ile kontrol edilir)"""
+    cursor_time = cursor_time or datetime.utcnow()
+    
+    def page(model, time_column, limit=20):
+        # paginate() ile aynı biçim: user_id + keyset imleç, yeniden eskiye
+        return select(model).where(
+            model.user_id == user_id,
+            or_(time_column < cursor_time, and_(time_column == cursor_time, model.id < cursor_id))
+        ).order_by(time_column.desc(), model.id.desc()).limit(limit + 1)
+    
+    def recent(model, time_column, limit):
+        return select(model).where(model.user_id == user_id)\
+            .order_by(time_column.desc()).limit(limit)
+    
+    def count(model):
+        return select(func.count()).select_from(model).where(model.user_id == user_id)
+    
+    return {
+        'login': select(User.id).where(User.email == 'ogrenci@example.com'),
+        'ai_sessions': page(TutorSession, TutorSession.created_at),
+        'ai_transcript': page(AIConversation, AIConversation.created_at, 50)
+            .where(AIConversation.session_id == 's1'),
+        'photo_history': page(PhotoSolution, PhotoSolution.created_at),
+        'video_list': page(Video, Video.created_at),
+        'video_detail': select(Video.id).where(Video.id == 1, Video.user_id == user_id),
+        'video_count': count(Video),
+        'achievements': page(Achievement, Achievement.earned_at),
+        'dashboard_snapshot': dashboard_query(user_id),
+        'dashboard_performance': recent(Performance, Performance.created_at, 10),
+        'dashboard_achievements': recent(Achievement, Achievement.earned_at, 5),
+        'dashboard_goals': select(WeeklyGoal.id).where(
+            WeeklyGoal.user_id == user_id, WeeklyGoal.completed.is_(False)
+        ),
+        'dashboard_photos': count(PhotoSolution),
+        'video_analytics_recent': recent(VideoAnalytics, VideoAnalytics.created_at, 20),
+    }
+
+def seed_plan_dataset(connection, users, rows_per_table):
+    """Plan kontrolü için büyük, rastgele dağılmış sentetik veri"""
+    now = datetime.utcnow()
+    
+    def when():
+        return now - timedelta(seconds=random.randint(0, 90 * 24 * 3600))
+    
+    def owner():
+        return random.randint(1, users)
+    
+    connection.execute(User.__table__.insert(), [
+        {'id': i, 'name': f'Öğrenci {i}', 'email': f'ogrenci{i}@example.com'}
+        for i in range(1, users + 1)
+    ])
+    for model, extra in (
+        (Performance, lambda: {'subject': 'Matematik', 'score': random.randint(0, 100)}),
+        (Video, lambda: {'title': 'Ders', 'topic': 'Geometri'}),
+        (AIConversation, lambda: {'session_id': f's{random.randint(1, 50)}', 'message': 'Soru'}),
+        (PhotoSolution, lambda: {'problem_type': 'Denklem'}),
+        (WeeklyGoal, lambda: {'task': 'Görev', 'completed': random.random() < 0.7}),
+    ):
+        connection.execute(model.__table__.insert(), [
+            dict(extra(), user_id=owner(), created_at=when()) for _ in range(rows_per_table)
+        ])
+    connection.execute(Achievement.__table__.insert(), [
+        {'user_id': owner(), 'name': 'Rozet', 'earned_at': when()} for _ in range(rows_per_table)
+    ])
+    connection.execute(VideoAnalytics.__table__.insert(), [
+        {'user_id': owner(), 'video_id': random.randint(1, rows_per_table), 'created_at': when()}
+        for _ in range(rows_per_table)
+    ])
+    connection.execute(TutorSession.__table__.insert(), [
+        {'user_id': user, 'session_id': f's{i}', 'message_count': 1, 'created_at': when(), 'updated_at': now}
+        for user in range(1, users + 1) for i in range(1, 21)
+    ])
+    connection.exec_driver_sql('ANALYZE')
+
+@app.cli.command('check-query-plans')
+@click.option('--rows', default=20000, show_default=True, help='Tablo başına sentetik satır')
+@click.option('--users', default=500, show_default=True, help='Sentetik kullanıcı sayısı')
+@click.option('--verbose', is_flag=True, help='Tüm planları yazdır')
+def check_query_plans(rows, users, verbose):
+    """Sıcak sorguların indeks kullandığını bellek içi SQLite üzerinde doğrula"""
+    engine = create_engine('sqlite://')
+    db.metadata.create_all(engine)
+    
+    with engine.begin() as connection:
+        seed_plan_dataset(connection, users, rows)
+        report = check_plans(connection, hot_queries())
+    
+    failed = 0
+    for name, result in report.items():
+        ok = not result['problems']
+        failed += 0 if ok else 1
+        print(f"{'✅' if ok else '❌'} {name}")
+        for step in (result['plan'] if verbose or not ok else []):
+            print(f"     {step}")
+    
+    print(f"{len(report) - failed}/{len(report)} sorgu indeks kullanıyor")
+    if failed:
+        raise SystemExit(1)
+
+# ============================================
+# LOAD DATA (sentetik veri)
+# ============================================
+
+LOAD_MIX = {
+    'video_analytics': 30,
+    'performance': 22,
+    'ai_conversations': 20,
+    'photo_solutions': 10,
+    'videos': 8,
+    'weekly_goals': 5,
+    'achievements': 5
+}
+LOAD_SUBJECTS = {
+    'Matematik': ['Türev', 'İntegral', 'Fonksiyonlar', 'Olasılık'],
+    'Fizik': ['Hareket', 'Elektrik', 'Optik'],
+    'Kimya': ['Mol', 'Asit-Baz', 'Organik'],
+    'Biyoloji': ['Hücre', 'Genetik', 'Ekoloji'],
+    'Geometri': ['Üçgenler', 'Çember', 'Alan']
+}
+LOAD_EXAM_TYPES = ['YKS', 'LGS', 'KPSS', 'DGS', 'ALES']
+LOAD_EMOTIONS = ['happy', 'confused', 'frustrated', 'neutral']
+
+def load_data_factories(video_ranges):
+    """Tablo başına satır üreticileri: (rng, user_id, created_at) -> dict
+
+    video_ranges: user_id -> (ilk video id, video sayısı); videolar
+    yüklendikten sonra doldurulur.
+    """
+    def subject(rng):
+        name = rng.choice(list(LOAD_SUBJECTS))
+        return name, rng.choice(LOAD_SUBJECTS[name])
+    
+    def performance(rng, user_id, created_at):
+        name, topic = subject(rng)
+        total = rng.choice([10, 20, 40])
+        correct = rng.randint(0, total)
+        return {
+            'subject': name, 'topic': topic, 'score': correct * 100 // total,
+            'correct_answers': correct, 'total_questions': total,
+            'time_spent': rng.randint(120, 3600), 'cognitive_load': rng.randint(1, 10),
+            'created_at': created_at
+        }
+    
+    def video(rng, user_id, created_at):
+        name, topic = subject(rng)
+        return {
+            'title': f'{topic} - Kişisel Ders', 'topic': topic,
+            'difficulty': rng.choice(['Kolay', 'Orta', 'Zor']),
+            'duration_seconds': rng.randint(60, 600), 'status': 'ready',
+            'view_count': int(rng.paretovariate(1.5)), 'created_at': created_at
+        }
+    
+    def video_analytics(rng, user_id, created_at):
+        first_id, count = video_ranges[user_id]
+        duration = rng.randint(10, 600)
+        percentage = min(100, int(rng.random() * 120))
+        return {
+            # Kullanıcının kendi videolarından biri
+            'video_id': first_id + rng.randrange(count),
+            'watch_duration': duration * percentage // 100, 'watch_percentage': percentage,
+            'pause_timestamps': [rng.randint(0, duration) for _ in range(rng.randint(0, 3))] or None,
+            'completed': percentage >= 90, 'created_at': created_at
+        }
+    
+    def ai_conversation(rng, user_id, created_at):
+        name, topic = subject(rng)
+        return {
+            'session_id': f'load-{user_id}-{rng.randint(1, 20)}',
+            'message': f'{topic} konusunda bu soruyu anlamadım, yardım eder misin?',
+            'response': f'Önce {topic.lower()} tanımını hatırlayalım. Sence ilk adım ne olmalı?',
+            'student_emotion': rng.choice(LOAD_EMOTIONS), 'ai_emotion': 'supportive',
+            'question_type': rng.choice(['clarifying', 'probing', 'guiding']),
+            'created_at': created_at
+        }
+    
+    def photo_solution(rng, user_id, created_at):
+        name, topic = subject(rng)
+        return {
+            'problem_type': topic, 'problem_text': f'{topic} sorusu',
+            'difficulty': rng.choice(['Kolay', 'Orta', 'Zor']),
+            'time_spent': rng.randint(5, 120), 'created_at': created_at
+        }
+    
+    def achievement(rng, user_id, created_at):
+        return {
+            'name': rng.choice(['İlk Adım', 'Video Kurdu', 'Seri Ustası', 'Soru Avcısı']),
+            'icon': '🏆', 'category': rng.choice(['video', 'exam', 'streak']),
+            'earned_at': created_at
+        }
+    
+    def weekly_goal(rng, user_id, created_at):
+        progress = rng.choice([0, 25, 50, 75, 100])
+        return {
+            'task': f'{rng.randint(3, 10)} video izle', 'progress': progress,
+            'completed': progress == 100,
+            'week_start': (created_at - timedelta(days=created_at.weekday())).date(),
+            'created_at': created_at
+        }
+    
+    return {
+        'videos': video,
+        'performance': performance,
+        'video_analytics': video_analytics,
+        'ai_conversations': ai_conversation,
+        'photo_solutions': photo_solution,
+        'achievements': achievement,
+        'weekly_goals': weekly_goal
+    }
+
+@app.cli.command('generate-load-data')
+@click.option('--users', default=10000, show_default=True, help='Eklenecek kullanıcı sayısı')
+@click.option('--rows', default=1000000, show_default=True, help='Kullanıcılar dışındaki toplam satır')
+@click.option('--seed', default=42, show_default=True, help='Aynı seed aynı veriyi üretir')
+@click.option('--days', default=180, show_default=True, help='Kaç günlük geçmiş')
+@click.option('--end-date', default=None, help='Son gün (YYYY-AA-GG, varsayılan: bugün)')
+@click.option('--alpha', default=synthetic.DEFAULT_ALPHA, show_default=True, help='Pareto üssü (küçük = daha dengesiz)')
+@click.option('--batch', default=5000, show_default=True, help='executemany başına satır')
+def generate_load_data(users, rows, seed, days, end_date, alpha, batch):
+    """Güç yasası dağılımlı sentetik kullanıcı ve aktivite verisi yükle"""
+    upgrade_schema()
+    engine = db.engine
+    end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else None
+    
+    def next_id(model):
+        return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+    
+    population = synthetic.Population(seed, users, next_id(User), days, end, alpha)
+    totals = synthetic.split(rows, LOAD_MIX)
+    started = datetime.utcnow()
+    
+    # Kullanıcılar: ağır kullanıcılar daha eski ve daha çok XP'li
+    rng = population.rng('user_fields')
+    # Tuz seed'den türetilir ki çıktı birebir aynı olsun (şifre: load-test)
+    salt = f'load{seed}'
+    digest = hashlib.pbkdf2_hmac('sha256', b'load-test', salt.encode(), 600000).hex()
+    password_hash = f'pbkdf2:sha256:600000${salt}${digest}'
+    user_rows = []
+    for user_id, weight, joined in zip(population.user_ids, population.weights, population.joined):
+        xp = min(int(weight * 200), 100000)
+        user_rows.append({
+            'id': user_id, 'name': f'Yük Öğrenci {user_id}', 'email': f'load{user_id}@example.com',
+            'password_hash': password_hash, 'exam_type': rng.choice(LOAD_EXAM_TYPES),
+            'grade_level': f'{rng.randint(9, 12)}. Sınıf',
+            'learning_style': rng.choice(['Görsel', 'İşitsel', 'Kinestetik']),
+            'xp': xp, 'level': level_for(xp), 'streak_days': 0, 'created_at': joined
+        })
+    inserted = {'users': synthetic.bulk_insert(engine, User.__table__, user_rows, batch)}
+    
+    # Videolar önce: analitikler kullanıcının kendi video aralığına bağlanır
+    video_ranges = {}
+    factories = load_data_factories(video_ranges)
+    first_video = next_id(Video)
+    video_rows, ranges = population.rows('videos', totals['videos'], factories.pop('videos'), first_video)
+    inserted['videos'] = synthetic.bulk_insert(engine, Video.__table__, video_rows, batch)
+    for user_id, (first_id, count) in zip(population.user_ids, ranges):
+        # Videosu olmayan kullanıcılar herhangi bir videoyu izlemiş sayılır
+        video_ranges[user_id] = (first_id, count) if count else (first_video, inserted['videos'])
+    if not inserted['videos']:
+        totals['video_analytics'] = 0
+    
+    models = {model.__tablename__: model for model in (
+        Performance, VideoAnalytics, AIConversation, PhotoSolution, Achievement, WeeklyGoal
+    )}
+    for name, factory in factories.items():
+        model = models[name]
+        table_rows, _ = population.rows(name, totals[name], factory, next_id(model))
+        inserted[name] = synthetic.bulk_insert(engine, model.__table__, table_rows, batch)
+        print(f"   {name}: {inserted[name]}")
+    
+    elapsed = max((datetime.utcnow() - started).total_seconds(), 0.001)
+    total = sum(inserted.values())
+    print(f"✅ {total} satır yüklendi ({elapsed:.1f} sn, {total / elapsed:,.0f} satır/sn)")
+    print(f"   seed={seed} end-date={population.end:%Y-%m-%d} (aynı veriyi üretmek için)")
+    print("   Türetilmiş tablolar için: flask rebuild-dashboards, backfill-tutor-sessions, backfill-activity")
+
 # ============================================
 # INITIALIZE DATABASE
 # ============================================
 
+# Mevcut tablolara sonradan eklenen sütunlar (create_all bunları eklemez)
+ADDED_COLUMNS = {
+    'ai_conversations': ('message_z', 'response_z'),
+}
+
+def upgrade_schema():
+    """Tabloları, sonradan eklenen indeksleri ve sütunları oluştur"""
+    db.create_all()
+    # create_all mevcut tablolara sonradan eklenen indeksleri oluşturmaz
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+    
+    # ...ne de sütunları: eksik olanlar ALTER TABLE ile boş (NULL) eklenir
+    inspector = inspect(db.engine)
+    for table_name, column_names in ADDED_COLUMNS.items():
+        existing = {column['name'] for column in inspector.get_columns(table_name)}
+        for name in column_names:
+            if name in existing:
+                continue
+            column = db.metadata.tables[table_name].c[name]
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {name} {column_type}'))
+            print(f"✅ {table_name}.{name} sütunu eklendi")
+
 @app.before_request
 def create_tables():
     """İlk istekten önce tabloları oluştur"""
     if not hasattr(app, 'db_initialized'):
-        db.create_all()
+        upgrade_schema()
+        # tutor_sessions sonradan eklendi; boşsa mevcut sohbetlerden doldur
+        if not db.session.query(TutorSession.id).first() and \
+                db.session.query(AIConversation.id).filter(AIConversation.session_id.isnot(None)).first():
+            print(f"✅ {rebuild_tutor_sessions()} AI oturumu oluşturuldu")
         app.db_initialized = True
         print("✅ Database tabloları oluşturuldu")
 
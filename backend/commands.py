@@ -0,0 +1,202 @@
+"""Flask CLI commands for the blueprint application.
+
+``flask --app 'backend.app:create_app' generate-load-data`` fills the
+``users`` table (and the per-user ``videos`` library) with synthetic
+rows for load tests. Activity follows a power law and the output is
+fully determined by ``--seed`` and ``--end-date``; see
+``services/synthetic.py``.
+
+``flask --app 'backend.app:create_app' benchmark-sqlite`` compares read
+latency under concurrent writes with SQLite's defaults and with the
+configured pragmas (see ``services/sqlite_tuning.py``).
+
+``flask --app 'backend.app:create_app' import-roster roster.csv`` bulk
+registers students from a CSV or NDJSON roster and writes a per-row
+NDJSON report (see ``services/roster.py``).
+
+``flask --app 'backend.app:create_app' purge-revoked-tokens`` deletes
+revocation entries of tokens that have expired anyway.
+
+``flask --app 'backend.app:create_app' benchmark-passwords`` prints
+logins per second per core for each password hashing cost (see
+``services/passwords.py``).
+
+``flask --app 'backend.app:create_app' benchmark-http`` compares a new
+HTTP client per call with the shared pooled client against a local
+server with artificial latency (see ``services/http_client.py``).
+"""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+
+import click
+from flask import Flask
+from sqlalchemy import func, select
+
+from .app import db
+from .models.user import User
+from .models.video import VIDEO_READY, Video
+from .services import http_client, passwords, roster, sqlite_tuning, synthetic
+
+LOAD_TOPICS = ['Türev', 'İntegral', 'Olasılık', 'Hareket', 'Elektrik', 'Hücre', 'Genetik', 'Üçgenler']
+LOAD_PASSWORD = 'load-test'
+
+
+def _next_id(model: type) -> int:
+    return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _password_hash(seed: int) -> str:
+    # Werkzeug's pbkdf2 format with a salt derived from the seed, so the
+    # rows are identical between runs and every user can log in.
+    salt = f'load{seed}'
+    digest = hashlib.pbkdf2_hmac('sha256', LOAD_PASSWORD.encode(), salt.encode(), 600000).hex()
+    return f'pbkdf2:sha256:600000${salt}${digest}'
+
+
+def _video_row(rng, user_id: int, created_at: datetime) -> dict:
+    topic = rng.choice(LOAD_TOPICS)
+    return {
+        'topic_id': topic.lower(),
+        'title': f'{topic} - Kişisel Ders',
+        'status': VIDEO_READY,
+        'size_bytes': rng.randint(5, 80) * 1024 * 1024,
+        'created_at': created_at,
+        'updated_at': created_at,
+    }
+
+
+def init_app(app: Flask) -> None:
+    """Register the CLI commands on ``app``."""
+
+    @app.cli.command('generate-load-data')
+    @click.option('--users', default=10000, show_default=True, help='Users to add')
+    @click.option('--videos', default=100000, show_default=True, help='Videos to add across all users')
+    @click.option('--seed', default=42, show_default=True, help='The same seed produces the same rows')
+    @click.option('--days', default=180, show_default=True, help='Days of history')
+    @click.option('--end-date', default=None, help='Last day (YYYY-MM-DD, default: today)')
+    @click.option('--alpha', default=synthetic.DEFAULT_ALPHA, show_default=True, help='Pareto exponent')
+    @click.option('--batch', default=5000, show_default=True, help='Rows per executemany')
+    def generate_load_data(users, videos, seed, days, end_date, alpha, batch):
+        """Bulk-load synthetic users and videos."""
+        db.create_all(bind_key=None)
+        engine = db.engines[None]
+        end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else None
+        started = datetime.utcnow()
+
+        population = synthetic.Population(seed, users, _next_id(User), days, end, alpha)
+        password_hash = _password_hash(seed)
+        user_rows = (
+            {'id': user_id, 'username': f'load_user_{user_id}',
+             'email': f'load{user_id}@example.com', 'password_hash': password_hash}
+            for user_id in population.user_ids
+        )
+        inserted = synthetic.bulk_insert(engine, User.__table__, user_rows, batch)
+        video_rows, _ = population.rows('videos', videos, _video_row, _next_id(Video))
+        inserted += synthetic.bulk_insert(engine, Video.__table__, video_rows, batch)
+
+        elapsed = max((datetime.utcnow() - started).total_seconds(), 0.001)
+        click.echo(f'Loaded {inserted} rows in {elapsed:.1f}s ({inserted / elapsed:,.0f} rows/s)')
+        click.echo(f'seed={seed} end-date={population.end:%Y-%m-%d} password={LOAD_PASSWORD}')
+
+    @app.cli.command('benchmark-sqlite')
+    @click.option('--seconds', default=5.0, show_default=True, help='Duration of each run')
+    @click.option('--readers', default=4, show_default=True, help='Concurrent reader threads')
+    @click.option('--write-batch', default=500, show_default=True, help='Rows per write transaction')
+    def benchmark_sqlite(seconds, readers, write_batch):
+        """Read latency while writes run: SQLite defaults vs configured pragmas."""
+        runs = {
+            'default (rollback journal)': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+            'configured': sqlite_tuning.pragmas_from_config(app.config),
+        }
+        click.echo(f"{'mode':<28}{'reads/s':>9}{'commits/s':>11}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}")
+        for label, pragmas in runs.items():
+            result = sqlite_tuning.benchmark(pragmas, seconds, readers, write_batch)
+            click.echo(
+                f"{label:<28}{result['reads_per_second']:>9}{result['commits_per_second']:>11}"
+                f"{result['read_p50_ms']:>9}{result['read_p99_ms']:>9}{result['read_max_ms']:>9}{result['errors']:>8}"
+            )
+
+    @app.cli.command('import-roster')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', default='', help='csv or ndjson (default: from the file name)')
+    @click.option('--batch', default=None, type=int, help='Students per transaction (default: ROSTER_IMPORT_BATCH_SIZE)')
+    @click.option('--workers', default=None, type=int, help='Hashing processes (default: ROSTER_IMPORT_WORKERS)')
+    @click.option('--report', default='-', show_default=True, help='NDJSON report file (- for stdout)')
+    def import_roster(path, fmt, batch, workers, report):
+        """Bulk-register students from a CSV or NDJSON roster."""
+        batch = batch or app.config['ROSTER_IMPORT_BATCH_SIZE']
+        workers = app.config['ROSTER_IMPORT_WORKERS'] if workers is None else workers
+        db.create_all(bind_key=None)
+        started = datetime.utcnow()
+        with open(path, 'rb') as stream, click.open_file(report, 'w', encoding='utf-8') as out:
+            try:
+                records = roster.read_records(stream, roster.detect_format(path, '', fmt))
+            except roster.RosterError as e:
+                raise click.ClickException(str(e))
+            pool = passwords.process_pool(workers) if workers > 0 else None
+            try:
+                importer = roster.RosterImport(
+                    db.engines[None], User.__table__, app.extensions['password_hasher'].method,
+                    batch, pool, max(1, batch // (max(workers, 1) * 4)),
+                )
+                for line in roster.ndjson_lines(importer.run(records), importer):
+                    out.write(line)
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+        summary = importer.summary()
+        elapsed = max((datetime.utcnow() - started).total_seconds(), 0.001)
+        click.echo(
+            f"{summary['created']} created, {summary['duplicate']} duplicate, {summary['invalid']} invalid "
+            f"in {elapsed:.1f}s ({summary['total'] / elapsed:,.0f} rows/s)",
+            err=report == '-',
+        )
+
+    @app.cli.command('purge-revoked-tokens')
+    def purge_revoked_tokens():
+        """Delete revocation entries of tokens past their expiry."""
+        db.create_all(bind_key=None)
+        deleted = app.extensions['revocation_list'].purge()
+        click.echo(f'Deleted {deleted} expired revocation entries')
+
+    @app.cli.command('benchmark-passwords')
+    @click.option('--rounds', default=5, show_default=True, help='Checks timed per method')
+    @click.option('--workers', default=0, show_default=True, help='Also measure a process pool of this size')
+    @click.option('--method', 'methods', multiple=True, help='Method to measure (repeatable, default: a standard set)')
+    def benchmark_passwords(rounds, workers, methods):
+        """Logins per second per core at each password hashing cost."""
+        configured = app.extensions['password_hasher'].method
+        if not methods:
+            methods = passwords.BENCHMARK_METHODS + [m for m in [configured] if m not in passwords.BENCHMARK_METHODS]
+        header = f"{'method':<24}{'ms/login':>10}{'logins/s/core':>15}"
+        if workers:
+            header += f"{f'pool x{workers}':>12}"
+        click.echo(header)
+        for result in passwords.benchmark(methods, rounds, workers):
+            marker = ' *' if result['method'] == configured else ''
+            line = f"{result['method']:<24}{result['ms_per_login']:>10}{result['logins_per_second_per_core']:>15}"
+            if workers:
+                line += f"{result['pool_logins_per_second']:>12}"
+            click.echo(line + marker)
+        click.echo('* PASSWORD_HASH_METHOD')
+
+    @app.cli.command('benchmark-http')
+    @click.option('--calls', default=400, show_default=True, help='Requests per run')
+    @click.option('--concurrency', default=10, show_default=True, help='Concurrent caller threads')
+    @click.option('--latency-ms', default=20.0, show_default=True, help='Server delay per response')
+    @click.option('--handshake-ms', default=30.0, show_default=True, help='Server delay per new connection')
+    @click.option('--per-host', default=None, type=int, help='Shared client limit (default: HTTP_PER_HOST_LIMIT)')
+    def benchmark_http(calls, concurrency, latency_ms, handshake_ms, per_host):
+        """Per-call latency: new client per call vs. the shared pooled client."""
+        per_host = per_host or app.config['HTTP_PER_HOST_LIMIT']
+        results = http_client.benchmark(calls, concurrency, latency_ms, handshake_ms, per_host)
+        click.echo(f"{'client':<24}{'calls/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for label, result in results.items():
+            click.echo(
+                f"{label:<24}{result['calls_per_second']:>9}{result['p50_ms']:>9}"
+                f"{result['p99_ms']:>9}{result['max_ms']:>9}"
+            )
+        click.echo(f"server: {latency_ms:g} ms per response, {handshake_ms:g} ms per new connection")
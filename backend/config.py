@@ -24,10 +24,13 @@ reason about your application and avoid hard‑coding secrets in your code.
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 
 from dotenv import load_dotenv
 
+from .services.sqlite_tuning import engine_options
+
 
 # Determine the base directory of the backend package so we can locate
 # the .env file relative to this file regardless of where the app is
@@ -46,12 +49,54 @@ class Config:
     # Flask secrets
     JWT_SECRET_KEY: str = os.environ.get('JWT_SECRET_KEY', 'super-secret-key')
 
+    # Short-lived access tokens plus refresh tokens (POST /api/auth/refresh).
+    # Logged-out and rotated tokens are kept in ``revoked_tokens`` and
+    # checked through an in-memory Bloom filter sized for
+    # JWT_REVOCATION_CAPACITY ids at JWT_REVOCATION_ERROR_RATE false
+    # positives; revocations from other processes are picked up every
+    # JWT_REVOCATION_REFRESH_SECONDS (see ``services/revocation.py``).
+    JWT_ACCESS_TOKEN_EXPIRES: timedelta = timedelta(minutes=int(os.environ.get('JWT_ACCESS_TOKEN_MINUTES', '15')))
+    JWT_REFRESH_TOKEN_EXPIRES: timedelta = timedelta(days=int(os.environ.get('JWT_REFRESH_TOKEN_DAYS', '30')))
+    JWT_REVOCATION_CAPACITY: int = int(os.environ.get('JWT_REVOCATION_CAPACITY', '100000'))
+    JWT_REVOCATION_ERROR_RATE: float = float(os.environ.get('JWT_REVOCATION_ERROR_RATE', '0.001'))
+    JWT_REVOCATION_REFRESH_SECONDS: float = float(os.environ.get('JWT_REVOCATION_REFRESH_SECONDS', '5'))
+
     # SQLAlchemy
     SQLALCHEMY_DATABASE_URI: str = os.environ.get(
         'DATABASE_URL', f"sqlite:///{(BASE_DIR / 'app.db').as_posix()}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
 
+    # Optional read replica. When set, reads made while serving GET/HEAD
+    # requests go to this bind and everything else to the primary (see
+    # ``services/db_routing.py``). For local testing use a read-only
+    # SQLite copy, e.g. ``sqlite:///file:replica.db?mode=ro&uri=true``,
+    # refreshed with ``flask snapshot-replica``.
+    DATABASE_REPLICA_URL: str | None = os.environ.get('DATABASE_REPLICA_URL') or None
+    SQLALCHEMY_BINDS: dict = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+
+    # Connection pool, applied to the primary and the replica. In-memory
+    # SQLite databases keep Flask-SQLAlchemy's single static connection.
+    DB_POOL_SIZE: int = int(os.environ.get('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW: int = int(os.environ.get('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.environ.get('DB_POOL_TIMEOUT_SECONDS', '30'))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.environ.get('DB_POOL_RECYCLE_SECONDS', '1800'))
+    SQLALCHEMY_ENGINE_OPTIONS: dict = engine_options(
+        SQLALCHEMY_DATABASE_URI, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+        DB_POOL_TIMEOUT_SECONDS, DB_POOL_RECYCLE_SECONDS,
+    )
+
+    # SQLite pragmas issued on every new connection (see
+    # ``services/sqlite_tuning.py``). WAL lets readers proceed while a
+    # writer commits; NORMAL sync is safe in WAL mode. A negative cache
+    # size is in KiB. Set a value to an empty string to leave SQLite's
+    # default in place. Ignored for other databases.
+    SQLITE_JOURNAL_MODE: str = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS: str = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS: str = os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')
+    SQLITE_CACHE_SIZE: str = os.environ.get('SQLITE_CACHE_SIZE', '-64000')
+    SQLITE_MMAP_SIZE: str = os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))
+
     # CORS
     CORS_ALLOWED_ORIGINS = [
         origin.strip() for origin in os.environ.get('CORS_ALLOWED_ORIGINS', '*').split(',')
@@ -63,4 +108,96 @@ class Config:
     OPENAI_TTS_VOICE: str = os.environ.get('OPENAI_TTS_VOICE', 'alloy')
 
     # Tesseract OCR path
-    TESSERACT_CMD: str | None = os.environ.get('TESSERACT_CMD')
\ No newline at end of file
+    TESSERACT_CMD: str | None = os.environ.get('TESSERACT_CMD')
+
+    # Password hashing runs in a pool of PASSWORD_HASH_WORKERS processes
+    # per app process (0 hashes on the request thread). At most
+    # PASSWORD_HASH_MAX_PENDING checks may wait; beyond that login
+    # answers 503. PASSWORD_HASH_METHOD uses werkzeug's notation; stored
+    # hashes made with other parameters are upgraded on the next
+    # successful login. Compare costs with ``flask benchmark-passwords``.
+    PASSWORD_HASH_METHOD: str = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS: int = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '64'))
+    PASSWORD_HASH_TIMEOUT_SECONDS: float = float(os.environ.get('PASSWORD_HASH_TIMEOUT_SECONDS', '10'))
+
+    # Token-bucket limits for endpoints that start OCR, TTS, LLM or video
+    # work, keyed by URL rule: 'N/period' allows bursts of N and N per
+    # period after that, per user (or per address without a JWT).
+    # RATE_LIMITS in the environment replaces the whole table, e.g.
+    # "/api/voice/synthesize=30/minute;/api/video/generate=10/hour".
+    # RATE_LIMIT_BACKEND=sqlite shares the buckets between all workers on
+    # the host through RATE_LIMIT_SQLITE_PATH (default: instance folder).
+    RATE_LIMIT_ENABLED: bool = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    RATE_LIMIT_BACKEND: str = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_SQLITE_PATH: str | None = os.environ.get('RATE_LIMIT_SQLITE_PATH') or None
+    RATE_LIMITS: dict | str = os.environ.get('RATE_LIMITS') or {
+        '/api/photo-solver/analyze': '10/minute',
+        '/api/photo-solver/detailed-analysis': '5/minute',
+        '/api/voice/synthesize': '20/minute',
+        '/api/video/generate': '5/hour',
+        '/api/users/import': '10/hour',
+    }
+
+    # Roster imports (``POST /api/users/import``, ``flask import-roster``)
+    # insert ROSTER_IMPORT_BATCH_SIZE students per transaction and hash
+    # their passwords in a pool of ROSTER_IMPORT_WORKERS processes. Over
+    # HTTP the pool is shared, at most ROSTER_IMPORT_CONCURRENCY imports
+    # run per process, and only users whose email is in ADMIN_EMAILS may
+    # import (none by default, leaving the CLI as the only way in).
+    ROSTER_IMPORT_BATCH_SIZE: int = int(os.environ.get('ROSTER_IMPORT_BATCH_SIZE', '1000'))
+    ROSTER_IMPORT_WORKERS: int = int(os.environ.get('ROSTER_IMPORT_WORKERS', str(os.cpu_count() or 1)))
+    ROSTER_IMPORT_CONCURRENCY: int = int(os.environ.get('ROSTER_IMPORT_CONCURRENCY', '1'))
+    ADMIN_EMAILS = [
+        email.strip().lower() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()
+    ]
+
+    # ``current_user`` profiles are cached per process for
+    # IDENTITY_CACHE_TTL_SECONDS (writes in this process drop the entry
+    # at once; other processes see them after the TTL).
+    IDENTITY_CACHE_TTL_SECONDS: float = float(os.environ.get('IDENTITY_CACHE_TTL_SECONDS', '30'))
+    IDENTITY_CACHE_SIZE: int = int(os.environ.get('IDENTITY_CACHE_SIZE', '10000'))
+
+    # Background job queue. ``JOB_WORKERS`` threads are started per
+    # process; set it to 0 to disable the pool and drain the queue
+    # manually (e.g. in tests or a dedicated worker process).
+    JOB_WORKERS: int = int(os.environ.get('JOB_WORKERS', '2'))
+    JOB_MAX_ATTEMPTS: int = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+    JOB_RETRY_BACKOFF_SECONDS: float = float(os.environ.get('JOB_RETRY_BACKOFF_SECONDS', '5'))
+    JOB_RETRY_MAX_BACKOFF_SECONDS: float = float(os.environ.get('JOB_RETRY_MAX_BACKOFF_SECONDS', '300'))
+    JOB_POLL_INTERVAL_SECONDS: float = float(os.environ.get('JOB_POLL_INTERVAL_SECONDS', '1'))
+    JOB_LEASE_SECONDS: float = float(os.environ.get('JOB_LEASE_SECONDS', '600'))
+
+    # Shared outbound HTTP client (OpenAI, HeyGen). Connections are kept
+    # alive and reused across requests; HTTP_PER_HOST_LIMIT caps the
+    # concurrent requests to any single upstream host.
+    HTTP_MAX_CONNECTIONS: int = int(os.environ.get('HTTP_MAX_CONNECTIONS', '100'))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.environ.get('HTTP_MAX_KEEPALIVE_CONNECTIONS', '20'))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = float(os.environ.get('HTTP_KEEPALIVE_EXPIRY_SECONDS', '30'))
+    HTTP_PER_HOST_LIMIT: int = int(os.environ.get('HTTP_PER_HOST_LIMIT', '10'))
+    HTTP_TIMEOUT_SECONDS: float = float(os.environ.get('HTTP_TIMEOUT_SECONDS', '30'))
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.environ.get('HTTP_CONNECT_TIMEOUT_SECONDS', '5'))
+    HTTP2_ENABLED: bool = os.environ.get('HTTP2_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+    # Generated video scenarios are cached per topic, score band, mistake
+    # signature and exam type. This bounds the in-process LRU tier; the
+    # database tier is unbounded.
+    SCENARIO_CACHE_SIZE: int = int(os.environ.get('SCENARIO_CACHE_SIZE', '1024'))
+
+    # Finished HeyGen renders are streamed into content-addressed local
+    # storage in chunks of this size.
+    VIDEO_STORAGE_DIR: str = os.environ.get('VIDEO_STORAGE_DIR', (BASE_DIR / 'storage' / 'videos').as_posix())
+    VIDEO_DOWNLOAD_CHUNK_BYTES: int = int(os.environ.get('VIDEO_DOWNLOAD_CHUNK_BYTES', str(1024 * 1024)))
+    # Downloads larger than this are aborted and nothing is stored.
+    VIDEO_DOWNLOAD_MAX_BYTES: int = int(os.environ.get('VIDEO_DOWNLOAD_MAX_BYTES', str(500 * 1024 * 1024)))
+
+    # HeyGen webhooks must carry a ``Signature`` header holding the
+    # HMAC-SHA256 of the raw body keyed with this secret; while it is
+    # unset every callback is refused. Only https download URLs on these
+    # hosts (or their subdomains) are fetched.
+    HEYGEN_WEBHOOK_SECRET: str | None = os.environ.get('HEYGEN_WEBHOOK_SECRET') or None
+    HEYGEN_DOWNLOAD_HOSTS = [
+        host.strip().lower()
+        for host in os.environ.get('HEYGEN_DOWNLOAD_HOSTS', 'heygen.ai,heygen.com').split(',')
+        if host.strip()
+    ]
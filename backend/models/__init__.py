@@ -5,4 +5,8 @@ imported, the models are registered with the SQLAlchemy instance
 configured in :mod:`backend.app`.
 """
 
-from .user import User  # noqa: F401
\ No newline at end of file
+from .user import User  # noqa: F401
+from .video_job import VideoJob  # noqa: F401
+from .scenario import CachedScenario  # noqa: F401
+from .video import Video, WebhookEvent  # noqa: F401
+from .revoked_token import RevokedToken  # noqa: F401
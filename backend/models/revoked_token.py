@@ -0,0 +1,46 @@
+"""Revoked JWT model.
+
+Logging out or rotating a refresh token stores the token's ``jti``
+here until the token would have expired anyway. Requests never query
+this table directly: :mod:`backend.services.revocation` keeps a Bloom
+filter of the ids in memory and only confirms filter hits.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from ..app import db
+
+
+@dataclass
+class RevokedToken(db.Model):  # type: ignore[misc]
+    """SQLAlchemy model for a revoked access or refresh token."""
+
+    __tablename__ = 'revoked_tokens'
+
+    id: int = db.Column(db.Integer, primary_key=True)
+    jti: str = db.Column(db.String(64), unique=True, nullable=False)
+    token_type: str = db.Column(db.String(16), nullable=False)
+    user_id: Optional[int] = db.Column(db.Integer, index=True)
+    expires_at: Optional[datetime] = db.Column(db.DateTime, index=True)
+    revoked_at: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __init__(
+        self,
+        jti: str,
+        token_type: str,
+        user_id: Optional[int] = None,
+        expires_at: Optional[datetime] = None,
+        revoked_at: Optional[datetime] = None,
+    ) -> None:
+        self.jti = jti
+        self.token_type = token_type
+        self.user_id = user_id
+        self.expires_at = expires_at
+        self.revoked_at = revoked_at or datetime.utcnow()
+
+    def __repr__(self) -> str:
+        return f"<RevokedToken {self.token_type} {self.jti}>"
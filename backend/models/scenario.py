@@ -0,0 +1,53 @@
+"""Cached video scenario model.
+
+Scenario scripts only depend on the topic, the score band, the kind of
+mistakes the student made and the exam type; the student's name is
+filled in when the script is read. The ``scenario_cache`` table stores
+one placeholder template per such combination so that identical
+requests from different students reuse a single LLM generation. See
+:mod:`backend.services.scenario_cache` for the lookup logic.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ..app import db
+
+
+@dataclass
+class CachedScenario(db.Model):  # type: ignore[misc]
+    """SQLAlchemy model for a reusable scenario template."""
+
+    __tablename__ = 'scenario_cache'
+
+    id: int = db.Column(db.Integer, primary_key=True)
+    cache_key: str = db.Column(db.String(64), unique=True, nullable=False)
+    konu: str = db.Column(db.String(200), nullable=False)
+    score_band: str = db.Column(db.String(16), nullable=False)
+    mistake_signature: str = db.Column(db.String(64), nullable=False)
+    exam_type: Optional[str] = db.Column(db.String(50))
+    template: Dict[str, Any] = db.Column(db.JSON, nullable=False)
+    created_at: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __init__(
+        self,
+        cache_key: str,
+        konu: str,
+        score_band: str,
+        mistake_signature: str,
+        exam_type: Optional[str],
+        template: Dict[str, Any],
+    ) -> None:
+        self.cache_key = cache_key
+        self.konu = konu
+        self.score_band = score_band
+        self.mistake_signature = mistake_signature
+        self.exam_type = exam_type
+        self.template = template
+        self.created_at = datetime.utcnow()
+
+    def __repr__(self) -> str:
+        return f"<CachedScenario {self.konu} {self.score_band}>"
@@ -0,0 +1,96 @@
+"""Adaptive video and webhook delivery models.
+
+``Video`` is the library entry for a personalised video. It is created
+in ``processing`` state when a HeyGen render has been requested and
+flipped to ``ready`` once the finished file has been downloaded into
+local storage.
+
+``WebhookEvent`` records every provider callback that has been accepted.
+The unique constraint on ``(provider, provider_video_id, status)`` makes
+webhook handling idempotent: a redelivered callback fails the insert
+and is acknowledged without doing any work.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ..app import db
+
+
+VIDEO_PROCESSING = 'processing'
+VIDEO_READY = 'ready'
+VIDEO_FAILED = 'failed'
+
+
+@dataclass
+class Video(db.Model):  # type: ignore[misc]
+    """SQLAlchemy model for a generated video."""
+
+    __tablename__ = 'videos'
+    __table_args__ = (
+        db.Index('ix_videos_user_created', 'user_id', 'created_at'),
+    )
+
+    id: int = db.Column(db.Integer, primary_key=True)
+    user_id: int = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    topic_id: Optional[str] = db.Column(db.String(100))
+    title: Optional[str] = db.Column(db.String(200))
+    provider_video_id: Optional[str] = db.Column(db.String(100), unique=True)
+    status: str = db.Column(db.String(32), nullable=False, default=VIDEO_PROCESSING)
+    video_url: Optional[str] = db.Column(db.String(500))
+    storage_key: Optional[str] = db.Column(db.String(64))
+    size_bytes: Optional[int] = db.Column(db.Integer)
+    scenario_metadata: Optional[Dict[str, Any]] = db.Column(db.JSON)
+    created_at: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __init__(
+        self,
+        user_id: int,
+        title: Optional[str] = None,
+        topic_id: Optional[str] = None,
+        provider_video_id: Optional[str] = None,
+        scenario_metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        now = datetime.utcnow()
+        self.user_id = user_id
+        self.title = title
+        self.topic_id = topic_id
+        self.provider_video_id = provider_video_id
+        self.scenario_metadata = scenario_metadata
+        self.status = VIDEO_PROCESSING
+        self.created_at = now
+        self.updated_at = now
+
+    def __repr__(self) -> str:
+        return f"<Video {self.id} {self.status}>"
+
+
+@dataclass
+class WebhookEvent(db.Model):  # type: ignore[misc]
+    """SQLAlchemy model for an accepted provider webhook delivery."""
+
+    __tablename__ = 'webhook_events'
+    __table_args__ = (
+        db.UniqueConstraint('provider', 'provider_video_id', 'status', name='uq_webhook_events_delivery'),
+    )
+
+    id: int = db.Column(db.Integer, primary_key=True)
+    provider: str = db.Column(db.String(32), nullable=False)
+    provider_video_id: str = db.Column(db.String(100), nullable=False)
+    status: str = db.Column(db.String(32), nullable=False)
+    payload: Optional[Dict[str, Any]] = db.Column(db.JSON)
+    received_at: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __init__(self, provider: str, provider_video_id: str, status: str, payload: Optional[Dict[str, Any]] = None) -> None:
+        self.provider = provider
+        self.provider_video_id = provider_video_id
+        self.status = status
+        self.payload = payload
+        self.received_at = datetime.utcnow()
+
+    def __repr__(self) -> str:
+        return f"<WebhookEvent {self.provider} {self.provider_video_id} {self.status}>"
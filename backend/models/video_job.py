@@ -0,0 +1,73 @@
+"""Background job model.
+
+Slow upstream work (GPT-4 scenario writing, HeyGen rendering) is not
+executed on the request thread. Instead a row is written to the
+``video_jobs`` table and picked up by the worker pool defined in
+:mod:`backend.services.jobs`. Keeping the queue in the database means
+queued work survives process restarts and every gunicorn worker can
+drain the same queue.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ..app import db
+
+
+# Job lifecycle states. A job moves ``queued`` -> ``running`` and then
+# either ``succeeded``, back to ``queued`` (retry with backoff) or
+# ``failed`` once its attempts are exhausted.
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+
+@dataclass
+class VideoJob(db.Model):  # type: ignore[misc]
+    """SQLAlchemy model for a queued unit of background work."""
+
+    __tablename__ = 'video_jobs'
+    # Workers poll for the oldest runnable job, so index the columns
+    # used by that lookup together.
+    __table_args__ = (
+        db.Index('ix_video_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    id: int = db.Column(db.Integer, primary_key=True)
+    user_id: Optional[int] = db.Column(db.Integer, index=True)
+    kind: str = db.Column(db.String(64), nullable=False)
+    payload: Dict[str, Any] = db.Column(db.JSON, nullable=False)
+    status: str = db.Column(db.String(16), nullable=False, default=JOB_QUEUED)
+    attempts: int = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts: int = db.Column(db.Integer, nullable=False, default=5)
+    run_after: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at: Optional[datetime] = db.Column(db.DateTime)
+    result: Optional[Dict[str, Any]] = db.Column(db.JSON)
+    last_error: Optional[str] = db.Column(db.Text)
+    created_at: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __init__(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        user_id: Optional[int] = None,
+        max_attempts: int = 5,
+    ) -> None:
+        now = datetime.utcnow()
+        self.kind = kind
+        self.payload = payload
+        self.user_id = user_id
+        self.status = JOB_QUEUED
+        self.attempts = 0
+        self.max_attempts = max_attempts
+        self.run_after = now
+        self.created_at = now
+        self.updated_at = now
+
+    def __repr__(self) -> str:
+        return f"<VideoJob {self.id} {self.kind} {self.status}>"
@@ -3,19 +3,33 @@ Adaptive Video Generation Routes
 Öğrenci performansına göre kişiselleştirilmiş video üretimi
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import httpx
+import hashlib
+import hmac
 import json
 import os
+import secrets
 from datetime import datetime
+from urllib.parse import urlsplit
+from sqlalchemy.exc import IntegrityError
 from ..app import db
+from ..models.video import VIDEO_FAILED, VIDEO_PROCESSING, VIDEO_READY, Video, WebhookEvent
+from ..models.video_job import VideoJob
+from ..services.db_routing import read_from_primary
+from ..services.http_client import outbound
+from ..services.jobs import job_queue
+from ..services.scenario_cache import scenario_cache
+from ..services.storage import video_store
 
 adaptive_video_bp = Blueprint('adaptive_video', __name__)
 
 # Environment variables
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 HEYGEN_API_KEY = os.getenv('HEYGEN_API_KEY')
+HEYGEN_AVATAR_ID = os.getenv('HEYGEN_AVATAR_ID')
+HEYGEN_VOICE_ID = os.getenv('HEYGEN_VOICE_ID')
+OPENAI_SCENARIO_MODEL = os.getenv('OPENAI_SCENARIO_MODEL', 'gpt-4o')
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_KEY')
 
@@ -60,6 +74,9 @@ Sen hipnotik öğretim teknikleri uzmanı bir video senaryo yazarısın.
 }
 """
 
+# Önbellekteki senaryolar prompt değiştiğinde geçersiz olsun
+PROMPT_VERSION = hashlib.sha256(MASTER_PROMPT.encode('utf-8')).hexdigest()[:12]
+
 
 @adaptive_video_bp.route('/video/quiz-completed', methods=['POST'])
 @jwt_required()
@@ -94,14 +111,24 @@ def quiz_completed():
         }
         
         # Video üretim kuyruğuna ekle
-        # (Gerçek implementasyonda background task kullanılır)
+        job = job_queue.enqueue(
+            'generate_video',
+            {
+                'user_id': user_id,
+                'topic_id': data.get('topic_id'),
+                'performance': performance_record
+            },
+            user_id=user_id
+        )
         
         return jsonify({
-            'status': 'success',
+            'status': 'queued',
             'message': 'Quiz kaydedildi, video hazırlanıyor',
             'user_id': user_id,
-            'topic_id': data.get('topic_id')
-        }), 200
+            'topic_id': data.get('topic_id'),
+            'job_id': job.id,
+            'status_url': f'/api/video/jobs/{job.id}'
+        }), 202
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -124,37 +151,57 @@ def generate_video():
         data = request.get_json()
         topic_id = data.get('topic_id')
         
-        # Kullanıcı bilgilerini al
-        # user = User.query.get(user_id)
-        
-        # Performans geçmişini al
-        # performance_history = get_performance_history(user_id, topic_id)
+        # GPT-4 ve HeyGen çağrıları worker havuzunda çalışır
+        job = job_queue.enqueue(
+            'generate_video',
+            {
+                'user_id': user_id,
+                'topic_id': topic_id,
+                'force_regenerate': bool(data.get('force_regenerate', False))
+            },
+            user_id=user_id
+        )
         
-        # Mock data (gerçek implementasyon için DB query gerekli)
-        student_data = {
-            'ad': 'Öğrenci',
-            'yas': 17,
-            'sinav_turu': 'YKS'
-        }
+        return jsonify({
+            'status': 'queued',
+            'job_id': job.id,
+            'status_url': f'/api/video/jobs/{job.id}',
+            'message': 'Video üretimi başlatıldı',
+            'estimated_time': 300  # 5 dakika
+        }), 202
         
-        performance_data = {
-            'konu_adi': 'Geometri - Alan',
-            'ortalama_skor': 52.0,
-            'son_5_skor': [45, 48, 52, 54, 50],
-            'zayif_konular': ['dikdortgen_alan']
-        }
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@adaptive_video_bp.route('/video/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+@read_from_primary
+def video_job_status(job_id):
+    """Kuyruktaki video üretim işinin durumunu döndür
+
+    İş hemen önceki istekte oluşturulduğu için replikadan değil
+    birincil veritabanından okunur.
+    """
+    try:
+        user_id = get_jwt_identity()
         
-        # GPT-4 ile senaryo oluştur
-        scenario = generate_scenario_gpt4(student_data, performance_data)
+        job = VideoJob.query.filter_by(id=job_id, user_id=user_id).first()
         
-        # HeyGen ile video oluştur (async olmalı)
-        video_id = create_heygen_video(scenario, user_id, topic_id)
+        if not job:
+            return jsonify({'error': 'İş bulunamadı'}), 404
         
         return jsonify({
-            'status': 'processing',
-            'video_id': video_id,
-            'message': 'Video üretimi başlatıldı',
-            'estimated_time': 300  # 5 dakika
+            'job_id': job.id,
+            'kind': job.kind,
+            'status': job.status,
+            'attempts': job.attempts,
+            'max_attempts': job.max_attempts,
+            'result': job.result,
+            'error': job.last_error,
+            'next_attempt_at': job.run_after.isoformat() if job.status == 'queued' else None,
+            'created_at': job.created_at.isoformat(),
+            'updated_at': job.updated_at.isoformat()
         }), 200
         
     except Exception as e:
@@ -255,6 +302,70 @@ def track_video_analytics(video_id):
         return jsonify({'error': str(e)}), 500
 
 
+@job_queue.handler('generate_video')
+def run_video_generation(payload):
+    """Kuyruk işi: senaryo üret ve HeyGen videosunu başlat"""
+    user_id = payload.get('user_id')
+    topic_id = payload.get('topic_id')
+    performance = payload.get('performance') or {}
+    
+    # Kullanıcı bilgilerini al
+    # user = User.query.get(user_id)
+    
+    # Performans geçmişini al
+    # performance_history = get_performance_history(user_id, topic_id)
+    
+    # Mock data (gerçek implementasyon için DB query gerekli)
+    student_data = {
+        'ad': 'Öğrenci',
+        'yas': 17,
+        'sinav_turu': 'YKS'
+    }
+    
+    performance_data = {
+        'konu_adi': 'Geometri - Alan',
+        'ortalama_skor': float(performance.get('quiz_score') or 52.0),
+        'son_5_skor': [45, 48, 52, 54, 50],
+        'zayif_konular': ['dikdortgen_alan'],
+        'hatalar': performance.get('mistakes', [])
+    }
+    
+    # GPT-4 ile senaryo oluştur (aynı konu/skor bandı/hata tipi için önbellekten)
+    scenario = scenario_cache.get_or_generate(
+        student_data,
+        performance_data,
+        generate_scenario_gpt4,
+        version=PROMPT_VERSION,
+        refresh=bool(payload.get('force_regenerate'))
+    )
+    
+    # HeyGen ile video oluştur. Render ücretli olduğu için dönen id işe
+    # hemen yazılır; yeniden deneme aynı videoyu kullanır, ikinci kez POST atmaz
+    video_id = payload.get('provider_video_id')
+    if not video_id:
+        video_id = create_heygen_video(scenario, user_id, topic_id)
+        job_queue.checkpoint(provider_video_id=video_id)
+    
+    # Kütüphaneye 'processing' olarak ekle; webhook gelince 'ready' olur
+    video = Video.query.filter_by(provider_video_id=video_id).first()
+    if video is None:
+        video = Video(
+            user_id=user_id,
+            title=scenario.get('video_metadata', {}).get('baslik'),
+            topic_id=topic_id,
+            provider_video_id=video_id,
+            scenario_metadata=scenario.get('hipnotik_analizler')
+        )
+        db.session.add(video)
+        db.session.commit()
+    
+    return {
+        'id': video.id,
+        'video_id': video_id,
+        'title': video.title
+    }
+
+
 def generate_scenario_gpt4(student_data, performance_data):
     """GPT-4 ile senaryo oluştur"""
     
@@ -286,47 +397,234 @@ def generate_scenario_gpt4(student_data, performance_data):
         'performans': performance_data
     }
     
-    # OpenAI API call (async olmalı)
-    # response = openai.ChatCompletion.create(...)
+    # Paylaşılan bağlantı havuzu üzerinden OpenAI çağrısı
+    client = outbound.openai_client(OPENAI_API_KEY)
+    if client is None:
+        raise RuntimeError('openai paketi kurulu değil')
     
-    return {}  # Placeholder
+    response = client.chat.completions.create(
+        model=OPENAI_SCENARIO_MODEL,
+        messages=[
+            {'role': 'system', 'content': MASTER_PROMPT},
+            {'role': 'user', 'content': json.dumps(input_data, ensure_ascii=False)}
+        ],
+        response_format={'type': 'json_object'}
+    )
+    
+    return json.loads(response.choices[0].message.content)
 
 
 def create_heygen_video(scenario, user_id, topic_id):
     """HeyGen API ile video oluştur"""
     
     if not HEYGEN_API_KEY:
-        # Mock video ID döndür
-        return 'mock-video-id-' + str(datetime.utcnow().timestamp())
+        # Mock video ID döndür (tahmin edilemez; webhook id ile eşleşir)
+        return 'mock-video-id-' + secrets.token_hex(16)
     
     # HeyGen API call
     full_script = ' '.join([s['metin'] for s in scenario.get('senaryo', [])])
     
-    # API request (async olmalı)
-    # response = httpx.post('https://api.heygen.com/v2/video/generate', ...)
+    # Paylaşılan bağlantı havuzu üzerinden HeyGen çağrısı
+    response = outbound.post(
+        'https://api.heygen.com/v2/video/generate',
+        headers={'X-Api-Key': HEYGEN_API_KEY},
+        json={
+            'video_inputs': [{
+                'character': {'type': 'avatar', 'avatar_id': HEYGEN_AVATAR_ID},
+                'voice': {'type': 'text', 'input_text': full_script, 'voice_id': HEYGEN_VOICE_ID}
+            }],
+            'callback_id': f'{user_id}:{topic_id}'
+        }
+    )
+    response.raise_for_status()
     
-    return 'video-id-placeholder'
+    return response.json()['data']['video_id']
+
+
+def heygen_signature_valid(raw_body, signature):
+    """Signature başlığı gövdenin HEYGEN_WEBHOOK_SECRET ile HMAC-SHA256'sı mı"""
+    secret = current_app.config['HEYGEN_WEBHOOK_SECRET']
+    expected = hmac.new(secret.encode('utf-8'), raw_body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, (signature or '').strip().lower())
+
+
+def allowed_download_url(url):
+    """Yalnızca HEYGEN_DOWNLOAD_HOSTS (veya alt alan adları) üzerindeki https URL'leri"""
+    if not isinstance(url, str):
+        return False
+    try:
+        parsed = urlsplit(url)
+        port = parsed.port
+    except ValueError:
+        return False
+    host = (parsed.hostname or '').lower()
+    if parsed.scheme != 'https' or not host or parsed.username or parsed.password or port not in (None, 443):
+        return False
+    return any(
+        host == allowed or host.endswith('.' + allowed)
+        for allowed in current_app.config.get('HEYGEN_DOWNLOAD_HOSTS', [])
+    )
+
+
+class DownloadTooLarge(ValueError):
+    """İndirilen dosya VIDEO_DOWNLOAD_MAX_BYTES sınırını aştı"""
+
+
+def limited_chunks(response, chunk_size, max_bytes):
+    """Yanıtı parça parça ver; sınır aşılınca indirmeyi kes"""
+    length = response.headers.get('Content-Length')
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise DownloadTooLarge(f'Video {length} bayt, sınır {max_bytes}')
+    received = 0
+    for chunk in response.iter_bytes(chunk_size):
+        received += len(chunk)
+        if received > max_bytes:
+            raise DownloadTooLarge(f'Video {max_bytes} bayttan büyük')
+        yield chunk
 
 
 @adaptive_video_bp.route('/video/webhook/heygen', methods=['POST'])
 def heygen_webhook():
-    """HeyGen'den gelen webhook'u işle"""
+    """
+    HeyGen'den gelen webhook'u işle
+    
+    İmza (Signature başlığı) doğrulanmadan hiçbir şey yapılmaz. Yalnızca
+    'processing' durumundaki videolar için bildirim kabul edilir. Aynı
+    (video_id, status) tekrar gelirse hiçbir şey yapılmaz. İndirme ve
+    kütüphane güncellemesi kuyruktaki işte yapılır; webhook hemen 200
+    döner.
+    """
     try:
-        data = request.get_json()
+        if not current_app.config.get('HEYGEN_WEBHOOK_SECRET'):
+            return jsonify({'error': 'Webhook yapılandırılmamış'}), 503
+        if not heygen_signature_valid(request.get_data(cache=True), request.headers.get('Signature')):
+            return jsonify({'error': 'Geçersiz imza'}), 401
+        
+        data = request.get_json(silent=True) or {}
         
         video_id = data.get('video_id')
         status = data.get('status')
         download_url = data.get('download_url')
         
+        if not isinstance(video_id, str) or not video_id or not isinstance(status, str) or not status:
+            return jsonify({'error': 'video_id ve status gerekli'}), 400
+        if status == 'completed' and download_url and not allowed_download_url(download_url):
+            return jsonify({'error': 'download_url izin verilen bir HeyGen adresi değil'}), 400
+        
+        # Yalnızca render'ı beklenen videolar; tahmin edilen id'ler reddedilir
+        video = Video.query.filter_by(provider_video_id=video_id, status=VIDEO_PROCESSING).first()
+        if video is None:
+            delivered = WebhookEvent.query.filter_by(
+                provider='heygen', provider_video_id=video_id, status=status
+            ).first()
+            if delivered is not None:
+                return jsonify({'status': 'duplicate'}), 200
+            return jsonify({'error': 'Video bulunamadı'}), 404
+        
+        # Teslimatı kaydet; aynı (video_id, status) zaten varsa tekrar gönderimdir
+        db.session.add(WebhookEvent('heygen', video_id, status, payload=data))
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'status': 'duplicate'}), 200
+        
+        # İşi aynı transaction'da kuyruğa ekle
         if status == 'completed' and download_url:
-            # Video'yu S3'e yükle
-            # S3'ten URL al
-            # Video kütüphanesine kaydet
-            # Öğrenciye bildirim gönder
-            pass
+            job_queue.enqueue(
+                'store_heygen_video',
+                {'provider_video_id': video_id, 'download_url': download_url},
+                commit=False
+            )
+        elif status == 'failed':
+            Video.query.filter_by(id=video.id, status=VIDEO_PROCESSING).update(
+                {'status': VIDEO_FAILED, 'updated_at': datetime.utcnow()},
+                synchronize_session=False
+            )
+        
+        db.session.commit()
         
         return jsonify({'status': 'received'}), 200
         
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+def fail_video(video, reason):
+    """Videoyu 'failed' yap; yeniden denemenin anlamı olmayan hatalar için"""
+    Video.query.filter_by(id=video.id, status=VIDEO_PROCESSING).update(
+        {'status': VIDEO_FAILED, 'updated_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return {'id': video.id, 'error': reason}
+
+
+@job_queue.handler('store_heygen_video')
+def store_heygen_video(payload):
+    """Kuyruk işi: bitmiş videoyu parça parça indir, sakla ve 'ready' yap"""
+    provider_video_id = payload['provider_video_id']
+    download_url = payload['download_url']
+    
+    video = Video.query.filter_by(provider_video_id=provider_video_id).first()
+    if video is None:
+        raise LookupError(f'Video bulunamadı: {provider_video_id}')
+    if video.status == VIDEO_READY and video.storage_key:
+        return {'id': video.id, 'storage_key': video.storage_key}
+    if video.status != VIDEO_PROCESSING:
+        # İş kuyruktayken video başarısız/silinmiş olabilir; indirme yapılmaz
+        return {'id': video.id, 'skipped': video.status}
+    if not allowed_download_url(download_url):
+        return fail_video(video, 'download_url izin verilen bir HeyGen adresi değil')
+    
+    # Tüm MP4'ü belleğe almadan sabit boyutlu parçalarla içerik adresli depoya yaz;
+    # yönlendirme izlenmez, boyut sınırı aşılınca yarım dosya silinir
+    chunk_size = current_app.config.get('VIDEO_DOWNLOAD_CHUNK_BYTES', 1024 * 1024)
+    max_bytes = current_app.config.get('VIDEO_DOWNLOAD_MAX_BYTES', 500 * 1024 * 1024)
+    try:
+        with outbound.stream('GET', download_url, follow_redirects=False) as response:
+            response.raise_for_status()
+            digest, size = video_store.save(limited_chunks(response, chunk_size, max_bytes))
+    except DownloadTooLarge as e:
+        return fail_video(video, str(e))
+    
+    updated = Video.query.filter_by(id=video.id, status=VIDEO_PROCESSING).update(
+        {
+            'status': VIDEO_READY,
+            'storage_key': digest,
+            'size_bytes': size,
+            'video_url': f'/api/video/files/{digest}',
+            'updated_at': datetime.utcnow()
+        },
+        synchronize_session=False
+    )
+    db.session.commit()
+    if not updated:
+        # İndirme sırasında durum değişti; başka video aynı içeriği
+        # kullanmıyorsa dosya sahipsiz kalmasın
+        if not Video.query.filter_by(storage_key=digest).first():
+            video_store.delete(digest)
+        return {'id': video.id, 'skipped': 'status changed during download'}
+    
+    # Öğrenciye bildirim gönder
+    
+    return {'id': video.id, 'storage_key': digest, 'size_bytes': size}
+
+
+@adaptive_video_bp.route('/video/files/<digest>', methods=['GET'])
+@jwt_required()
+def video_file(digest):
+    """Depolanan video dosyasını (Range destekli) döndür"""
+    try:
+        user_id = get_jwt_identity()
+        
+        video = Video.query.filter_by(storage_key=digest, user_id=user_id).first()
+        if not video:
+            return jsonify({'error': 'Video bulunamadı'}), 404
+        
+        return send_file(video_store.path_for(digest), mimetype='video/mp4', conditional=True)
+        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -18,6 +18,8 @@ from typing import Any, Dict, List
 
 from flask import Blueprint, jsonify, request, current_app
 
+from ..services.http_client import outbound
+
 # Optional dependencies. We import them lazily so the app still
 # functions if they are not installed. If OpenAI or TTS fails, we
 # fallback to the offline pyttsx3 engine.
@@ -131,13 +133,15 @@ def synthesize_voice() -> Any:
     # First attempt: use OpenAI TTS if configured and importable
     if api_key and openai is not None:
         try:
-            openai.api_key = api_key
+            # The SDK client is cached and shares the pooled outbound
+            # connections, so no new TLS handshake per request.
+            client = outbound.openai_client(api_key)
             # Choose model and voice from request or config
             tts_model = model or app.config.get('OPENAI_TTS_MODEL', 'gpt-4o-mini-tts')
             tts_voice = voice or app.config.get('OPENAI_TTS_VOICE', 'alloy')
             # Prepare the request. The API may raise an exception if
             # something goes wrong (e.g. invalid key).
-            response = openai.audio.speech.create(
+            response = client.audio.speech.create(
                 model=tts_model,
                 voice=tts_voice,
                 input=text,
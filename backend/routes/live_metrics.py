@@ -13,6 +13,12 @@ import random
 from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required
 
+from ..services.http_client import outbound
+from ..services.identity_cache import identity_cache
+from ..services.rate_limit import rate_limiter
+from ..services.revocation import revocation_list
+from ..services.scenario_cache import scenario_cache
+
 live_metrics_bp = Blueprint('live_metrics_bp', __name__)
 
 
@@ -64,4 +70,39 @@ def metrics_summary():
         "average_response_time_ms": 250.0,
         "error_rate": 1.2,
     }
-    return jsonify(summary)
\ No newline at end of file
+    return jsonify(summary)
+
+
+@live_metrics_bp.route('/live-metrics/outbound', methods=['GET'])
+@jwt_required()
+def outbound_metrics():
+    """Return connection pool and per-host stats of the upstream client."""
+    return jsonify(outbound.stats())
+
+
+@live_metrics_bp.route('/live-metrics/scenario-cache', methods=['GET'])
+@jwt_required()
+def scenario_cache_metrics():
+    """Return hit/miss counters of the video scenario cache."""
+    return jsonify(scenario_cache.stats())
+
+
+@live_metrics_bp.route('/live-metrics/identity-cache', methods=['GET'])
+@jwt_required()
+def identity_cache_metrics():
+    """Return hit rate and size of the ``current_user`` profile cache."""
+    return jsonify(identity_cache.stats())
+
+
+@live_metrics_bp.route('/live-metrics/revocation', methods=['GET'])
+@jwt_required()
+def revocation_metrics():
+    """Return size and hit counters of the token revocation filter."""
+    return jsonify(revocation_list.stats())
+
+
+@live_metrics_bp.route('/live-metrics/rate-limits', methods=['GET'])
+@jwt_required()
+def rate_limit_metrics():
+    """Return the rate limit policies and allowed/limited counters."""
+    return jsonify(rate_limiter.stats())
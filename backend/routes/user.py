@@ -10,16 +10,22 @@ service classes) and add pagination, search, etc.
 
 from __future__ import annotations
 
-from flask import Blueprint, request, jsonify
-from werkzeug.security import check_password_hash, generate_password_hash
+import tempfile
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_jwt_extended import (
     jwt_required,
-    create_access_token,
+    current_user,
+    get_jwt,
     get_jwt_identity,
 )
 
 from ..app import db
 from ..models.user import User
+from ..services import roster
+from ..services.roster import roster_imports
+from ..services.passwords import HasherBusy, password_hasher
+from ..services.revocation import issue_tokens, revocation_list
 
 
 # The blueprint that encapsulates all user related routes. It will be
@@ -27,6 +33,14 @@ from ..models.user import User
 user_bp = Blueprint('user_bp', __name__)
 
 
+def _busy():
+    """503 returned when the password hashing queue is full."""
+    response = jsonify({"error": "Too many login attempts in progress, please retry"})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+
 @user_bp.route('/auth/register', methods=['POST'])
 def register_user():
     """Register a new user.
@@ -46,7 +60,11 @@ def register_user():
     if User.query.filter_by(email=email).first() is not None:
         return jsonify({"error": "User with this email already exists"}), 409
 
-    user = User(username=username, email=email, password_hash=generate_password_hash(password))
+    try:
+        password_hash = password_hasher.hash(password)
+    except HasherBusy:
+        return _busy()
+    user = User(username=username, email=email, password_hash=password_hash)
     db.session.add(user)
     db.session.commit()
     return jsonify({"success": True, "user_id": user.id})
@@ -65,13 +83,118 @@ def login_user():
     password = data.get('password')
 
     user: User | None = User.query.filter_by(email=email).first()
-    if user is None or not check_password_hash(user.password_hash, password):
+    if user is None:
+        return jsonify({"error": "Invalid email or password"}), 401
+    try:
+        valid, new_hash = password_hasher.verify_and_update(user.password_hash, password)
+    except HasherBusy:
+        return _busy()
+    if not valid:
         return jsonify({"error": "Invalid email or password"}), 401
+    if new_hash:
+        # Hashing parameters changed since this hash was stored.
+        user.password_hash = new_hash
+        db.session.commit()
 
-    # Create a short‑lived access token. You can configure expiry via
-    # JWT_ACCESS_TOKEN_EXPIRES in Config.
-    access_token = create_access_token(identity=user.id)
-    return jsonify({"success": True, "access_token": access_token})
+    # A short‑lived access token plus a refresh token. Lifetimes are set
+    # by JWT_ACCESS_TOKEN_EXPIRES / JWT_REFRESH_TOKEN_EXPIRES in Config.
+    return jsonify({"success": True, **issue_tokens(user.id)})
+
+
+@user_bp.route('/auth/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh_tokens():
+    """Exchange a refresh token for a new access and refresh token.
+
+    The refresh token sent is revoked (rotation), so each one can be
+    used only once.
+    """
+    identity = get_jwt_identity()
+    revocation_list.revoke(db.session, get_jwt())
+    db.session.commit()
+    return jsonify({"success": True, **issue_tokens(identity)})
+
+
+@user_bp.route('/auth/logout', methods=['POST'])
+@jwt_required()
+def logout_user():
+    """Revoke the access token and the refresh token issued with it."""
+    revocation_list.logout(db.session, get_jwt())
+    db.session.commit()
+    return jsonify({"success": True})
+
+
+@user_bp.route('/users/import', methods=['POST'])
+@jwt_required()
+def import_roster():
+    """Bulk-register students from a CSV or NDJSON roster.
+
+    Only accounts listed in ``ADMIN_EMAILS`` may import. The roster is
+    either the raw request body or a multipart ``file`` field. Each
+    entry needs ``email`` and may carry ``username`` and ``password``;
+    the format comes from ``?format=`` or the file name / content type.
+    The response is streamed as NDJSON: one result per entry
+    (``created``, ``duplicate`` or ``invalid``) followed by a
+    ``summary`` line. See :mod:`backend.services.roster`.
+
+    Imports share one hashing pool; when ``ROSTER_IMPORT_CONCURRENCY``
+    imports are already running the request is refused with 429.
+    """
+    config = current_app.config
+    if (current_user.email or '').lower() not in config['ADMIN_EMAILS']:
+        return jsonify({"error": "Only administrators can import rosters"}), 403
+    if not roster_imports.acquire():
+        response = jsonify({"error": "Another roster import is running, please retry later"})
+        response.status_code = 429
+        response.headers['Retry-After'] = '30'
+        return response
+
+    upload = request.files.get('file')
+    try:
+        if upload:
+            # Uploaded files are closed with the request, before a
+            # streamed response is sent; copy into a temporary file we
+            # own instead.
+            stream = tempfile.TemporaryFile()
+            upload.save(stream)
+            stream.seek(0)
+        else:
+            stream = request.stream
+        fmt = roster.detect_format(
+            upload.filename if upload else '',
+            upload.mimetype if upload else request.mimetype,
+            request.args.get('format', ''),
+        )
+        records = roster.read_records(stream, fmt)
+    except roster.RosterError as e:
+        roster_imports.release()
+        if upload:
+            stream.close()
+        return jsonify({"error": str(e)}), 400
+    except BaseException:
+        roster_imports.release()
+        raise
+
+    workers = max(roster_imports.workers, 1)
+    batch_size = config['ROSTER_IMPORT_BATCH_SIZE']
+    importer = roster.RosterImport(
+        db.engines[None], User.__table__, password_hasher.method, batch_size,
+        roster_imports.pool(), max(1, batch_size // (workers * 4)),
+    )
+
+    def finished():
+        # Runs once the response is closed, even if the client went
+        # away before the first line was sent.
+        roster_imports.release()
+        if upload:
+            stream.close()
+
+    response = Response(
+        stream_with_context(roster.ndjson_lines(importer.run(records), importer)),
+        mimetype='application/x-ndjson',
+    )
+    response.call_on_close(finished)
+    return response
 
 
 @user_bp.route('/users/profile', methods=['GET'])
@@ -79,15 +202,12 @@ def login_user():
 def get_profile():
     """Return the authenticated user's profile.
 
-    Uses the identity stored in the JWT to look up the user and
-    return their basic details. If the user is not found (e.g.
-    deleted after token creation) returns HTTP 404.
+    The user is resolved from the JWT identity through the identity
+    cache, so this normally needs no database read. If the user is not
+    found (e.g. deleted after token creation) the JWT user lookup
+    answers HTTP 404.
     """
-    user_id = get_jwt_identity()
-    user: User | None = User.query.get(user_id)
-    if user is None:
-        return jsonify({"error": "User not found"}), 404
-    return jsonify({"id": user.id, "username": user.username, "email": user.email})
+    return jsonify({"id": current_user.id, "username": current_user.username, "email": current_user.email})
 
 
 # Optional endpoints for progress and achievements. These return
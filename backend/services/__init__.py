@@ -0,0 +1,9 @@
+"""Service layer package.
+
+Modules in this package hold the logic that does not belong in a
+blueprint: background workers, outbound clients, caches and similar
+infrastructure shared by several route modules. Import the modules
+directly (e.g. ``from ..services.jobs import job_queue``); nothing is
+re-exported here so that importing one service never drags in the
+dependencies of another.
+"""
@@ -0,0 +1,167 @@
+"""Per-user daily activity bitmaps for streaks and activity calendars.
+
+Every learning event (quiz, finished video, solved photo, tutor chat)
+marks the day it happened in a bitmap with one bit per day: bit ``i``
+stands for day ``start_day + i``, where days are counted from
+1970-01-01 in the platform's local time. Years of history fit in a few
+hundred bytes. The current streak, the longest streak and a 365-day
+calendar are derived with integer bit operations instead of date
+queries over several event tables.
+
+The bitmap lives in a table with the columns ``user_id`` (primary key),
+``start_day``, ``last_day`` and ``bits`` (binary). :func:`mark_active`
+only writes the first time a user is active on a given day, and does
+so with a compare-and-swap on the stored bitmap, so concurrent requests
+cannot lose bits.
+
+Only SQLAlchemy is required, so the ``app_*.py`` monoliths can use it.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Table, select, update
+from sqlalchemy.exc import IntegrityError
+
+EPOCH = date(1970, 1, 1)
+CALENDAR_DAYS = 365
+
+
+def day_number(moment: date | datetime, utc_offset_hours: float = 0) -> int:
+    """Local day index of ``moment`` (a naive UTC datetime or a date)."""
+    if isinstance(moment, datetime):
+        moment = (moment + timedelta(hours=utc_offset_hours)).date()
+    return (moment - EPOCH).days
+
+
+def day_date(day: int) -> date:
+    return EPOCH + timedelta(days=day)
+
+
+def encode(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def decode(blob: Optional[bytes]) -> int:
+    return int.from_bytes(blob or b'', 'little')
+
+
+def set_day(start_day: Optional[int], bits: int, day: int) -> Tuple[int, int]:
+    """Return ``(start_day, bits)`` with ``day`` marked active."""
+    if start_day is None or not bits:
+        return day, 1
+    if day < start_day:
+        # Earlier than anything stored: rebase so bit 0 is the new day.
+        return day, (bits << (start_day - day)) | 1
+    return start_day, bits | (1 << (day - start_day))
+
+
+def from_days(days: Iterable[int]) -> Tuple[Optional[int], int]:
+    """Build ``(start_day, bits)`` from day numbers (for backfills)."""
+    days = set(days)
+    if not days:
+        return None, 0
+    start_day = min(days)
+    bits = 0
+    for day in days:
+        bits |= 1 << (day - start_day)
+    return start_day, bits
+
+
+def current_streak(start_day: Optional[int], bits: int, today: int) -> int:
+    """Consecutive active days ending today, or yesterday if today is
+    still open (a streak is only broken once a whole day is missed)."""
+    if start_day is None or not bits:
+        return 0
+    end = today - start_day
+    if end < 0:
+        return 0
+    if not (bits >> end) & 1:
+        end -= 1
+        if end < 0 or not (bits >> end) & 1:
+            return 0
+    window = (1 << (end + 1)) - 1
+    gaps = ~bits & window
+    # The highest inactive day below ``end`` bounds the run.
+    return end + 1 - gaps.bit_length() if gaps else end + 1
+
+
+def longest_streak(bits: int) -> int:
+    """Longest run of active days (each step shortens every run by one)."""
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+def calendar(start_day: Optional[int], bits: int, today: int, days: int = CALENDAR_DAYS) -> str:
+    """``days`` characters of ``0``/``1``, oldest first, ending today."""
+    if start_day is None:
+        return '0' * days
+    first = today - days + 1
+    shift = first - start_day
+    window = bits >> shift if shift >= 0 else bits << -shift
+    window &= (1 << days) - 1
+    return format(window, f'0{days}b')[::-1]
+
+
+def summary(start_day: Optional[int], bits: int, today: int, days: int = CALENDAR_DAYS) -> Dict[str, Any]:
+    """Streaks and calendar as a JSON-ready dict."""
+    return {
+        'current_streak': current_streak(start_day, bits, today),
+        'longest_streak': longest_streak(bits),
+        'active_days': bin(bits).count('1'),
+        'calendar_start': day_date(today - days + 1).isoformat(),
+        'calendar': calendar(start_day, bits, today, days),
+    }
+
+
+def mark_active(executor: Any, table: Table, user_id: Any, day: int, attempts: int = 5) -> Tuple[int, int, bool]:
+    """Mark ``day`` active for ``user_id``.
+
+    Returns ``(start_day, bits, changed)``; ``changed`` is false when the
+    day was already marked, in which case the call cost one primary-key
+    read. ``executor`` is a Session or Connection; nothing is committed.
+    """
+    c = table.c
+    for _ in range(attempts):
+        row = executor.execute(
+            select(c.start_day, c.last_day, c.bits).where(c.user_id == user_id)
+        ).first()
+        if row is None:
+            start_day, bits = set_day(None, 0, day)
+            try:
+                with executor.begin_nested():
+                    executor.execute(table.insert().values(
+                        user_id=user_id, start_day=start_day, last_day=day, bits=encode(bits)
+                    ))
+                return start_day, bits, True
+            except IntegrityError:
+                continue  # Someone else created the row; retry as an update.
+        bits = decode(row.bits)
+        if row.start_day is not None and day >= row.start_day and (bits >> (day - row.start_day)) & 1:
+            return row.start_day, bits, False
+        start_day, bits = set_day(row.start_day, bits, day)
+        # Compare-and-swap on the bitmap that was read.
+        swapped = executor.execute(
+            update(table)
+            .where(c.user_id == user_id, c.start_day == row.start_day, c.bits == row.bits)
+            .values(start_day=start_day, last_day=max(day, row.last_day or day), bits=encode(bits))
+        ).rowcount
+        if swapped:
+            return start_day, bits, True
+    raise RuntimeError(f'Could not record activity for user {user_id}')
+
+
+def store(executor: Any, table: Table, user_id: Any, start_day: Optional[int], bits: int) -> None:
+    """Overwrite a user's bitmap (used by backfills)."""
+    c = table.c
+    executor.execute(table.delete().where(c.user_id == user_id))
+    if start_day is not None:
+        last_day = start_day + bits.bit_length() - 1
+        executor.execute(table.insert().values(
+            user_id=user_id, start_day=start_day, last_day=last_day, bits=encode(bits)
+        ))
@@ -0,0 +1,79 @@
+"""Validation of player analytics events before they are buffered.
+
+Events are accepted into a shared :class:`~backend.services.write_buffer.WriteBuffer`
+and written later in one batch, so a malformed field would fail every
+batch it lands in rather than just its own request. :func:`clean_event`
+converts the client's fields to the column types up front and raises
+:class:`InvalidEvent` (a ``ValueError``) for anything that does not
+fit, so the endpoint can answer ``400`` while the client is still
+listening.
+
+Only the standard library is used so that the ``app_*.py`` monoliths
+can share it.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional
+
+# A day of video is far beyond any real lesson; anything larger is noise.
+MAX_SECONDS = 24 * 3600
+MAX_PAUSES = 1000
+
+
+class InvalidEvent(ValueError):
+    """An analytics event field has the wrong type or range."""
+
+
+def _number(value: Any, field: str, maximum: float) -> float:
+    if isinstance(value, bool):
+        raise InvalidEvent(f'{field} must be a number')
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise InvalidEvent(f'{field} must be a number') from None
+    if math.isnan(number) or not 0 <= number <= maximum:
+        raise InvalidEvent(f'{field} must be between 0 and {maximum:g}')
+    return number
+
+
+def _optional_int(data: Dict[str, Any], field: str, maximum: float) -> Optional[int]:
+    value = data.get(field)
+    if value is None:
+        return None
+    return int(_number(value, field, maximum))
+
+
+def _flag(value: Any, field: str) -> bool:
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false', '0', '1'):
+        return value.strip().lower() in ('true', '1')
+    raise InvalidEvent(f'{field} must be true or false')
+
+
+def _positions(value: Any, field: str, max_pauses: int) -> List[float]:
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise InvalidEvent(f'{field} must be a list of seconds')
+    if len(value) > max_pauses:
+        raise InvalidEvent(f'{field} holds more than {max_pauses} entries')
+    return [_number(position, field, MAX_SECONDS) for position in value]
+
+
+def clean_event(data: Any, max_pauses: int = MAX_PAUSES) -> Dict[str, Any]:
+    """The typed ``watch_duration``, ``watch_percentage``, ``pause_timestamps`` and ``completed`` of ``data``."""
+    if not isinstance(data, dict):
+        raise InvalidEvent('Event must be a JSON object')
+    return {
+        'watch_duration': _optional_int(data, 'watch_duration', MAX_SECONDS),
+        'watch_percentage': _optional_int(data, 'watch_percentage', 100),
+        'pause_timestamps': _positions(data.get('pause_timestamps'), 'pause_timestamps', max_pauses),
+        'completed': _flag(data.get('completed'), 'completed'),
+    }
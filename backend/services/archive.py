@@ -0,0 +1,95 @@
+"""Monthly archive tables for append-only event tables.
+
+Event tables such as video analytics and tutor conversations only ever
+grow, but the endpoints read only the recent tail. Rows older than a
+retention window are moved into one table per source and calendar month
+(``<source>_archive_YYYYMM``), created on demand with the same columns
+and a ``(user_id, created_at)`` index. The hot table and its indexes
+stay small enough to be cached, and a month of history is read from a
+single small table.
+
+:func:`archive_chunk` copies one chunk of old rows into their monthly
+tables and deletes them from the source in the caller's transaction, so
+a crash never loses or duplicates rows. It returns the moved rows so
+the caller can fold them into rollups in the same transaction.
+
+Only SQLAlchemy is required, so the ``app_*.py`` monoliths can use it.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import Column, Index, MetaData, Table, select
+
+MONTH_FORMAT = '%Y-%m'
+
+
+def month_key(moment: datetime) -> str:
+    """``'YYYY-MM'`` of ``moment``."""
+    return moment.strftime(MONTH_FORMAT)
+
+
+def parse_month(key: str) -> str:
+    """Validate a ``'YYYY-MM'`` string (raises ``ValueError``)."""
+    return month_key(datetime.strptime(key, MONTH_FORMAT))
+
+
+def table_name(source: Table, month: str) -> str:
+    return f"{source.name}_archive_{month.replace('-', '')}"
+
+
+def archive_table(metadata: MetaData, source: Table, month: str) -> Table:
+    """The archive table of ``source`` for ``month`` (not created here).
+
+    Columns are copied without foreign keys or defaults: archived rows
+    are written once and only read afterwards.
+    """
+    name = table_name(source, month)
+    if name in metadata.tables:
+        return metadata.tables[name]
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, autoincrement=False)
+        for column in source.columns
+    ]
+    table = Table(name, metadata, *columns)
+    if 'user_id' in table.c and 'created_at' in table.c:
+        Index(f'ix_{name}_user_created', table.c.user_id, table.c.created_at)
+    return table
+
+
+def archive_chunk(
+    connection: Any,
+    metadata: MetaData,
+    source: Table,
+    cutoff: datetime,
+    after_id: int = 0,
+    chunk: int = 5000,
+) -> Tuple[List[Any], Dict[str, int]]:
+    """Move up to ``chunk`` rows older than ``cutoff`` with ``id > after_id``.
+
+    Returns ``(rows, moved_per_month)``; ``rows`` is empty when nothing
+    is left. Nothing is committed here.
+    """
+    rows = connection.execute(
+        select(source)
+        .where(source.c.id > after_id, source.c.created_at < cutoff)
+        .order_by(source.c.id)
+        .limit(chunk)
+    ).all()
+    if not rows:
+        return [], {}
+
+    by_month: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_month.setdefault(month_key(row.created_at), []).append(dict(row._mapping))
+    for month, values in by_month.items():
+        target = archive_table(metadata, source, month)
+        target.create(connection, checkfirst=True)
+        connection.execute(target.insert(), values)
+
+    ids = [row.id for row in rows]
+    connection.execute(source.delete().where(source.c.id.in_(ids)))
+    return rows, {month: len(values) for month, values in by_month.items()}
+
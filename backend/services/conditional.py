@@ -0,0 +1,62 @@
+"""ETag based conditional GET for per-user read endpoints.
+
+Endpoints such as the video list and dashboard are reloaded by the
+frontend on every mount even though the underlying rows rarely change.
+:func:`conditional` wraps such a view: it asks a cheap ``version``
+callback for the caller's data version (typically one primary-key read
+of a counter that is bumped in the same transaction as the writes),
+derives a strong ETag from it and the request URL, and answers
+``304 Not Modified`` without calling the view when the client already
+has that representation. Full responses carry the ETag and a
+``Cache-Control`` header so browsers revalidate instead of refetching.
+
+Only Flask is required, so the blueprint package and the ``app_*.py``
+monoliths can both use it.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+from typing import Any, Callable
+
+from flask import make_response, request
+
+DEFAULT_CACHE_CONTROL = 'private, no-cache'
+
+
+def make_etag(*parts: Any) -> str:
+    """Return a strong ETag value (without quotes) for ``parts``."""
+    raw = '\x1f'.join(str(part) for part in parts).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:24]
+
+
+def conditional(
+    version: Callable[[], Any],
+    cache_control: str = DEFAULT_CACHE_CONTROL,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Serve ``304 Not Modified`` while ``version()`` is unchanged.
+
+    ``version`` runs inside the request (after authentication) and must
+    be much cheaper than the view it guards. Its value has to identify
+    the caller as well (e.g. ``(user_id, n)``) because the URL does not.
+    The ETag also covers the full request path including the query
+    string, so paginated or projected variants get distinct tags. Only
+    successful responses are tagged.
+    """
+    def decorator(view: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(view)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            etag = make_etag(request.endpoint, request.full_path, version())
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            response.vary.add('Authorization')
+            return response
+        return wrapper
+    return decorator
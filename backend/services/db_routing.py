@@ -0,0 +1,134 @@
+"""Read/write splitting between the primary database and a read replica.
+
+When ``DATABASE_REPLICA_URL`` is set, :class:`Config` registers it as the
+``replica`` entry of ``SQLALCHEMY_BINDS`` and :class:`RoutingSession`
+(the session class of ``db``) sends the reads of ``GET`` and ``HEAD``
+requests to it, so dashboards and lists do not compete with the
+analytics and quiz writes on the primary. Everything else goes to the
+primary:
+
+* requests with any other method, background jobs and CLI commands;
+* ``INSERT``/``UPDATE``/``DELETE``, ``SELECT ... FOR UPDATE`` and
+  flushes;
+* every statement of a session that has already written, so a ``GET``
+  handler that creates a row lazily reads it back from the primary.
+
+A replica may lag behind. Handlers that must see a write made by an
+earlier request (e.g. polling the status of a job that was just
+enqueued) opt out with :func:`read_from_primary`, or wrap a block in
+:func:`primary`.
+
+Locally, two SQLite files are enough: point ``DATABASE_REPLICA_URL`` at
+a copy opened read-only (``sqlite:///file:replica.db?mode=ro&uri=true``)
+and refresh it with ``flask snapshot-replica``. Pointing it read-only at
+the primary file itself also works when that file is in WAL mode, since
+WAL readers see a consistent snapshot without blocking the writer.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, TypeVar
+
+import click
+import sqlalchemy as sa
+from flask import Flask, current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+READ_METHODS = frozenset({'GET', 'HEAD'})
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+@contextmanager
+def primary() -> Iterator[None]:
+    """Send every read inside the block to the primary."""
+    previous = g.get('_db_primary', False)
+    g._db_primary = True
+    try:
+        yield
+    finally:
+        g._db_primary = previous
+
+
+def read_from_primary(view: F) -> F:
+    """Opt a view out of replica reads (read-your-writes)."""
+    @wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with primary():
+            return view(*args, **kwargs)
+    return wrapper  # type: ignore[return-value]
+
+
+def _is_write(clause: Any) -> bool:
+    if isinstance(clause, sa.UpdateBase):
+        return True
+    return getattr(clause, '_for_update_arg', None) is not None
+
+
+class RoutingSession(Session):
+    """``db.session`` that reads from the ``replica`` bind where safe."""
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, bind: Any = None, **kwargs: Any) -> Any:
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None:
+            return engine
+        if self._flushing or _is_write(clause):
+            # Stick to the primary for the rest of the session.
+            self.info['wrote'] = True
+            return engine
+        if self.info.get('wrote') or not self._reads_from_replica():
+            return engine
+        engines = self._db.engines
+        replica = engines.get(REPLICA_BIND)
+        if replica is None or engine is not engines.get(None):
+            return engine
+        return replica
+
+    @staticmethod
+    def _reads_from_replica() -> bool:
+        return (
+            has_request_context()
+            and request.method in READ_METHODS
+            and not g.get('_db_primary', False)
+        )
+
+
+def snapshot_sqlite(source: sa.engine.Engine, target_path: str) -> None:
+    """Copy the SQLite database behind ``source`` to ``target_path``.
+
+    Uses SQLite's online backup API, so the copy is consistent even
+    while the primary is being written to.
+    """
+    import sqlite3
+
+    with source.connect() as connection:
+        raw = connection.connection.driver_connection
+        target = sqlite3.connect(target_path)
+        try:
+            raw.backup(target)
+        finally:
+            target.close()
+
+
+def init_app(app: Flask) -> None:
+    """Register the ``snapshot-replica`` command for local testing."""
+
+    @app.cli.command('snapshot-replica')
+    def snapshot_replica() -> None:
+        """Copy the primary SQLite database over the replica file."""
+        engines = current_app.extensions['sqlalchemy'].engines
+        primary_engine = engines[None]
+        replica_engine = engines.get(REPLICA_BIND)
+        if replica_engine is None:
+            raise click.ClickException('DATABASE_REPLICA_URL is not set')
+        if primary_engine.dialect.name != 'sqlite' or replica_engine.dialect.name != 'sqlite':
+            raise click.ClickException('snapshot-replica only supports SQLite databases')
+        target = replica_engine.url.database
+        if target.startswith('file:'):
+            target = target[len('file:'):]
+        replica_engine.dispose()
+        snapshot_sqlite(primary_engine, target)
+        click.echo(f'Replica refreshed: {target}')
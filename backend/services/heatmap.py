@@ -0,0 +1,79 @@
+"""Fixed-bucket pause histograms stored as packed integer arrays.
+
+Player heartbeats report the positions (in seconds) where a student
+paused. Instead of keeping every raw list and re-reading it, each
+video keeps one histogram with a bucket per ``bucket_seconds`` of its
+duration, stored as a little-endian ``uint32`` array in a binary
+column. New pauses are folded in with a vectorised ``bincount`` and an
+element-wise add, so both the write and the read cost depend on the
+video length only, never on the number of recorded sessions.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Iterable, Optional
+
+import numpy as np
+
+DTYPE = np.dtype('<u4')
+BUCKET_SECONDS = 1
+MAX_BUCKETS = 3600
+
+
+def bucket_count(
+    duration_seconds: Optional[int],
+    bucket_seconds: int = BUCKET_SECONDS,
+    max_buckets: int = MAX_BUCKETS,
+) -> int:
+    """Number of buckets for a video of ``duration_seconds`` (0 if unknown)."""
+    if not duration_seconds or duration_seconds <= 0:
+        return 0
+    return min(max_buckets, math.ceil(duration_seconds / bucket_seconds))
+
+
+def histogram(
+    positions: Iterable[float],
+    buckets: int = 0,
+    bucket_seconds: int = BUCKET_SECONDS,
+    max_buckets: int = MAX_BUCKETS,
+) -> np.ndarray:
+    """Count ``positions`` into buckets of ``bucket_seconds``.
+
+    Negative and non-numeric positions are ignored. Positions past the
+    last bucket are counted in it. With ``buckets=0`` (duration not
+    known) the histogram is as long as the furthest pause, capped at
+    ``max_buckets``.
+    """
+    values = np.array(
+        [p for p in positions if isinstance(p, (int, float)) and not isinstance(p, bool)],
+        dtype=np.float64,
+    )
+    values = values[np.isfinite(values) & (values >= 0)]
+    if values.size == 0:
+        return np.zeros(buckets, dtype=DTYPE)
+    index = (values // bucket_seconds).astype(np.int64)
+    size = buckets or min(max_buckets, int(index.max()) + 1)
+    np.minimum(index, size - 1, out=index)
+    return np.bincount(index, minlength=size).astype(DTYPE)
+
+
+def decode(blob: Optional[bytes]) -> np.ndarray:
+    """Unpack a stored histogram (an empty array for ``None``)."""
+    if not blob:
+        return np.zeros(0, dtype=DTYPE)
+    return np.frombuffer(blob, dtype=DTYPE)
+
+
+def merge(blob: Optional[bytes], counts: np.ndarray) -> bytes:
+    """Add ``counts`` to the stored histogram and return the new blob.
+
+    The shorter array is zero-padded, so a histogram started before the
+    duration was known simply grows.
+    """
+    current = decode(blob)
+    size = max(current.size, counts.size)
+    merged = np.zeros(size, dtype=DTYPE)
+    merged[:current.size] += current
+    merged[:counts.size] += counts.astype(DTYPE, copy=False)
+    return merged.tobytes()
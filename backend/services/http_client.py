@@ -0,0 +1,372 @@
+"""Shared outbound HTTP client for upstream APIs (OpenAI, HeyGen).
+
+Creating a client per call means a fresh TCP connection and TLS
+handshake for every upstream request. This module keeps one
+process-wide :class:`httpx.Client` with a keep-alive connection pool
+that every blueprint and background job reuses. The client is
+thread-safe, which is what the WSGI workers and the job pool need.
+
+On top of httpx's global pool limits, a transport wrapper caps the
+number of concurrent requests per upstream host so that one slow
+provider cannot hold every connection, and records per-host counters
+that are exposed through :meth:`OutboundClient.stats`. HTTP/2 is used
+when enabled in :class:`Config` and the ``h2`` package is installed.
+
+The OpenAI SDK is routed through the same pool via
+:meth:`OutboundClient.openai_client`.
+
+:func:`benchmark` (``flask benchmark-http``) measures the difference
+against a local server that adds a fixed delay to each response and to
+each new connection (standing in for the TCP and TLS handshake).
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List
+
+import httpx
+from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # type: ignore  # noqa: F401
+    HTTP2_AVAILABLE = True
+except Exception:  # pragma: no cover
+    HTTP2_AVAILABLE = False
+
+
+# Defaults used when the client is touched before ``init_app`` (e.g. in
+# a script). They mirror the values in :class:`backend.config.Config`.
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    'HTTP_MAX_CONNECTIONS': 100,
+    'HTTP_MAX_KEEPALIVE_CONNECTIONS': 20,
+    'HTTP_KEEPALIVE_EXPIRY_SECONDS': 30.0,
+    'HTTP_PER_HOST_LIMIT': 10,
+    'HTTP_TIMEOUT_SECONDS': 30.0,
+    'HTTP_CONNECT_TIMEOUT_SECONDS': 5.0,
+    'HTTP2_ENABLED': True,
+}
+
+
+class _HostStats:
+    """Mutable counters for one upstream host."""
+
+    __slots__ = ('requests', 'errors', 'in_flight', 'queued', 'rejected', 'total_seconds')
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        average = self.total_seconds / self.requests if self.requests else 0.0
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'rejected': self.rejected,
+            'average_ms': round(average * 1000, 2),
+        }
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body wrapper that frees the host slot once closed.
+
+    Streaming responses keep their connection busy until the body has
+    been consumed, so the per-host slot is held until then as well.
+    """
+
+    def __init__(self, stream: httpx.SyncByteStream, release) -> None:
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class _HostLimitedTransport(httpx.BaseTransport):
+    """Transport that bounds concurrent requests per host."""
+
+    def __init__(self, inner: httpx.HTTPTransport, per_host: int, acquire_timeout: float) -> None:
+        self.inner = inner
+        self._per_host = per_host
+        self._acquire_timeout = acquire_timeout
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self.hosts: Dict[str, _HostStats] = {}
+
+    def _host(self, host: str) -> tuple[threading.BoundedSemaphore, _HostStats]:
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self._per_host)
+                self.hosts[host] = _HostStats()
+            return self._slots[host], self.hosts[host]
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        slot, stats = self._host(request.url.host)
+        if not slot.acquire(blocking=False):
+            with self._lock:
+                stats.queued += 1
+            if not slot.acquire(timeout=self._acquire_timeout):
+                with self._lock:
+                    stats.rejected += 1
+                raise httpx.PoolTimeout(
+                    f"Too many concurrent requests to {request.url.host}", request=request
+                )
+        with self._lock:
+            stats.in_flight += 1
+        started = time.perf_counter()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if released:
+                return
+            released = True
+            with self._lock:
+                stats.in_flight -= 1
+            slot.release()
+
+        try:
+            response = self.inner.handle_request(request)
+        except Exception:
+            with self._lock:
+                stats.errors += 1
+            release()
+            raise
+        with self._lock:
+            stats.requests += 1
+            stats.total_seconds += time.perf_counter() - started
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, release),  # type: ignore[arg-type]
+            extensions=response.extensions,
+        )
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class OutboundClient:
+    """Lazily constructed, process-wide pooled HTTP client."""
+
+    def __init__(self) -> None:
+        self.settings: Dict[str, Any] = dict(DEFAULT_SETTINGS)
+        self._client: httpx.Client | None = None
+        self._transport: _HostLimitedTransport | None = None
+        self._lock = threading.Lock()
+        self._openai_clients: Dict[str, Any] = {}
+
+    def init_app(self, app: Flask) -> None:
+        """Read pool settings from ``app.config``."""
+        for key in DEFAULT_SETTINGS:
+            if key in app.config:
+                self.settings[key] = app.config[key]
+        app.extensions['outbound_http'] = self
+        atexit.register(self.close)
+
+    @property
+    def client(self) -> httpx.Client:
+        """The shared :class:`httpx.Client`, created on first use."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._build()
+        return self._client
+
+    def _build(self) -> httpx.Client:
+        s = self.settings
+        http2 = bool(s['HTTP2_ENABLED']) and HTTP2_AVAILABLE
+        if s['HTTP2_ENABLED'] and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but 'h2' is not installed; using HTTP/1.1")
+        limits = httpx.Limits(
+            max_connections=int(s['HTTP_MAX_CONNECTIONS']),
+            max_keepalive_connections=int(s['HTTP_MAX_KEEPALIVE_CONNECTIONS']),
+            keepalive_expiry=float(s['HTTP_KEEPALIVE_EXPIRY_SECONDS']),
+        )
+        timeout = httpx.Timeout(
+            float(s['HTTP_TIMEOUT_SECONDS']),
+            connect=float(s['HTTP_CONNECT_TIMEOUT_SECONDS']),
+        )
+        self._transport = _HostLimitedTransport(
+            httpx.HTTPTransport(http2=http2, limits=limits, retries=1),
+            per_host=int(s['HTTP_PER_HOST_LIMIT']),
+            acquire_timeout=float(s['HTTP_TIMEOUT_SECONDS']),
+        )
+        return httpx.Client(transport=self._transport, timeout=timeout)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        return self.client.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.client.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.client.post(url, **kwargs)
+
+    def stream(self, method: str, url: str, **kwargs: Any):
+        """Context manager yielding a streamed response (see httpx)."""
+        return self.client.stream(method, url, **kwargs)
+
+    def openai_client(self, api_key: str) -> Any:
+        """Return a cached OpenAI SDK client that uses the shared pool.
+
+        Returns ``None`` when the ``openai`` package is not installed so
+        callers can fall back to their offline path.
+        """
+        try:
+            import openai  # type: ignore
+        except Exception:  # pragma: no cover
+            return None
+        with self._lock:
+            cached = self._openai_clients.get(api_key)
+        if cached is None:
+            cached = openai.OpenAI(api_key=api_key, http_client=self.client)
+            with self._lock:
+                self._openai_clients[api_key] = cached
+        return cached
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool and per-host counters for monitoring."""
+        s = self.settings
+        result: Dict[str, Any] = {
+            'http2': bool(s['HTTP2_ENABLED']) and HTTP2_AVAILABLE,
+            'max_connections': s['HTTP_MAX_CONNECTIONS'],
+            'per_host_limit': s['HTTP_PER_HOST_LIMIT'],
+            'connections': {'total': 0, 'idle': 0, 'active': 0},
+            'hosts': {},
+        }
+        transport = self._transport
+        if transport is None:
+            return result
+        # httpcore does not expose a public stats API; read the pool's
+        # connection list defensively so a library upgrade degrades to
+        # zeros instead of an error.
+        pool = getattr(transport.inner, '_pool', None)
+        connections = list(getattr(pool, 'connections', []) or [])
+        idle = sum(1 for conn in connections if getattr(conn, 'is_idle', lambda: False)())
+        result['connections'] = {
+            'total': len(connections),
+            'idle': idle,
+            'active': len(connections) - idle,
+        }
+        with transport._lock:
+            result['hosts'] = {host: st.as_dict() for host, st in transport.hosts.items()}
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+            self._client = None
+            self._transport = None
+            self._openai_clients.clear()
+
+
+def _latency_server(latency: float, handshake: float) -> ThreadingHTTPServer:
+    """A keep-alive HTTP server on a free local port with artificial delays."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self) -> None:
+            time.sleep(handshake)  # once per connection
+            super().setup()
+
+        def do_GET(self) -> None:
+            time.sleep(latency)
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 128  # the default of 5 drops SYNs under load
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, name='benchmark-http-server', daemon=True).start()
+    return server
+
+
+def _time_calls(call: Callable[[], Any], calls: int, concurrency: int) -> Dict[str, Any]:
+    def timed(_: int) -> float:
+        started = time.perf_counter()
+        call()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies: List[float] = sorted(executor.map(timed, range(calls)))
+    elapsed = time.perf_counter() - started
+    return {
+        'calls_per_second': round(calls / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1),
+        'max_ms': round(latencies[-1] * 1000, 1),
+    }
+
+
+def benchmark(
+    calls: int = 400,
+    concurrency: int = 10,
+    latency_ms: float = 20.0,
+    handshake_ms: float = 30.0,
+    per_host: int = 10,
+) -> Dict[str, Dict[str, Any]]:
+    """Per-call latency: a new client per call vs. the shared pooled client.
+
+    ``calls`` GETs are made from ``concurrency`` threads against a local
+    server that answers after ``latency_ms`` and delays every new
+    connection by ``handshake_ms``. The shared client is an
+    :class:`OutboundClient` limited to ``per_host`` concurrent requests.
+    """
+    server = _latency_server(latency_ms / 1000, handshake_ms / 1000)
+    url = f'http://127.0.0.1:{server.server_address[1]}/'
+    try:
+        def fresh_client() -> None:
+            with httpx.Client(timeout=30) as client:
+                client.get(url).raise_for_status()
+
+        shared = OutboundClient()
+        shared.settings.update({'HTTP2_ENABLED': False, 'HTTP_PER_HOST_LIMIT': per_host})
+        try:
+            shared.get(url).raise_for_status()  # not timed: first connection
+            results = {
+                'client per call': _time_calls(fresh_client, calls, concurrency),
+                f'shared pool ({per_host}/host)': _time_calls(lambda: shared.get(url).raise_for_status(), calls, concurrency),
+            }
+        finally:
+            shared.close()
+        return results
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# Module level instance shared by all blueprints and workers.
+outbound = OutboundClient()
@@ -0,0 +1,185 @@
+"""Per-process cache of the profile behind a JWT identity.
+
+Protected endpoints used to load the user row on every request just to
+read a handful of profile fields. :class:`IdentityCache` registers a
+``user_lookup_loader`` with Flask-JWT-Extended that returns a read-only
+:class:`CachedUser` snapshot of those fields, so ``current_user`` is
+served from memory and the database is only read on a miss or after
+the entry's TTL (``IDENTITY_CACHE_TTL_SECONDS``).
+
+Entries are dropped explicitly when a profile or XP write is committed:
+:meth:`IdentityCache.invalidate_on_commit` remembers the ids on the
+session and drops them again after the commit, so a request that
+reloads the row while the write is still open cannot keep the old
+values. Other worker processes see the change when their entry
+expires, which bounds staleness to the TTL. A lookup that misses
+because the user no longer exists is not cached, so deleted users are
+rejected on their next request.
+
+Only Flask-JWT-Extended, SQLAlchemy and the standard library are
+required, so the ``app_*.py`` monoliths can use it.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+_PENDING_KEY = 'identity_cache_invalidate'
+
+
+class CachedUser:
+    """Read-only profile fields of one user, accessed as attributes."""
+
+    __slots__ = ('_fields',)
+
+    def __init__(self, fields: Dict[str, Any]) -> None:
+        object.__setattr__(self, '_fields', dict(fields))
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._fields[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('CachedUser is read-only; update the User row instead')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._fields)
+
+    def __repr__(self) -> str:
+        return f"<CachedUser {self._fields.get('id')}>"
+
+
+class IdentityCache:
+    """TTL + LRU cache of :class:`CachedUser` keyed by user id."""
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 10000) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, Tuple[float, CachedUser]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a load that started before an
+        # invalidation is returned but not stored.
+        self._generation = 0
+        self._db: Any = None
+        self._model: Any = None
+        self._fields: Sequence[str] = ()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+
+    def init_app(self, app: Any, jwt: Any, db: Any, model: Any, fields: Sequence[str]) -> None:
+        """Serve ``current_user`` from the cache.
+
+        ``fields`` are the columns of ``model`` copied into each
+        :class:`CachedUser`; ``id`` is always included.
+        """
+        self.ttl = float(app.config.get('IDENTITY_CACHE_TTL_SECONDS', self.ttl))
+        self.max_entries = int(app.config.get('IDENTITY_CACHE_SIZE', self.max_entries))
+        self._db = db
+        self._model = model
+        self._fields = ('id', *[field for field in fields if field != 'id'])
+
+        @jwt.user_lookup_loader
+        def _lookup(jwt_header: Dict[str, Any], jwt_data: Dict[str, Any]) -> Optional[CachedUser]:
+            return self.get(jwt_data[app.config.get('JWT_IDENTITY_CLAIM', 'sub')])
+
+        if not event.contains(Session, 'after_commit', _after_commit):
+            event.listen(Session, 'after_commit', _after_commit)
+            event.listen(Session, 'after_rollback', _after_rollback)
+        app.extensions['identity_cache'] = self
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def get(self, identity: Any) -> Optional[CachedUser]:
+        """The cached profile of ``identity``, loading it on a miss."""
+        try:
+            user_id = int(identity)
+        except (TypeError, ValueError):
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[user_id]
+                self.expired += 1
+            self.misses += 1
+            generation = self._generation
+        user = self._load(user_id)
+        if user is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[user_id] = (now + self.ttl, user)
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return user
+
+    def _load(self, user_id: int) -> Optional[CachedUser]:
+        table = self._model.__table__
+        row = self._db.session.execute(
+            select(*[table.c[field] for field in self._fields]).where(table.c.id == user_id)
+        ).first()
+        return CachedUser(dict(row._mapping)) if row is not None else None
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+    def invalidate(self, *user_ids: Any) -> None:
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                if self._entries.pop(int(user_id), None) is not None:
+                    self.invalidations += 1
+
+    def invalidate_on_commit(self, session: Any, user_ids: Iterable[Any]) -> None:
+        """Drop ``user_ids`` now and again once ``session`` commits."""
+        user_ids = [int(user_id) for user_id in user_ids]
+        self.invalidate(*user_ids)
+        pending = session.info.setdefault(_PENDING_KEY, {})
+        pending.setdefault(id(self), (self, set()))[1].update(user_ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _after_commit(session: Session) -> None:
+    for cache, user_ids in session.info.pop(_PENDING_KEY, {}).values():
+        cache.invalidate(*user_ids)
+
+
+def _after_rollback(session: Session) -> None:
+    # Nothing was written; entries dropped early just reload.
+    session.info.pop(_PENDING_KEY, None)
+
+
+identity_cache = IdentityCache()
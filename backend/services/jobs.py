@@ -0,0 +1,294 @@
+"""Database-backed background job queue with a local worker pool.
+
+Route handlers call :meth:`JobQueue.enqueue` to persist a
+:class:`~backend.models.video_job.VideoJob` row and return immediately.
+A small pool of daemon threads (``JOB_WORKERS`` in :class:`Config`)
+claims runnable jobs with a conditional ``UPDATE`` so that several
+threads or gunicorn workers can share one queue without running a job
+twice. Failed jobs are retried with exponential backoff until
+``max_attempts`` is reached; jobs left ``running`` by a crashed worker
+are put back in the queue once their lease expires, and an expired
+lease counts as a failed attempt.
+
+Handlers are re-run from the start on every attempt, so a handler that
+calls a paid upstream records what it got back with
+:meth:`JobQueue.checkpoint` before doing anything else that may fail.
+The value is committed into the job's payload and the next attempt sees
+it and skips the call.
+
+Handlers are plain functions registered with :meth:`JobQueue.handler`.
+They receive the job payload and return a JSON-serialisable result.
+With ``JOB_WORKERS=0`` no threads are started and the queue can be
+drained synchronously via :meth:`JobQueue.run_pending`, which is how
+the queue is exercised offline against the stub upstreams.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import Flask
+
+from ..app import db
+from ..models.video_job import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    VideoJob,
+)
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+class JobQueue:
+    """Persistent job queue drained by a pool of worker threads."""
+
+    def __init__(self) -> None:
+        self.app: Flask | None = None
+        self._handlers: Dict[str, JobHandler] = {}
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------
+    # Setup
+    # ------------------------------------------------------------------
+    def handler(self, kind: str) -> Callable[[JobHandler], JobHandler]:
+        """Register ``func`` as the handler for jobs of type ``kind``."""
+        def decorator(func: JobHandler) -> JobHandler:
+            self._handlers[kind] = func
+            return func
+        return decorator
+
+    def init_app(self, app: Flask) -> None:
+        """Bind the queue to ``app`` and start the configured workers."""
+        self.app = app
+        app.extensions['job_queue'] = self
+        workers = int(app.config.get('JOB_WORKERS', 0))
+        if workers > 0:
+            self.start(workers)
+
+    def start(self, workers: int) -> None:
+        """Start ``workers`` daemon threads polling the queue."""
+        if self._threads:
+            return
+        self._stop.clear()
+        for index in range(workers):
+            thread = threading.Thread(
+                target=self._worker_loop, name=f'job-worker-{index}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        atexit.register(self.shutdown)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Ask the workers to stop and wait for the current jobs."""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # ------------------------------------------------------------------
+    # Producer API
+    # ------------------------------------------------------------------
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        user_id: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        commit: bool = True,
+    ) -> VideoJob:
+        """Persist a new job and wake an idle worker.
+
+        With ``commit=False`` the job is only flushed so that it becomes
+        part of the caller's transaction; it is picked up once the
+        caller commits.
+        """
+        if kind not in self._handlers:
+            raise KeyError(f"No job handler registered for '{kind}'")
+        if max_attempts is None:
+            max_attempts = int(self._config('JOB_MAX_ATTEMPTS', 5))
+        job = VideoJob(kind=kind, payload=payload, user_id=user_id, max_attempts=max_attempts)
+        db.session.add(job)
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+        self._wakeup.set()
+        return job
+
+    # ------------------------------------------------------------------
+    # Consumer API
+    # ------------------------------------------------------------------
+    def run_pending(self, max_jobs: Optional[int] = None) -> int:
+        """Run runnable jobs on the calling thread; return how many ran.
+
+        Must be called inside an application context. Jobs scheduled
+        for a later retry are left alone.
+        """
+        processed = 0
+        while max_jobs is None or processed < max_jobs:
+            job_id = self._claim_next()
+            if job_id is None:
+                break
+            self._execute(job_id)
+            processed += 1
+        return processed
+
+    def requeue_stale(self) -> int:
+        """Return jobs whose worker died mid-run to the queue.
+
+        The claim already counted the attempt, so a job that has used
+        up ``max_attempts`` is failed instead of being run again.
+        """
+        lease = float(self._config('JOB_LEASE_SECONDS', 600))
+        now = datetime.utcnow()
+        stale = VideoJob.query.filter(
+            VideoJob.status == JOB_RUNNING,
+            VideoJob.locked_at < now - timedelta(seconds=lease),
+        )
+        failed = stale.filter(VideoJob.attempts >= VideoJob.max_attempts).update(
+            {
+                'status': JOB_FAILED,
+                'locked_at': None,
+                'last_error': f'Lease of {lease:g}s expired on the last attempt',
+                'updated_at': now,
+            },
+            synchronize_session=False,
+        )
+        count = stale.update(
+            {
+                'status': JOB_QUEUED,
+                'locked_at': None,
+                'last_error': f'Lease of {lease:g}s expired',
+                'run_after': now,
+                'updated_at': now,
+            },
+            synchronize_session=False,
+        )
+        db.session.commit()
+        if failed:
+            logger.error("Failed %d stale background job(s) with no attempts left", failed)
+        if count:
+            logger.warning("Requeued %d stale background job(s)", count)
+        return count
+
+    def checkpoint(self, **values: Any) -> None:
+        """Merge ``values`` into the running job's payload and commit.
+
+        Called from a handler; the next attempt of the job receives the
+        values in its payload. Commits the current session.
+        """
+        job_id = getattr(self._local, 'job_id', None)
+        if job_id is None:
+            raise RuntimeError('checkpoint() called outside a job handler')
+        job: VideoJob = VideoJob.query.get(job_id)
+        job.payload = {**(job.payload or {}), **values}
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+
+    def backoff_seconds(self, attempts: int) -> float:
+        """Delay before retry number ``attempts`` (1-based), capped."""
+        base = float(self._config('JOB_RETRY_BACKOFF_SECONDS', 5))
+        cap = float(self._config('JOB_RETRY_MAX_BACKOFF_SECONDS', 300))
+        return min(cap, base * (2 ** max(attempts - 1, 0)))
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _config(self, key: str, default: Any) -> Any:
+        if self.app is None:
+            return default
+        return self.app.config.get(key, default)
+
+    def _claim_next(self) -> Optional[int]:
+        """Atomically move the oldest runnable job to ``running``."""
+        while True:
+            now = datetime.utcnow()
+            candidate = db.session.query(VideoJob.id).filter(
+                VideoJob.status == JOB_QUEUED,
+                VideoJob.run_after <= now,
+            ).order_by(VideoJob.run_after, VideoJob.id).first()
+            if candidate is None:
+                db.session.commit()
+                return None
+            # Only one worker can win the status transition; the others
+            # see a rowcount of zero and look for the next candidate.
+            claimed = VideoJob.query.filter_by(id=candidate.id, status=JOB_QUEUED).update(
+                {
+                    'status': JOB_RUNNING,
+                    'attempts': VideoJob.attempts + 1,
+                    'locked_at': now,
+                    'updated_at': now,
+                },
+                synchronize_session=False,
+            )
+            db.session.commit()
+            if claimed:
+                return candidate.id
+
+    def _execute(self, job_id: int) -> None:
+        job: VideoJob | None = VideoJob.query.get(job_id)
+        if job is None:
+            return
+        handler = self._handlers.get(job.kind)
+        self._local.job_id = job_id
+        try:
+            if handler is None:
+                raise KeyError(f"No job handler registered for '{job.kind}'")
+            result = handler(dict(job.payload or {}))
+        except Exception as exc:
+            db.session.rollback()
+            job = VideoJob.query.get(job_id)
+            now = datetime.utcnow()
+            job.last_error = f"{type(exc).__name__}: {exc}"
+            job.locked_at = None
+            job.updated_at = now
+            if job.attempts >= job.max_attempts:
+                job.status = JOB_FAILED
+                logger.error("Job %s (%s) failed permanently: %s", job.id, job.kind, exc)
+            else:
+                job.status = JOB_QUEUED
+                job.run_after = now + timedelta(seconds=self.backoff_seconds(job.attempts))
+                logger.warning("Job %s (%s) failed, retrying: %s", job.id, job.kind, exc)
+        else:
+            job.status = JOB_SUCCEEDED
+            job.result = result
+            job.last_error = None
+            job.locked_at = None
+            job.updated_at = datetime.utcnow()
+        finally:
+            self._local.job_id = None
+        db.session.commit()
+
+    def _worker_loop(self) -> None:
+        assert self.app is not None
+        poll = float(self._config('JOB_POLL_INTERVAL_SECONDS', 1.0))
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    if self.run_pending(max_jobs=1) == 0:
+                        self.requeue_stale()
+                        self._wakeup.wait(poll)
+                        self._wakeup.clear()
+                except Exception:  # pragma: no cover
+                    logger.exception("Background worker iteration failed")
+                    db.session.rollback()
+                    self._stop.wait(poll)
+                finally:
+                    db.session.remove()
+
+
+# Module level instance, bound to the application in ``create_app`` in
+# the same way as the ``db`` and ``jwt`` extensions.
+job_queue = JobQueue()
@@ -0,0 +1,266 @@
+"""In-memory XP leaderboard with logarithmic rank queries.
+
+Answering "what is my rank?" with ``COUNT(*) WHERE xp > ?`` costs a
+scan of the XP index per request, which does not hold up at a million
+students. :class:`RankIndex` keeps a Fenwick tree (binary indexed tree)
+over XP values: slot ``x`` holds the number of users with exactly ``x``
+XP, so the number of users ahead of someone is a prefix sum and both
+rank lookups and updates take ``O(log max_xp)``. Top-N is answered by
+walking the tree from the highest XP down, ``O(N log max_xp)``.
+
+:class:`Leaderboard` keeps one index for everybody and one per exam
+type. It is loaded from the database at startup in linear time and then
+updated by the application whenever a user's XP changes. Ties share a
+rank (competition ranking: 1, 2, 2, 4). XP above ``MAX_TRACKED_XP`` is
+clamped so that one outlier cannot blow up the tree's memory.
+
+Only the standard library is used so both apps can share it.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+LeaderboardRow = Tuple[Hashable, int, Optional[str]]
+
+MAX_TRACKED_XP = (1 << 22) - 1
+
+
+def _clamp(xp: Any) -> int:
+    return min(max(int(xp or 0), 0), MAX_TRACKED_XP)
+
+
+class RankIndex:
+    """Order statistics over integer XP values (not thread safe)."""
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._size = 1
+        while self._size < capacity:
+            self._size *= 2
+        self._tree = array('q', bytes(8 * (self._size + 1)))
+        self._xp: Dict[Hashable, int] = {}
+        self._users: Dict[int, Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._xp)
+
+    def __contains__(self, user_id: Hashable) -> bool:
+        return user_id in self._xp
+
+    # -- Fenwick tree over xp + 1 (slot 1 is xp 0) ----------------------
+    def _add(self, xp: int, delta: int) -> None:
+        index = xp + 1
+        while index <= self._size:
+            self._tree[index] += delta
+            index += index & -index
+
+    def _prefix(self, xp: int) -> int:
+        """Users with at most ``xp`` XP."""
+        index = min(xp + 1, self._size)
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def _kth(self, k: int) -> int:
+        """XP value of the ``k``-th lowest user (1-based)."""
+        position = 0
+        step = self._size
+        while step:
+            nxt = position + step
+            if nxt <= self._size and self._tree[nxt] < k:
+                position = nxt
+                k -= self._tree[nxt]
+            step //= 2
+        return position  # slot position + 1 holds xp == position
+
+    def _grow(self, xp: int) -> None:
+        size = self._size
+        while size < xp + 1:
+            size *= 2
+        if size == self._size:
+            return
+        counts = {value: len(users) for value, users in self._users.items()}
+        self._size = size
+        self._build(counts)
+
+    def _build(self, counts: Dict[int, int]) -> None:
+        tree = array('q', bytes(8 * (self._size + 1)))
+        for value, count in counts.items():
+            tree[value + 1] += count
+        # Linear-time Fenwick construction.
+        for index in range(1, self._size + 1):
+            parent = index + (index & -index)
+            if parent <= self._size:
+                tree[parent] += tree[index]
+        self._tree = tree
+
+    # -- public API -------------------------------------------------------
+    def load(self, rows: Iterable[Tuple[Hashable, int]]) -> None:
+        """Replace the contents with ``(user_id, xp)`` pairs."""
+        self._xp = {}
+        self._users = {}
+        for user_id, xp in rows:
+            xp = _clamp(xp)
+            self._xp[user_id] = xp
+            self._users.setdefault(xp, set()).add(user_id)
+        top = max(self._users, default=0)
+        while self._size < top + 1:
+            self._size *= 2
+        self._build({value: len(users) for value, users in self._users.items()})
+
+    def set(self, user_id: Hashable, xp: int) -> None:
+        xp = _clamp(xp)
+        old = self._xp.get(user_id)
+        if old == xp:
+            return
+        if old is not None:
+            self._discard(user_id, old)
+        if xp + 1 > self._size:
+            self._grow(xp)
+        self._xp[user_id] = xp
+        self._users.setdefault(xp, set()).add(user_id)
+        self._add(xp, 1)
+
+    def remove(self, user_id: Hashable) -> None:
+        old = self._xp.get(user_id)
+        if old is not None:
+            self._discard(user_id, old)
+
+    def _discard(self, user_id: Hashable, xp: int) -> None:
+        del self._xp[user_id]
+        users = self._users[xp]
+        users.discard(user_id)
+        if not users:
+            del self._users[xp]
+        self._add(xp, -1)
+
+    def xp(self, user_id: Hashable) -> Optional[int]:
+        return self._xp.get(user_id)
+
+    def rank(self, user_id: Hashable) -> Optional[int]:
+        """1-based rank of ``user_id`` or ``None`` if unknown."""
+        xp = self._xp.get(user_id)
+        if xp is None:
+            return None
+        return len(self._xp) - self._prefix(xp) + 1
+
+    def top(self, n: int) -> List[Dict[str, Any]]:
+        """The ``n`` highest users as ``{'user_id', 'xp', 'rank'}``."""
+        result: List[Dict[str, Any]] = []
+        total = len(self._xp)
+        ahead = 0
+        while len(result) < n and ahead < total:
+            xp = self._kth(total - ahead)
+            users = sorted(self._users[xp], key=str)
+            for user_id in users[:n - len(result)]:
+                result.append({'user_id': user_id, 'xp': xp, 'rank': ahead + 1})
+            ahead += len(users)
+        return result
+
+
+class Leaderboard:
+    """Global and per exam type rank indexes behind one lock."""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._global = RankIndex()
+        self._scopes: Dict[str, RankIndex] = {}
+        self._scope_of: Dict[Hashable, Optional[str]] = {}
+        self._refresh_thread: threading.Thread | None = None
+        self.loaded_at: Optional[float] = None
+
+    def load(self, rows: Iterable[LeaderboardRow]) -> int:
+        """Rebuild from ``(user_id, xp, exam_type)`` rows; return the count."""
+        rows = list(rows)
+        grouped: Dict[str, List[Tuple[Hashable, int]]] = {}
+        for user_id, xp, scope in rows:
+            if scope:
+                grouped.setdefault(scope, []).append((user_id, xp))
+        overall = RankIndex()
+        overall.load((user_id, xp) for user_id, xp, _ in rows)
+        scopes = {}
+        for scope, members in grouped.items():
+            scopes[scope] = RankIndex()
+            scopes[scope].load(members)
+        with self._lock:
+            self._global = overall
+            self._scopes = scopes
+            self._scope_of = {user_id: scope for user_id, _, scope in rows}
+            self.loaded_at = time.time()
+        return len(rows)
+
+    def update(self, user_id: Hashable, xp: int, exam_type: Optional[str] = None) -> None:
+        """Record the current XP (and exam type) of ``user_id``."""
+        with self._lock:
+            self._global.set(user_id, xp)
+            old_scope = self._scope_of.get(user_id)
+            if old_scope and old_scope != exam_type:
+                self._scopes[old_scope].remove(user_id)
+            if exam_type:
+                self._scopes.setdefault(exam_type, RankIndex()).set(user_id, xp)
+            self._scope_of[user_id] = exam_type
+
+    def remove(self, user_id: Hashable) -> None:
+        with self._lock:
+            self._global.remove(user_id)
+            scope = self._scope_of.pop(user_id, None)
+            if scope:
+                self._scopes[scope].remove(user_id)
+
+    def exam_type(self, user_id: Hashable) -> Optional[str]:
+        with self._lock:
+            return self._scope_of.get(user_id)
+
+    def _index(self, exam_type: Optional[str]) -> Optional[RankIndex]:
+        return self._scopes.get(exam_type) if exam_type else self._global
+
+    def rank(self, user_id: Hashable, exam_type: Optional[str] = None) -> Optional[int]:
+        with self._lock:
+            index = self._index(exam_type)
+            return index.rank(user_id) if index else None
+
+    def size(self, exam_type: Optional[str] = None) -> int:
+        with self._lock:
+            index = self._index(exam_type)
+            return len(index) if index else 0
+
+    def top(self, n: int = 10, exam_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            index = self._index(exam_type)
+            return index.top(n) if index else []
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'users': len(self._global),
+                'exam_types': {scope: len(index) for scope, index in self._scopes.items()},
+                'loaded_at': self.loaded_at,
+            }
+
+    def auto_refresh(self, loader: Callable[[], Iterable[LeaderboardRow]], interval: float) -> None:
+        """Reload from ``loader()`` every ``interval`` seconds in the background.
+
+        Each process only sees its own writes; the periodic reload picks
+        up XP changed by other workers or by bulk SQL.
+        """
+        if self._refresh_thread is not None or interval <= 0:
+            return
+
+        def run() -> None:
+            while True:
+                time.sleep(interval)
+                try:
+                    self.load(loader())
+                except Exception:
+                    logger.exception("Leaderboard refresh failed")
+
+        self._refresh_thread = threading.Thread(target=run, name='leaderboard-refresh', daemon=True)
+        self._refresh_thread.start()
@@ -0,0 +1,39 @@
+"""XP to level mapping backed by a precomputed threshold table.
+
+``LEVEL_THRESHOLDS[n]`` is the total XP needed to reach level ``n + 1``.
+Level ``L`` costs ``XP_PER_LEVEL * (L - 1)`` XP more than level
+``L - 1`` (0, 100, 300, 600, 1000, ...), so early levels come quickly
+and later ones take longer. The table is built once at import time, and
+:func:`level_for` is a binary search over it instead of a loop or a
+formula re-evaluated per call.
+
+Only the standard library is used so both apps can share it.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import List
+
+XP_PER_LEVEL = 100
+MAX_LEVEL = 100
+
+
+def _thresholds(max_level: int = MAX_LEVEL, step: int = XP_PER_LEVEL) -> List[int]:
+    thresholds = [0]
+    for level in range(2, max_level + 1):
+        thresholds.append(thresholds[-1] + step * (level - 1))
+    return thresholds
+
+
+LEVEL_THRESHOLDS: List[int] = _thresholds()
+
+
+def level_for(xp: int) -> int:
+    """Level reached with ``xp`` total XP (1 .. ``MAX_LEVEL``)."""
+    return max(1, bisect_right(LEVEL_THRESHOLDS, max(xp or 0, 0)))
+
+
+def xp_for_level(level: int) -> int:
+    """Total XP needed to reach ``level``."""
+    return LEVEL_THRESHOLDS[min(max(level, 1), MAX_LEVEL) - 1]
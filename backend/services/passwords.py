@@ -0,0 +1,197 @@
+"""Password hashing in a bounded process pool.
+
+Password KDFs are deliberately CPU-bound: one scrypt or PBKDF2 check
+takes tens of milliseconds of pure computation, and during a login
+storm those checks hold the GIL and stall every other request on the
+worker. :class:`PasswordHasher` runs ``generate_password_hash`` and
+``check_password_hash`` in a :class:`~concurrent.futures.ProcessPoolExecutor`
+of ``PASSWORD_HASH_WORKERS`` processes, so the request thread only
+waits on a future. At most ``PASSWORD_HASH_MAX_PENDING`` operations may
+be queued; beyond that :class:`HasherBusy` is raised so the route can
+answer 503 instead of letting the queue grow without bound.
+
+The algorithm and cost come from ``PASSWORD_HASH_METHOD`` in werkzeug's
+notation (``scrypt:32768:8:1``, ``pbkdf2:sha256:600000``). Hashes store
+their own parameters, so :meth:`PasswordHasher.verify_and_update`
+returns a fresh hash whenever a successful login used a hash made with
+other parameters; raising the cost therefore upgrades users as they
+log in. :func:`benchmark` measures logins per second per core for a
+list of methods so the cost can be tuned to the hardware.
+
+Bulk jobs such as roster imports use :func:`hash_many` with their own
+:func:`process_pool`, so they do not queue behind (or starve) logins.
+
+With ``PASSWORD_HASH_WORKERS=0`` everything runs inline, which is what
+tests and scripts want. Only werkzeug and the standard library are
+required, so the ``app_*.py`` monoliths can use it.
+"""
+
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+BENCHMARK_METHODS = [
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:1000000',
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+    'scrypt:65536:8:1',
+]
+
+
+class HasherBusy(RuntimeError):
+    """Too many hashing operations are already queued."""
+
+
+def _hash(password: str, method: str) -> str:
+    return generate_password_hash(password, method=method)
+
+
+def _verify(stored: str, password: str) -> bool:
+    return check_password_hash(stored, password)
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    # Spawned (not forked) workers: forking a threaded server can copy
+    # held locks into the child.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def hash_many(
+    passwords: List[str],
+    method: str = DEFAULT_METHOD,
+    pool: Optional[ProcessPoolExecutor] = None,
+    chunksize: int = 1,
+) -> List[str]:
+    """Hash ``passwords`` in order, spread over ``pool`` when given."""
+    if pool is None:
+        return [_hash(password, method) for password in passwords]
+    return list(pool.map(_hash, passwords, repeat(method), chunksize=chunksize))
+
+
+def method_of(stored: str) -> str:
+    """The parameter prefix of a werkzeug hash (``'scrypt:32768:8:1'``)."""
+    return stored.split('$', 1)[0] if stored else ''
+
+
+def normalize_method(method: str) -> str:
+    """Expand werkzeug's shorthand (``'scrypt'``, ``'pbkdf2'``) to full parameters."""
+    return method_of(generate_password_hash('', method=method))
+
+
+class PasswordHasher:
+    """Hash and verify passwords off the request thread."""
+
+    def __init__(self, method: str = DEFAULT_METHOD, workers: int = 0, max_pending: int = 64, timeout: float = 10.0) -> None:
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool: ProcessPoolExecutor | None = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Any) -> None:
+        self.method = normalize_method(app.config.get('PASSWORD_HASH_METHOD', self.method))
+        self.workers = int(app.config.get('PASSWORD_HASH_WORKERS', self.workers))
+        self.max_pending = int(app.config.get('PASSWORD_HASH_MAX_PENDING', self.max_pending))
+        self.timeout = float(app.config.get('PASSWORD_HASH_TIMEOUT_SECONDS', self.timeout))
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        app.extensions['password_hasher'] = self
+
+    # ------------------------------------------------------------------
+    # Pool
+    # ------------------------------------------------------------------
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = process_pool(self.workers)
+                atexit.register(self.shutdown)
+            return self._pool
+
+    def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.workers <= 0:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy('Password hashing queue is full')
+        try:
+            return self._executor().submit(func, *args).result(timeout=self.timeout)
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password, self.method)
+
+    def verify(self, stored: Optional[str], password: Optional[str]) -> bool:
+        if not stored or password is None:
+            return False
+        return self._run(_verify, stored, password)
+
+    def needs_rehash(self, stored: str) -> bool:
+        return method_of(stored) != self.method
+
+    def verify_and_update(self, stored: Optional[str], password: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """Return ``(valid, new_hash)``; ``new_hash`` is set when the stored
+        hash used other parameters than the configured method."""
+        if not self.verify(stored, password):
+            return False, None
+        if self.needs_rehash(stored):
+            return True, self.hash(password)
+        return True, None
+
+
+def _time_checks(method: str, rounds: int) -> float:
+    stored = generate_password_hash('correct horse battery staple', method=method)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        check_password_hash(stored, 'correct horse battery staple')
+    return (time.perf_counter() - started) / rounds
+
+
+def benchmark(methods: Iterable[str] = BENCHMARK_METHODS, rounds: int = 5, workers: int = 0) -> List[Dict[str, Any]]:
+    """Logins per second per core for each method.
+
+    One check per method is timed ``rounds`` times on this process. With
+    ``workers`` > 0 the same checks are also run through a pool of that
+    size to show the aggregate throughput.
+    """
+    results = []
+    for method in methods:
+        seconds = _time_checks(method, rounds)
+        result: Dict[str, Any] = {
+            'method': method,
+            'ms_per_login': round(seconds * 1000, 1),
+            'logins_per_second_per_core': round(1 / seconds, 1),
+        }
+        if workers > 0:
+            stored = generate_password_hash('correct horse battery staple', method=method)
+            jobs = rounds * workers
+            with process_pool(workers) as pool:
+                list(pool.map(_verify, [stored] * workers, ['warm-up'] * workers))
+                started = time.perf_counter()
+                list(pool.map(_verify, [stored] * jobs, ['correct horse battery staple'] * jobs))
+                result['pool_logins_per_second'] = round(jobs / (time.perf_counter() - started), 1)
+        results.append(result)
+    return results
+
+
+password_hasher = PasswordHasher()
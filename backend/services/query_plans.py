@@ -0,0 +1,48 @@
+"""``EXPLAIN QUERY PLAN`` checks for the hot read queries.
+
+Per-user list and dashboard queries must be answered from an index on
+``(user_id, <time column>)``; a model change that drops or reorders such
+an index would silently turn them into full table scans that only show
+up once the tables are large. :func:`check_plans` runs SQLite's
+``EXPLAIN QUERY PLAN`` for a set of named statements and reports every
+step that scans a whole table or sorts the result in a temporary
+B-tree, so the apps can expose it as a CLI command and fail CI on a
+regression.
+
+Only SQLAlchemy and SQLite are required, so the ``app_*.py`` monoliths
+can use it.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Mapping
+
+_FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)(?:TABLE )?(\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)')
+_TEMP_SORT = re.compile(r'^USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY')
+
+
+def explain(connection: Any, statement: Any) -> List[str]:
+    """Return the ``detail`` column of the SQLite query plan for ``statement``."""
+    compiled = statement.compile(dialect=connection.dialect)
+    params = tuple(compiled.params[name] for name in (compiled.positiontup or ()))
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def plan_problems(plan: List[str]) -> List[str]:
+    """Steps of ``plan`` that read a whole table or sort without an index."""
+    return [step for step in plan if _FULL_SCAN.match(step) or _TEMP_SORT.match(step)]
+
+
+def check_plans(connection: Any, queries: Mapping[str, Any]) -> Dict[str, Dict[str, List[str]]]:
+    """Explain every statement in ``queries`` (name -> statement).
+
+    Returns ``{name: {'plan': [...], 'problems': [...]}}``; a query
+    passes when its ``problems`` list is empty.
+    """
+    report = {}
+    for name, statement in queries.items():
+        plan = explain(connection, statement)
+        report[name] = {'plan': plan, 'problems': plan_problems(plan)}
+    return report
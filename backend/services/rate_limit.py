@@ -0,0 +1,282 @@
+"""Token-bucket rate limiting for expensive endpoints.
+
+OCR, TTS, LLM and video endpoints each start seconds of CPU or paid
+upstream work, so one misbehaving client can saturate a worker.
+:class:`RateLimiter` installs a ``before_request`` hook that looks up
+the route's policy in ``RATE_LIMITS`` (URL rule -> ``'N/period'``) and
+takes one token from the caller's bucket. A bucket holds at most ``N``
+tokens and refills at ``N`` per period, so a client may burst up to
+``N`` calls and is then held to the steady rate. Callers are keyed by
+JWT identity when a valid token is sent and by remote address
+otherwise. A rejected request gets ``429`` with ``Retry-After`` (whole
+seconds until a token is available); allowed ones carry
+``X-RateLimit-Limit`` and ``X-RateLimit-Remaining``.
+
+A policy whose key is not a URL rule (e.g. ``'video-generation'``) is
+never applied before a request. Handlers take from it themselves with
+:meth:`RateLimiter.try_acquire` to throttle one expensive side effect
+while still doing the rest of the request.
+
+Buckets live in one of two backends (``RATE_LIMIT_BACKEND``):
+
+``memory``
+    A dict in this process. Fast, but each gunicorn worker enforces
+    its own limit.
+``sqlite``
+    A small SQLite file (``RATE_LIMIT_SQLITE_PATH``) shared by every
+    worker on the host, memory-mapped and in WAL mode. Each take is a
+    single ``BEGIN IMMEDIATE`` read-modify-write, so limits hold across
+    processes.
+
+Only Flask, Flask-JWT-Extended and the standard library are required,
+so the ``app_*.py`` monoliths can use it.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from flask import g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# (allowed, retry_after_seconds, tokens_left)
+Take = Tuple[bool, float, float]
+
+
+def parse_policy(policy: str) -> Tuple[int, float]:
+    """``'10/minute'`` -> ``(capacity, refill tokens per second)``."""
+    count, _, period = policy.strip().partition('/')
+    period = period.strip().lower().rstrip('s')
+    if period not in PERIODS or not count.strip().isdigit() or int(count) <= 0:
+        raise ValueError(f'Invalid rate limit policy {policy!r}; expected e.g. 10/minute')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period]
+
+
+def parse_policies(value: Any) -> Dict[str, Tuple[int, float]]:
+    """Policies from a mapping or a ``'rule=N/period;rule=N/period'`` string."""
+    if isinstance(value, str):
+        value = dict(
+            item.split('=', 1) for item in value.split(';') if item.strip()
+        )
+    return {rule.strip(): parse_policy(policy) for rule, policy in (value or {}).items()}
+
+
+def refill(tokens: float, updated: float, capacity: int, rate: float, now: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def take_token(tokens: float, capacity: int, rate: float) -> Take:
+    """Take one token from a bucket that currently holds ``tokens``."""
+    if tokens >= 1:
+        return True, 0.0, tokens - 1
+    return False, (1 - tokens) / rate, tokens
+
+
+class MemoryBackend:
+    """Buckets in a dict of this process."""
+
+    def __init__(self, max_keys: int = 100000) -> None:
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float, now: float) -> Take:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            allowed, retry_after, left = take_token(refill(tokens, updated, capacity, rate, now), capacity, rate)
+            self._buckets[key] = (left, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return allowed, retry_after, left
+
+    def _prune(self, now: float) -> None:
+        # Drop the least recently used half; an evicted bucket comes
+        # back full, which only ever errs towards allowing a call.
+        ordered = sorted(self._buckets.items(), key=lambda item: item[1][1])
+        for key, _ in ordered[: len(ordered) // 2]:
+            del self._buckets[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBackend:
+    """Buckets in an SQLite file shared by all worker processes."""
+
+    def __init__(self, path: str, mmap_size: int = 8 * 1024 * 1024, prune_seconds: float = 86400) -> None:
+        self.path = path
+        self.mmap_size = mmap_size
+        self.prune_seconds = prune_seconds
+        self._local = threading.local()
+        self._pruned = 0.0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) WITHOUT ROWID'
+            )
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=OFF')  # buckets are disposable
+        connection.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread (and per process: the pid check
+        # keeps a forked worker from reusing its parent's handle).
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = self._local.connection = self._connect()
+            self._local.pid = os.getpid()
+        return connection
+
+    def take(self, key: str, capacity: int, rate: float, now: float) -> Take:
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            allowed, retry_after, left = take_token(refill(tokens, updated, capacity, rate, now), capacity, rate)
+            connection.execute(
+                'INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)', (key, left, now)
+            )
+            if now - self._pruned > self.prune_seconds / 24:
+                # Buckets untouched this long are full again; forget them.
+                connection.execute('DELETE FROM buckets WHERE updated < ?', (now - self.prune_seconds,))
+                self._pruned = now
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return allowed, retry_after, left
+
+    def clear(self) -> None:
+        self._connection().execute('DELETE FROM buckets')
+
+
+class RateLimiter:
+    """Per-route, per-caller token buckets checked before each request."""
+
+    def __init__(self) -> None:
+        self.enabled = True
+        self.policies: Dict[str, Tuple[int, float]] = {}
+        self.backend: Any = MemoryBackend()
+        self.allowed = 0
+        self.limited = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Any) -> None:
+        self.enabled = bool(app.config.get('RATE_LIMIT_ENABLED', True))
+        self.policies = parse_policies(app.config.get('RATE_LIMITS', {}))
+        if app.config.get('RATE_LIMIT_BACKEND', 'memory') == 'sqlite':
+            path = app.config.get('RATE_LIMIT_SQLITE_PATH') or os.path.join(app.instance_path, 'rate_limits.db')
+            self.backend = SQLiteBackend(path)
+        else:
+            self.backend = MemoryBackend(int(app.config.get('RATE_LIMIT_MAX_KEYS', 100000)))
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.extensions['rate_limiter'] = self
+
+    @staticmethod
+    def caller() -> str:
+        """JWT identity when the request carries a valid token, else the address."""
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            identity = None
+        if identity is not None:
+            return f'user:{identity}'
+        return f'ip:{request.remote_addr}'
+
+    def check(self, rule: str, caller: str, now: Optional[float] = None) -> Optional[Take]:
+        """Take a token for ``caller`` on ``rule``; ``None`` if the rule is unlimited."""
+        policy = self.policies.get(rule)
+        if policy is None:
+            return None
+        capacity, rate = policy
+        result = self.backend.take(f'{rule}|{caller}', capacity, rate, time.time() if now is None else now)
+        with self._lock:
+            if result[0]:
+                self.allowed += 1
+            else:
+                self.limited += 1
+        return result
+
+    def try_acquire(self, name: str) -> Tuple[bool, float]:
+        """Take a token for the current caller from policy ``name``.
+
+        Returns ``(allowed, retry_after_seconds)``. An unknown policy, a
+        disabled limiter or a failing backend allow.
+        """
+        if not self.enabled or name not in self.policies:
+            return True, 0.0
+        try:
+            allowed, retry_after, _ = self.check(name, self.caller())
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            logger.warning("Rate limit check failed for %s: %s", name, e)
+            return True, 0.0
+        return allowed, retry_after
+
+    def _before_request(self) -> Any:
+        rule = request.url_rule.rule if request.url_rule is not None else None
+        if not self.enabled or rule not in self.policies or request.method == 'OPTIONS':
+            return None
+        try:
+            allowed, retry_after, left = self.check(rule, self.caller())
+        except Exception as e:
+            # A broken shared store must not take the endpoints down.
+            with self._lock:
+                self.errors += 1
+            logger.warning("Rate limit check failed for %s: %s", rule, e)
+            return None
+        capacity = self.policies[rule][0]
+        g.rate_limit = (capacity, int(left))
+        if allowed:
+            return None
+        response = jsonify({"error": "Too many requests, please slow down", "retry_after": math.ceil(retry_after)})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def _after_request(self, response: Any) -> Any:
+        limit = g.pop('rate_limit', None)
+        if limit is not None:
+            response.headers['X-RateLimit-Limit'] = str(limit[0])
+            response.headers['X-RateLimit-Remaining'] = str(limit[1])
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'backend': 'sqlite' if isinstance(self.backend, SQLiteBackend) else 'memory',
+                'policies': {rule: f'{capacity} burst, {rate:.4g}/s' for rule, (capacity, rate) in self.policies.items()},
+                'allowed': self.allowed,
+                'limited': self.limited,
+                'errors': self.errors,
+            }
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,250 @@
+"""Token revocation list behind an in-memory Bloom filter.
+
+Access tokens are short-lived and paired with a refresh token, so a
+stolen token can be cut off by revoking it. Revoked token ids (``jti``)
+are stored in a table; :class:`RevocationList` registers Flask-JWT-
+Extended's ``token_in_blocklist_loader`` and answers it from a
+:class:`BloomFilter` of those ids. A token that is not in the filter is
+certainly not revoked, which is the answer for almost every request and
+costs a few hashes. Only a filter hit (a revoked token, or a false
+positive at roughly ``JWT_REVOCATION_ERROR_RATE``) is confirmed with a
+primary-key lookup.
+
+:func:`issue_tokens` creates an access/refresh pair in which the access
+token carries its refresh token's id (``rjti``), so :func:`logout` can
+revoke both with one call. Refreshing revokes the refresh token used
+(rotation), so a copied refresh token works at most once.
+
+Revocations made in this process are added to the filter at once.
+Every ``JWT_REVOCATION_REFRESH_SECONDS`` the filter picks up rows that
+other processes inserted (``WHERE id > last seen id``), which bounds how
+long a token revoked elsewhere stays usable. Bloom filters cannot
+forget, so the filter is rebuilt from the table when it has taken more
+ids than it was sized for, and after ``purge`` has deleted the rows of
+tokens that have expired anyway.
+
+Lookups use their own connection on the primary engine, never the
+request's session, so they neither read a lagging replica nor join the
+request's transaction. Only SQLAlchemy, Flask-JWT-Extended and the
+standard library are required, so the ``app_*.py`` monoliths can use it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from flask import current_app
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token
+from sqlalchemy import func, select
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001) -> None:
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest.
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """Revoked ``jti`` values: a table plus a per-process Bloom filter."""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001, refresh_seconds: float = 5.0) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self._db: Any = None
+        self._model: Any = None
+        self._filter: Optional[BloomFilter] = None
+        self._last_id = 0
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.filter_hits = 0
+        self.false_positives = 0
+
+    def init_app(self, app: Any, jwt: Any, db: Any, model: Any) -> None:
+        """Check every protected request against the revocation list.
+
+        ``model`` needs ``id``, ``jti``, ``token_type``, ``user_id``,
+        ``expires_at`` and ``revoked_at`` columns.
+        """
+        self.capacity = int(app.config.get('JWT_REVOCATION_CAPACITY', self.capacity))
+        self.error_rate = float(app.config.get('JWT_REVOCATION_ERROR_RATE', self.error_rate))
+        self.refresh_seconds = float(app.config.get('JWT_REVOCATION_REFRESH_SECONDS', self.refresh_seconds))
+        self._db = db
+        self._model = model
+
+        @jwt.token_in_blocklist_loader
+        def _revoked(jwt_header: Dict[str, Any], jwt_payload: Dict[str, Any]) -> bool:
+            return self.is_revoked(jwt_payload['jti'])
+
+        app.extensions['revocation_list'] = self
+
+    # ------------------------------------------------------------------
+    # Filter maintenance
+    # ------------------------------------------------------------------
+    def _table(self) -> Any:
+        return self._model.__table__
+
+    def rebuild(self) -> None:
+        """Reload the filter from every row of the table."""
+        table = self._table()
+        with self._db.engine.connect() as connection:
+            total = connection.execute(select(func.count()).select_from(table)).scalar() or 0
+            bloom = BloomFilter(max(self.capacity, total * 2), self.error_rate)
+            last_id = 0
+            for row_id, jti in connection.execute(select(table.c.id, table.c.jti).order_by(table.c.id)):
+                bloom.add(jti)
+                last_id = row_id
+        with self._lock:
+            self._filter = bloom
+            self._last_id = last_id
+            self._refreshed = time.monotonic()
+
+    def _refresh(self) -> None:
+        """Add rows inserted by other processes since the last look."""
+        with self._lock:
+            # Other threads keep using the current filter meanwhile.
+            self._refreshed = time.monotonic()
+        table = self._table()
+        with self._db.engine.connect() as connection:
+            rows = connection.execute(
+                select(table.c.id, table.c.jti).where(table.c.id > self._last_id).order_by(table.c.id)
+            ).all()
+        with self._lock:
+            for row_id, jti in rows:
+                self._filter.add(jti)
+                self._last_id = max(self._last_id, row_id)
+            full = self._filter.count > self._filter.capacity
+        if full:
+            self.rebuild()
+
+    def _current(self) -> BloomFilter:
+        if self._filter is None:
+            self.rebuild()
+        elif time.monotonic() - self._refreshed >= self.refresh_seconds:
+            self._refresh()
+        return self._filter
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def is_revoked(self, jti: str) -> bool:
+        self.checks += 1
+        if jti not in self._current():
+            return False
+        self.filter_hits += 1
+        table = self._table()
+        with self._db.engine.connect() as connection:
+            revoked = connection.execute(select(table.c.id).where(table.c.jti == jti)).first() is not None
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    def revoke(self, session: Any, payload: Dict[str, Any]) -> None:
+        """Add the token described by ``payload`` (decoded JWT) to the list.
+
+        The row is added to ``session``; the caller commits. The id goes
+        into this process's filter right away.
+        """
+        jti = payload['jti']
+        expires = payload.get('exp')
+        session.add(self._model(
+            jti=jti,
+            token_type=payload.get('type', 'access'),
+            user_id=_user_id(payload.get('sub')),
+            expires_at=datetime.fromtimestamp(expires, timezone.utc).replace(tzinfo=None) if expires else None,
+            revoked_at=datetime.utcnow(),
+        ))
+        bloom = self._current()
+        with self._lock:
+            bloom.add(jti)
+
+    def logout(self, session: Any, payload: Dict[str, Any]) -> None:
+        """Revoke the access token ``payload`` and the refresh token paired with it."""
+        self.revoke(session, payload)
+        refresh_jti = payload.get('rjti')
+        if refresh_jti and not self.is_revoked(refresh_jti):
+            # The refresh token outlives the access token; its exact
+            # expiry is not in this payload, so keep the row for the
+            # longest a refresh token can live.
+            lifetime = current_app.config.get('JWT_REFRESH_TOKEN_EXPIRES')
+            expires = datetime.utcnow() + lifetime if isinstance(lifetime, timedelta) else None
+            self.revoke(session, {
+                'jti': refresh_jti,
+                'type': 'refresh',
+                'sub': payload.get('sub'),
+                'exp': expires.replace(tzinfo=timezone.utc).timestamp() if expires else None,
+            })
+
+    def purge(self, now: Optional[datetime] = None) -> int:
+        """Delete rows of tokens past their expiry and rebuild the filter."""
+        table = self._table()
+        with self._db.engine.begin() as connection:
+            deleted = connection.execute(
+                table.delete().where(table.c.expires_at < (now or datetime.utcnow()))
+            ).rowcount
+        self.rebuild()
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        bloom = self._filter
+        return {
+            'entries': bloom.count if bloom else 0,
+            'capacity': bloom.capacity if bloom else self.capacity,
+            'filter_bits': bloom.size if bloom else 0,
+            'hash_functions': bloom.hashes if bloom else 0,
+            'checks': self.checks,
+            'filter_hits': self.filter_hits,
+            'false_positives': self.false_positives,
+        }
+
+
+def issue_tokens(identity: Any, **claims: Any) -> Dict[str, str]:
+    """A refresh token and an access token that knows its refresh token's id.
+
+    The identity is stored as a string: PyJWT rejects tokens whose
+    ``sub`` claim is not one.
+    """
+    identity = str(identity)
+    refresh_token = create_refresh_token(identity=identity)
+    refresh_jti = decode_token(refresh_token)['jti']
+    access_token = create_access_token(identity=identity, additional_claims={'rjti': refresh_jti, **claims})
+    return {'access_token': access_token, 'refresh_token': refresh_token}
+
+
+def _user_id(identity: Any) -> Optional[int]:
+    try:
+        return int(identity)
+    except (TypeError, ValueError):
+        return None
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,320 @@
+"""Streaming bulk import of student rosters.
+
+Registering a class one ``/api/auth/register`` call at a time costs a
+duplicate-email query, a password hash and a commit per student.
+:class:`RosterImport` reads a CSV or NDJSON roster as a stream and
+handles it in batches of ``ROSTER_IMPORT_BATCH_SIZE`` records:
+
+1. records are validated and emails normalised the way register does;
+   repeats inside the file are caught with a set of the emails and
+   usernames seen so far (only those are kept, not the records);
+2. one ``SELECT ... WHERE email IN (...) OR username IN (...)`` finds
+   the students who already have an account;
+3. the remaining passwords are hashed in a process pool across all
+   cores (:func:`~backend.services.passwords.hash_many`);
+4. the batch is inserted with one ``executemany`` in its own
+   transaction.
+
+:meth:`RosterImport.run` yields one result per record as soon as its
+batch is done, so both the endpoint and the CLI can stream a report
+without holding the roster or the report in memory. Records without a
+password get a random temporary one, which is returned in that row's
+result so the school can hand it out.
+
+Imports started over HTTP share one process pool through
+:data:`roster_imports` (:class:`ImportSlots`), which also caps how many
+run at once (``ROSTER_IMPORT_CONCURRENCY``); a request that finds every
+slot taken is turned away instead of starting more hashing processes.
+"""
+
+from __future__ import annotations
+
+import atexit
+import codecs
+import csv
+import json
+import secrets
+import threading
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Table, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from . import passwords
+
+FORMATS = ('csv', 'ndjson')
+
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+# (line, record, result decided before the database is asked)
+Entry = Tuple[int, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+class RosterError(ValueError):
+    """The roster cannot be read at all (unknown format, bad header)."""
+
+
+def detect_format(filename: str = '', content_type: str = '', explicit: str = '') -> str:
+    """``'csv'`` or ``'ndjson'`` from an explicit name, the file name or the MIME type."""
+    if explicit:
+        explicit = explicit.lower()
+        if explicit not in FORMATS:
+            raise RosterError(f"format must be one of {', '.join(FORMATS)}")
+        return explicit
+    filename = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if filename.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'ndjson'
+    if filename.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    raise RosterError('Cannot tell the roster format; pass format=csv or format=ndjson')
+
+
+def _text(stream: IO[Any]) -> Iterator[str]:
+    """Decode a binary or text stream line by line (BOM tolerated)."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    while True:
+        chunk = stream.read(64 * 1024)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        lines = pending.splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(('\n', '\r')) else ''
+        yield from lines
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def read_records(stream: IO[Any], fmt: str) -> Iterator[Record]:
+    """Iterate ``(line, record, error)`` over the roster entries.
+
+    ``line`` is the 1-based line of the entry (the CSV header is line
+    1). Unreadable entries come with ``record=None`` and an error
+    message instead of aborting the import. A CSV header is checked
+    here, before the first entry is read, so a bad file raises
+    :class:`RosterError` up front.
+    """
+    lines = _text(stream)
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        if not reader.fieldnames or 'email' not in [name.strip().lower() for name in reader.fieldnames]:
+            raise RosterError('CSV roster needs a header row with an email column')
+        return _csv_records(reader)
+    return _ndjson_records(lines)
+
+
+def _csv_records(reader: csv.DictReader) -> Iterator[Record]:
+    for row in reader:
+        record = {
+            (key or '').strip().lower(): (value or '').strip()
+            for key, value in row.items() if key is not None
+        }
+        if any(record.values()):
+            yield reader.line_num, record, None
+
+
+def _ndjson_records(lines: Iterable[str]) -> Iterator[Record]:
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(record, dict):
+            yield number, None, 'Each line must be a JSON object'
+            continue
+        yield number, record, None
+
+
+class RosterImport:
+    """Batched, streaming import into the ``users`` table."""
+
+    def __init__(
+        self,
+        engine: Any,
+        table: Table,
+        method: str = passwords.DEFAULT_METHOD,
+        batch_size: int = 1000,
+        pool: Any = None,
+        chunksize: int = 8,
+    ) -> None:
+        self.engine = engine
+        self.table = table
+        self.method = method
+        self.batch_size = batch_size
+        self.pool = pool
+        self.chunksize = chunksize
+        self.seen_emails: set[str] = set()
+        self.seen_usernames: set[str] = set()
+        self.counts = {'created': 0, 'duplicate': 0, 'invalid': 0}
+
+    def summary(self) -> Dict[str, int]:
+        return {'total': sum(self.counts.values()), **self.counts}
+
+    def run(self, records: Iterable[Record]) -> Iterator[Dict[str, Any]]:
+        """Yield one result per record, batch by batch, in roster order."""
+        batch: List[Entry] = []
+        pending = 0
+        for line, record, error in records:
+            result = self._validate(line, record, error)
+            batch.append((line, record, result))
+            if result is None:
+                pending += 1
+            if pending >= self.batch_size or len(batch) >= 4 * self.batch_size:
+                yield from self._import(batch)
+                batch, pending = [], 0
+        if batch:
+            yield from self._import(batch)
+
+    # ------------------------------------------------------------------
+    # Steps
+    # ------------------------------------------------------------------
+    def _count(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        self.counts[result['status']] += 1
+        return result
+
+    def _validate(self, line: int, record: Optional[Dict[str, Any]], error: Optional[str]) -> Optional[Dict[str, Any]]:
+        if record is None:
+            return {'line': line, 'status': 'invalid', 'error': error}
+        # Same normalisation as /api/auth/register
+        email = str(record.get('email') or '').strip().lower()
+        username = str(record.get('username') or '').strip() or email
+        record['email'], record['username'] = email, username
+        if not email or '@' not in email:
+            return {'line': line, 'email': email or None, 'status': 'invalid', 'error': 'A valid email is required'}
+        if email in self.seen_emails:
+            return {'line': line, 'email': email, 'status': 'duplicate', 'error': 'Email repeated in roster'}
+        if username in self.seen_usernames:
+            return {'line': line, 'email': email, 'status': 'duplicate', 'error': 'Username repeated in roster'}
+        self.seen_emails.add(email)
+        self.seen_usernames.add(username)
+        return None
+
+    def _existing(self, connection: Any, batch: List[Tuple[int, Dict[str, Any]]]) -> Tuple[set, set]:
+        table = self.table
+        emails = [record['email'] for _, record in batch]
+        usernames = [record['username'] for _, record in batch]
+        rows = connection.execute(
+            select(table.c.email, table.c.username)
+            .where(or_(table.c.email.in_(emails), table.c.username.in_(usernames)))
+        ).all()
+        return {row.email for row in rows}, {row.username for row in rows}
+
+    def _import(self, batch: List[Entry]) -> Iterator[Dict[str, Any]]:
+        results = {line: result for line, _, result in batch if result is not None}
+        candidates = [(line, record) for line, record, result in batch if result is None]
+        fresh: List[Tuple[int, Dict[str, Any]]] = []
+        if candidates:
+            with self.engine.connect() as connection:
+                taken_emails, taken_usernames = self._existing(connection, candidates)
+            for line, record in candidates:
+                if record['email'] in taken_emails:
+                    results[line] = {'line': line, 'email': record['email'], 'status': 'duplicate',
+                                     'error': 'User with this email already exists'}
+                elif record['username'] in taken_usernames:
+                    results[line] = {'line': line, 'email': record['email'], 'status': 'duplicate',
+                                     'error': 'Username already taken'}
+                else:
+                    fresh.append((line, record))
+
+        if fresh:
+            temporary = {}
+            plain = []
+            for line, record in fresh:
+                password = str(record.get('password') or '')
+                if not password:
+                    password = temporary[line] = secrets.token_urlsafe(9)
+                plain.append(password)
+            hashes = passwords.hash_many(plain, self.method, self.pool, self.chunksize)
+            rows = [
+                {'username': record['username'], 'email': record['email'], 'password_hash': password_hash}
+                for (_, record), password_hash in zip(fresh, hashes)
+            ]
+            for (line, record), user_id in zip(fresh, self._insert(rows)):
+                if user_id is None:
+                    # Registered by someone else since the duplicate check.
+                    results[line] = {'line': line, 'email': record['email'], 'status': 'duplicate',
+                                     'error': 'User with this email already exists'}
+                    continue
+                results[line] = {'line': line, 'email': record['email'], 'status': 'created', 'id': user_id}
+                if line in temporary:
+                    results[line]['temporary_password'] = temporary[line]
+
+        for line, _, _ in batch:
+            yield self._count(results[line])
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> List[Optional[int]]:
+        """Insert ``rows`` in one transaction; return their ids in order.
+
+        If a concurrent registration makes the batch fail, the rows are
+        retried one transaction each and the conflicting ones get
+        ``None``.
+        """
+        table = self.table
+        statement = table.insert().returning(table.c.id, sort_by_parameter_order=True)
+        try:
+            with self.engine.begin() as connection:
+                return list(connection.execute(statement, rows).scalars())
+        except IntegrityError:
+            pass
+        ids: List[Optional[int]] = []
+        for row in rows:
+            try:
+                with self.engine.begin() as connection:
+                    ids.append(connection.execute(statement, [row]).scalar_one())
+            except IntegrityError:
+                ids.append(None)
+        return ids
+
+
+def ndjson_lines(results: Iterable[Dict[str, Any]], importer: RosterImport) -> Iterator[str]:
+    """Results as NDJSON lines, followed by a ``{"summary": ...}`` line."""
+    for result in results:
+        yield json.dumps(result, ensure_ascii=False) + '\n'
+    yield json.dumps({'summary': importer.summary()}) + '\n'
+
+
+class ImportSlots:
+    """A shared hashing pool plus a cap on concurrent imports."""
+
+    def __init__(self, workers: int = 0, concurrency: int = 1) -> None:
+        self.workers = workers
+        self.concurrency = concurrency
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._pool: Any = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Any) -> None:
+        self.workers = int(app.config.get('ROSTER_IMPORT_WORKERS', self.workers))
+        self.concurrency = max(1, int(app.config.get('ROSTER_IMPORT_CONCURRENCY', self.concurrency)))
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        app.extensions['roster_imports'] = self
+
+    def acquire(self) -> bool:
+        """Take a slot without waiting; ``False`` when all are in use."""
+        return self._slots.acquire(blocking=False)
+
+    def release(self) -> None:
+        self._slots.release()
+
+    def pool(self) -> Any:
+        """The shared process pool (started on first use), or ``None``."""
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._pool is None:
+                self._pool = passwords.process_pool(self.workers)
+                atexit.register(self.shutdown)
+            return self._pool
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+roster_imports = ImportSlots()
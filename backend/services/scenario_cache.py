@@ -0,0 +1,221 @@
+"""Two-tier cache for generated video scenarios.
+
+The master prompt only distinguishes three score bands, so students who
+are weak on the same topics with the same kind of mistakes receive
+practically the same script. Scenarios are therefore generated once per
+``(konu, score band, mistake signature, exam type)`` with placeholders
+for the student-specific fields (``{{ad}}``, ``{{yas}}``) and stored:
+
+1. in a bounded in-process LRU (fast path, per worker process), and
+2. in the ``scenario_cache`` table (shared by all processes and kept
+   across restarts).
+
+Placeholders are substituted when a scenario is read, so a cached
+template never contains a real student's name. Hit and miss counters
+are available from :meth:`ScenarioCache.stats`.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from flask import Flask
+from sqlalchemy.exc import IntegrityError
+
+from ..app import db
+from ..models.scenario import CachedScenario
+
+ScenarioGenerator = Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]
+
+# Student fields that vary per reader and must not be baked into a
+# cached template.
+PERSONAL_FIELDS = ('ad', 'yas')
+
+
+def score_band(score: Optional[float]) -> str:
+    """Map a score to the bands used by ``MASTER_PROMPT``."""
+    value = float(score or 0)
+    if value < 50:
+        return 'low'
+    if value < 75:
+        return 'mid'
+    return 'high'
+
+
+def _normalize(token: Any) -> str:
+    return '_'.join(str(token).casefold().split())
+
+
+def mistake_signature(mistakes: Iterable[Any], weak_topics: Iterable[Any] = ()) -> str:
+    """Order-independent signature of the mistake types and weak topics.
+
+    ``mistakes`` may contain dicts with a ``type`` key (as posted by the
+    quiz) or plain strings. Both lists come from the client and are
+    unbounded, so the signature is the SHA-256 hex digest of the sorted
+    tokens and always fits the 64-character column.
+    """
+    tokens = set()
+    for mistake in mistakes or ():
+        kind = mistake.get('type') if isinstance(mistake, dict) else mistake
+        if kind:
+            tokens.add(_normalize(kind))
+    for topic in weak_topics or ():
+        if topic:
+            tokens.add(_normalize(topic))
+    raw = json.dumps(sorted(tokens), ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def render(template: Any, values: Dict[str, Any]) -> Any:
+    """Return ``template`` with ``{{field}}`` placeholders filled in."""
+    if isinstance(template, str):
+        for field, value in values.items():
+            template = template.replace('{{' + field + '}}', str(value))
+        return template
+    if isinstance(template, list):
+        return [render(item, values) for item in template]
+    if isinstance(template, dict):
+        return {key: render(item, values) for key, item in template.items()}
+    return template
+
+
+class ScenarioCache:
+    """In-process LRU in front of the ``scenario_cache`` table."""
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def init_app(self, app: Flask) -> None:
+        self.max_entries = int(app.config.get('SCENARIO_CACHE_SIZE', self.max_entries))
+        app.extensions['scenario_cache'] = self
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+    @staticmethod
+    def key_parts(
+        student_data: Dict[str, Any], performance_data: Dict[str, Any]
+    ) -> Tuple[str, str, str, str]:
+        return (
+            _normalize(performance_data.get('konu_adi', '')),
+            score_band(performance_data.get('ortalama_skor')),
+            mistake_signature(
+                performance_data.get('hatalar', ()),
+                performance_data.get('zayif_konular', ()),
+            ),
+            _normalize(student_data.get('sinav_turu', '')),
+        )
+
+    @staticmethod
+    def cache_key(parts: Tuple[str, ...], version: str = '') -> str:
+        raw = json.dumps([version, *parts], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def get_or_generate(
+        self,
+        student_data: Dict[str, Any],
+        performance_data: Dict[str, Any],
+        generate: ScenarioGenerator,
+        version: str = '',
+        refresh: bool = False,
+    ) -> Dict[str, Any]:
+        """Return a personalised scenario, generating it only on a miss.
+
+        ``generate`` is called with placeholder values for the personal
+        fields. ``refresh`` bypasses both tiers and replaces the stored
+        template. Must be called inside an application context.
+        """
+        parts = self.key_parts(student_data, performance_data)
+        key = self.cache_key(parts, version)
+        template = None if refresh else self._lookup(key)
+        if template is None:
+            placeholders = dict(student_data)
+            placeholders.update({field: '{{' + field + '}}' for field in PERSONAL_FIELDS})
+            template = generate(placeholders, performance_data)
+            if template:
+                self._store(key, parts, template)
+        values = {field: student_data.get(field, '') for field in PERSONAL_FIELDS}
+        return render(template, values)
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            template = self._entries.get(key)
+            if template is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return template
+        row = CachedScenario.query.filter_by(cache_key=key).first()
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.db_hits += 1
+        self._remember(key, row.template)
+        return row.template
+
+    def _store(self, key: str, parts: Tuple[str, str, str, str], template: Dict[str, Any]) -> None:
+        template = copy.deepcopy(template)
+        konu, band, signature, exam_type = parts
+        row = CachedScenario.query.filter_by(cache_key=key).first()
+        if row is not None:
+            row.template = template
+        else:
+            db.session.add(CachedScenario(
+                cache_key=key,
+                # The key covers the full values; the descriptive columns
+                # only need to fit.
+                konu=konu[:200],
+                score_band=band,
+                mistake_signature=signature,
+                exam_type=exam_type[:50] or None,
+                template=template,
+            ))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker stored the same key first; keep theirs.
+            db.session.rollback()
+        self._remember(key, template)
+
+    def _remember(self, key: str, template: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = template
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop the in-process tier (the table is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'memory_hits': self.memory_hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Module level instance shared by the video routes and job handlers.
+scenario_cache = ScenarioCache()
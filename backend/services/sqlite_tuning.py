@@ -0,0 +1,258 @@
+"""SQLite pragmas and engine options for running on a single database file.
+
+In SQLite's default rollback-journal mode a writer holds an exclusive
+lock while it commits, so every analytics flush stalls all concurrent
+readers. With ``journal_mode=WAL`` readers keep reading the last
+committed snapshot while the writer appends to the write-ahead log, and
+``synchronous=NORMAL`` (safe in WAL mode) skips an fsync per commit.
+``busy_timeout`` makes a second writer wait instead of failing with
+"database is locked", and ``cache_size``/``mmap_size`` keep the hot
+pages in memory.
+
+:func:`apply_pragmas` installs a ``connect`` listener that issues the
+pragmas on every new DBAPI connection of an SQLite engine.
+:func:`engine_options` builds ``SQLALCHEMY_ENGINE_OPTIONS`` with pool
+settings, leaving them out for in-memory databases (which use a single
+static connection). :func:`benchmark` measures read latency while a
+writer commits in a loop, to compare journal modes.
+
+Only SQLAlchemy and the standard library are required, so the
+``app_*.py`` monoliths can use it.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRAGMAS: Dict[str, Any] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,          # milliseconds
+    'cache_size': -64000,          # negative = KiB, i.e. ~64 MB per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+_PRAGMA_KEYS = {
+    'SQLITE_JOURNAL_MODE': 'journal_mode',
+    'SQLITE_SYNCHRONOUS': 'synchronous',
+    'SQLITE_BUSY_TIMEOUT_MS': 'busy_timeout',
+    'SQLITE_CACHE_SIZE': 'cache_size',
+    'SQLITE_MMAP_SIZE': 'mmap_size',
+}
+
+
+def is_sqlite(url: Any) -> bool:
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def is_memory(url: Any) -> bool:
+    url = make_url(url)
+    database = url.database or ''
+    return is_sqlite(url) and (database in ('', ':memory:') or 'mode=memory' in str(url))
+
+
+def pragmas_from_config(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """``DEFAULT_PRAGMAS`` overridden by the ``SQLITE_*`` config keys.
+
+    A key set to an empty value drops that pragma.
+    """
+    pragmas = dict(DEFAULT_PRAGMAS)
+    for key, pragma in _PRAGMA_KEYS.items():
+        if key in config:
+            if config[key] in (None, ''):
+                pragmas.pop(pragma, None)
+            else:
+                pragmas[pragma] = config[key]
+    return pragmas
+
+
+def engine_options(
+    url: Any,
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    pool_timeout: float = 30,
+    pool_recycle: int = 1800,
+    pool_pre_ping: bool = True,
+) -> Dict[str, Any]:
+    """``SQLALCHEMY_ENGINE_OPTIONS`` for ``url``."""
+    if is_memory(url):
+        # Flask-SQLAlchemy uses a single StaticPool connection here.
+        return {}
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': pool_timeout,
+        'pool_recycle': pool_recycle,
+        'pool_pre_ping': pool_pre_ping,
+    }
+
+
+def apply_pragmas(engine: Engine, pragmas: Optional[Mapping[str, Any]] = None) -> None:
+    """Run ``pragmas`` on every new connection of ``engine`` (SQLite only)."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+    if is_memory(engine.url):
+        # In-memory databases have no journal to switch or file to map.
+        pragmas.pop('journal_mode', None)
+        pragmas.pop('mmap_size', None)
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                try:
+                    if name == 'journal_mode':
+                        # Persistent in the file; only switch when needed.
+                        cursor.execute('PRAGMA journal_mode')
+                        if str(cursor.fetchone()[0]).lower() == str(value).lower():
+                            continue
+                    cursor.execute(f'PRAGMA {name}={value}')
+                except Exception as e:
+                    # e.g. journal_mode on a read-only replica file
+                    logger.warning("PRAGMA %s=%s failed: %s", name, value, e)
+        finally:
+            cursor.close()
+
+
+def init_app(app: Any, db: Any) -> None:
+    """Apply the configured pragmas to every SQLite engine of ``db``."""
+    pragmas = pragmas_from_config(app.config)
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_pragmas(engine, pragmas)
+
+
+def current_pragmas(engine: Engine, names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """The effective values of ``names`` on a fresh connection."""
+    with engine.connect() as connection:
+        return {
+            name: connection.execute(text(f'PRAGMA {name}')).scalar()
+            for name in (names or list(DEFAULT_PRAGMAS))
+        }
+
+
+def benchmark(
+    pragmas: Mapping[str, Any],
+    seconds: float = 5.0,
+    readers: int = 4,
+    write_batch: int = 200,
+    rows: int = 20000,
+) -> Dict[str, Any]:
+    """Read latency on a scratch database while a writer commits in a loop.
+
+    The writer inserts ``write_batch`` rows per transaction for
+    ``seconds``. Each reader repeatedly runs an indexed per-user query
+    plus a count. Returns read latency percentiles in milliseconds,
+    reads and commits per second, and the number of failed reads.
+    """
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    engine = create_engine(f'sqlite:///{path}', pool_size=readers + 1, max_overflow=0)
+    apply_pragmas(engine, pragmas)
+    try:
+        with engine.begin() as connection:
+            connection.execute(text(
+                'CREATE TABLE events (id INTEGER PRIMARY KEY, user_id INTEGER, '
+                'value INTEGER, payload TEXT, created_at REAL)'
+            ))
+            connection.execute(text('CREATE INDEX ix_events_user_created ON events (user_id, created_at)'))
+            connection.execute(
+                text('INSERT INTO events (user_id, value, payload, created_at) VALUES (:u, :v, :p, :t)'),
+                [{'u': i % 500, 'v': i, 'p': 'x' * 200, 't': time.time()} for i in range(rows)],
+            )
+
+        stop = threading.Event()
+        latencies: List[float] = []
+        errors = [0]
+        commits = [0]
+        lock = threading.Lock()
+
+        def write() -> None:
+            i = 0
+            while not stop.is_set():
+                batch = [
+                    {'u': (i + n) % 500, 'v': n, 'p': 'y' * 200, 't': time.time()}
+                    for n in range(write_batch)
+                ]
+                i += write_batch
+                try:
+                    with engine.begin() as connection:
+                        connection.execute(
+                            text('INSERT INTO events (user_id, value, payload, created_at) '
+                                 'VALUES (:u, :v, :p, :t)'),
+                            batch,
+                        )
+                    commits[0] += 1
+                except Exception:
+                    errors[0] += 1
+
+        def read(seed: int) -> None:
+            user = seed
+            local: List[float] = []
+            failed = 0
+            while not stop.is_set():
+                user = (user * 31 + 7) % 500
+                started = time.perf_counter()
+                try:
+                    with engine.connect() as connection:
+                        connection.execute(text(
+                            'SELECT id, value FROM events WHERE user_id = :u '
+                            'ORDER BY created_at DESC LIMIT 20'
+                        ), {'u': user}).all()
+                        connection.execute(text(
+                            'SELECT count(*) FROM events WHERE user_id = :u'
+                        ), {'u': user}).scalar()
+                    local.append((time.perf_counter() - started) * 1000)
+                except Exception:
+                    failed += 1
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        threads = [threading.Thread(target=write)]
+        threads += [threading.Thread(target=read, args=(n,)) for n in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        latencies.sort()
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2)
+
+        return {
+            'journal_mode': current_pragmas(engine, ['journal_mode'])['journal_mode'],
+            'reads_per_second': round(len(latencies) / seconds),
+            'commits_per_second': round(commits[0] / seconds),
+            'read_p50_ms': percentile(0.50),
+            'read_p99_ms': percentile(0.99),
+            'read_max_ms': round(latencies[-1], 2) if latencies else 0.0,
+            'read_mean_ms': round(statistics.fmean(latencies), 2) if latencies else 0.0,
+            'errors': errors[0],
+        }
+    finally:
+        engine.dispose()
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            try:
+                os.remove(path + suffix)
+            except OSError:
+                pass
@@ -0,0 +1,79 @@
+"""Content-addressed local file storage for downloaded videos.
+
+Files are stored under their SHA-256 digest
+(``<root>/ab/cd/abcd....mp4``), so storing the same content twice is a
+no-op and a stored file never changes under a reader. Data is written
+chunk by chunk to a temporary file in the same directory tree while the
+digest is computed, then moved into place with an atomic rename; the
+whole file is never held in memory.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+from flask import Flask
+
+
+class ContentStore:
+    """Store byte streams on disk keyed by their SHA-256 digest."""
+
+    def __init__(self, root: Optional[Path] = None, suffix: str = '.mp4') -> None:
+        self.root = Path(root) if root else Path('storage')
+        self.suffix = suffix
+
+    def init_app(self, app: Flask) -> None:
+        self.root = Path(app.config.get('VIDEO_STORAGE_DIR', self.root))
+        app.extensions['video_store'] = self
+
+    def path_for(self, digest: str) -> Path:
+        """Return the on-disk location of ``digest`` (which may not exist)."""
+        if len(digest) != 64 or any(c not in '0123456789abcdef' for c in digest):
+            raise ValueError('Invalid content digest')
+        return self.root / digest[:2] / digest[2:4] / f'{digest}{self.suffix}'
+
+    def exists(self, digest: str) -> bool:
+        return self.path_for(digest).is_file()
+
+    def delete(self, digest: str) -> bool:
+        """Remove the file for ``digest``; ``False`` if it was not stored."""
+        try:
+            self.path_for(digest).unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def save(self, chunks: Iterable[bytes]) -> Tuple[str, int]:
+        """Write ``chunks`` to storage and return ``(digest, size)``."""
+        tmp_dir = self.root / 'tmp'
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=tmp_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    digest.update(chunk)
+                    handle.write(chunk)
+                    size += len(chunk)
+                handle.flush()
+                os.fsync(handle.fileno())
+            key = digest.hexdigest()
+            target = self.path_for(key)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_name, target)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        return key, size
+
+
+# Module level instance bound to the configured directory in create_app.
+video_store = ContentStore()
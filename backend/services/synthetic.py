@@ -0,0 +1,151 @@
+"""Deterministic synthetic data for load tests and query benchmarks.
+
+A :class:`Population` draws one activity weight per user from a Pareto
+distribution, so a few students produce most of the rows (as in real
+traffic) while the long tail has only a handful each. Row totals are
+split between users with the largest-remainder method instead of one
+random draw per row, so every user's rows can be generated together and
+given a contiguous id range. Related rows can point into that range
+(e.g. analytics for the user's own videos) with ``O(users)`` memory.
+
+Every table gets its own random stream derived from the seed and the
+table name. The same seed, totals and end date always produce the same
+rows, and changing the size of one table does not change the others.
+
+:func:`bulk_insert` writes rows with ``executemany`` in batches of
+``batch_size``, one transaction per batch, which keeps memory flat for
+tens of millions of rows.
+
+Only the standard library and SQLAlchemy are required, so the
+``app_*.py`` monoliths can use it.
+"""
+
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from sqlalchemy import Table
+
+Row = Dict[str, Any]
+RowFactory = Callable[[random.Random, int, datetime], Row]
+
+DEFAULT_ALPHA = 1.2
+
+
+class Population:
+    """Users with power-law activity and deterministic timestamps."""
+
+    def __init__(
+        self,
+        seed: int,
+        users: int,
+        first_user_id: int = 1,
+        days: int = 180,
+        end: datetime | None = None,
+        alpha: float = DEFAULT_ALPHA,
+    ) -> None:
+        self.seed = seed
+        self.first_user_id = first_user_id
+        self.days = days
+        self.end = end or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        rng = self.rng('users')
+        self.weights = [rng.paretovariate(alpha) for _ in range(users)]
+        window = days * 86400
+        # Heavier users tend to have joined earlier.
+        self.joined = [
+            self.end - timedelta(seconds=window * (1 - (1 - rng.random()) ** weight))
+            for weight in self.weights
+        ]
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    @property
+    def user_ids(self) -> range:
+        return range(self.first_user_id, self.first_user_id + len(self.weights))
+
+    def rng(self, name: str) -> random.Random:
+        return random.Random(f'{self.seed}:{name}')
+
+    def counts(self, total: int) -> List[int]:
+        """Split ``total`` rows between users in proportion to their weight."""
+        if not self.weights or total <= 0:
+            return [0] * len(self.weights)
+        scale = total / sum(self.weights)
+        shares = [weight * scale for weight in self.weights]
+        counts = [int(share) for share in shares]
+        remainder = total - sum(counts)
+        by_fraction = sorted(range(len(shares)), key=lambda i: (counts[i] - shares[i], i))
+        for index in by_fraction[:remainder]:
+            counts[index] += 1
+        return counts
+
+    def moment(self, rng: random.Random, index: int) -> datetime:
+        """A random time between user ``index`` joining and the end date."""
+        joined = self.joined[index]
+        return joined + timedelta(seconds=rng.random() * (self.end - joined).total_seconds())
+
+    def rows(self, name: str, total: int, factory: RowFactory, first_id: int = 1) -> Tuple[Iterator[Row], List[Tuple[int, int]]]:
+        """Rows for table ``name`` and each user's ``(first_id, count)``.
+
+        ``factory(rng, user_id, created_at)`` builds one row; ``id`` and
+        ``user_id`` are filled in here. The id ranges are known before
+        any row is produced, so dependent tables can be generated from
+        them.
+        """
+        counts = self.counts(total)
+        ranges = []
+        next_id = first_id
+        for count in counts:
+            ranges.append((next_id, count))
+            next_id += count
+
+        def generate() -> Iterator[Row]:
+            rng = self.rng(name)
+            row_id = first_id
+            for index, (user_id, count) in enumerate(zip(self.user_ids, counts)):
+                for _ in range(count):
+                    row = factory(rng, user_id, self.moment(rng, index))
+                    row['id'] = row_id
+                    row['user_id'] = user_id
+                    row_id += 1
+                    yield row
+
+        return generate(), ranges
+
+
+def split(total: int, mix: Dict[str, float]) -> Dict[str, int]:
+    """Split ``total`` rows between tables according to ``mix`` weights."""
+    scale = sum(mix.values())
+    counts = {name: int(total * weight / scale) for name, weight in mix.items()}
+    first = next(iter(mix), None)
+    if first is not None:
+        counts[first] += total - sum(counts.values())
+    return counts
+
+
+def batched(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_insert(engine: Any, table: Table, rows: Iterable[Row], batch_size: int = 5000) -> int:
+    """Insert ``rows`` with one ``executemany`` per batch; return the count.
+
+    Each batch is committed on its own so memory stays flat and an
+    interrupted load keeps the batches already written.
+    """
+    inserted = 0
+    statement = table.insert()
+    for batch in batched(rows, batch_size):
+        with engine.begin() as connection:
+            connection.execute(statement, batch)
+        inserted += len(batch)
+    return inserted
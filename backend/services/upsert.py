@@ -0,0 +1,66 @@
+"""Atomic counter upserts for rollup tables.
+
+Rollup rows (per-user and per-video totals) are updated on hot write
+paths, so the increment has to happen in SQL rather than as a Python
+read-modify-write. :func:`increment` issues a single
+``INSERT ... ON CONFLICT DO UPDATE SET col = col + excluded.col`` on
+SQLite and PostgreSQL and falls back to ``UPDATE`` followed by
+``INSERT`` elsewhere.
+
+This module only depends on SQLAlchemy so it can be used both by the
+blueprint package and by the standalone ``app_*.py`` monoliths.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional
+
+from sqlalchemy import Table, and_, update
+
+
+def _dialect_name(executor: Any) -> str:
+    dialect = getattr(executor, 'dialect', None)
+    if dialect is None:
+        dialect = executor.get_bind().dialect
+    return dialect.name
+
+
+def increment(
+    executor: Any,
+    table: Table,
+    keys: Mapping[str, Any],
+    deltas: Mapping[str, Any],
+    assign: Optional[Mapping[str, Any]] = None,
+) -> None:
+    """Add ``deltas`` to the row identified by ``keys``, creating it.
+
+    ``executor`` is a Session or Connection; the statement joins the
+    caller's transaction and is not committed here. ``assign`` holds
+    columns that are overwritten rather than added to (e.g. a
+    timestamp). The table must have a unique constraint on ``keys``.
+    """
+    assign = dict(assign or {})
+    if 'updated_at' in table.c and 'updated_at' not in assign:
+        assign['updated_at'] = datetime.utcnow()
+    name = _dialect_name(executor)
+
+    if name in ('sqlite', 'postgresql'):
+        if name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(**keys, **deltas, **assign)
+        set_: Dict[str, Any] = {
+            column: table.c[column] + stmt.excluded[column] for column in deltas
+        }
+        set_.update({column: stmt.excluded[column] for column in assign})
+        executor.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=set_))
+        return
+
+    where = and_(*(table.c[column] == value for column, value in keys.items()))
+    values: Dict[str, Any] = {column: table.c[column] + value for column, value in deltas.items()}
+    values.update(assign)
+    result = executor.execute(update(table).where(where).values(**values))
+    if result.rowcount == 0:
+        executor.execute(table.insert().values(**keys, **deltas, **assign))
@@ -0,0 +1,184 @@
+"""Bounded in-process write-behind buffer.
+
+High-frequency, low-value writes such as player heartbeats should not
+cost a transaction (and an fsync) each. Producers append items to a
+:class:`WriteBuffer`; a background thread hands them to a flush
+callback in batches, either when ``max_batch`` items are pending or
+``max_delay`` seconds after the first pending item, whichever comes
+first. The remaining items are flushed when the process exits.
+
+The buffer is bounded: once ``capacity`` items are pending, the
+producer that crosses the limit flushes synchronously, which applies
+backpressure instead of growing without limit. If a flush fails, the
+items are flushed again one at a time so that a single bad item cannot
+hold the rest back; the items that still fail are set aside in
+:attr:`WriteBuffer.rejected` (the last ``capacity`` are kept) and
+counted as ``rejected_items``. Only when every item fails, as during a
+database outage, is the batch put back (up to ``capacity``) and retried
+on the next cycle.
+
+Only the standard library is used so that the standalone ``app_*.py``
+monoliths can share it with the blueprint package.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+FlushCallback = Callable[[List[Any]], None]
+
+
+class WriteBuffer:
+    """Collect items in memory and flush them in bulk."""
+
+    def __init__(
+        self,
+        flush: FlushCallback,
+        max_batch: int = 500,
+        max_delay: float = 1.0,
+        capacity: int = 10000,
+        name: str = 'write-buffer',
+    ) -> None:
+        self._flush_callback = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.capacity = capacity
+        self.name = name
+        self._items: List[Any] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self.flushed_batches = 0
+        self.flushed_items = 0
+        self.failed_flushes = 0
+        self.dropped_items = 0
+        self.rejected_items = 0
+        self.rejected: deque = deque(maxlen=capacity)
+        self.last_flush_ms = 0.0
+
+    def add(self, item: Any) -> None:
+        self.extend((item,))
+
+    def extend(self, items: Iterable[Any]) -> None:
+        """Queue ``items`` for the next flush."""
+        items = list(items)
+        if not items:
+            return
+        self._ensure_started()
+        with self._cond:
+            self._items.extend(items)
+            pending = len(self._items)
+            # Wake the flusher when a batch starts (to arm the delay
+            # timer) and again once it is full.
+            if pending == len(items) or pending >= self.max_batch:
+                self._cond.notify()
+        if pending >= self.capacity or self._closed:
+            self.flush()
+
+    def flush(self) -> int:
+        """Flush everything pending on the calling thread."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._items = self._items, []
+            if not batch:
+                return 0
+            started = time.perf_counter()
+            try:
+                self._flush_callback(batch)
+            except Exception:
+                self.failed_flushes += 1
+                logger.exception("%s: flush of %d item(s) failed", self.name, len(batch))
+                return self._flush_one_by_one(batch)
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            self.flushed_batches += 1
+            self.flushed_items += len(batch)
+            return len(batch)
+
+    def close(self) -> None:
+        """Stop the background thread and flush what is left."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(self.max_delay + 5)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._items)
+        return {
+            'pending': pending,
+            'capacity': self.capacity,
+            'flushed_batches': self.flushed_batches,
+            'flushed_items': self.flushed_items,
+            'failed_flushes': self.failed_flushes,
+            'dropped_items': self.dropped_items,
+            'rejected_items': self.rejected_items,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+        }
+
+    def _flush_one_by_one(self, batch: List[Any]) -> int:
+        """Retry a failed batch item by item; return how many were written."""
+        failed = []
+        for item in batch:
+            try:
+                self._flush_callback([item])
+            except Exception:
+                failed.append(item)
+        flushed = len(batch) - len(failed)
+        if flushed == 0:
+            # Nothing goes through: the store is down, not the items bad.
+            self._requeue(batch)
+            return 0
+        self.flushed_items += flushed
+        if failed:
+            self.rejected_items += len(failed)
+            self.rejected.extend(failed)
+            logger.error("%s: set aside %d item(s) that fail on their own", self.name, len(failed))
+        return flushed
+
+    def _requeue(self, batch: List[Any]) -> None:
+        with self._cond:
+            merged = batch + self._items
+            overflow = len(merged) - self.capacity
+            if overflow > 0:
+                # Drop the oldest items rather than grow without bound.
+                self.dropped_items += overflow
+                logger.error("%s: dropping %d item(s) after failed flush", self.name, overflow)
+                merged = merged[overflow:]
+            self._items = merged
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None or self._closed:
+            return
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._items and not self._closed:
+                    self._cond.wait()
+                # Give the batch up to ``max_delay`` to fill up.
+                deadline = time.monotonic() + self.max_delay
+                while len(self._items) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
@@ -79,13 +79,17 @@ const AdaptiveVideoPlayer = ({ videoId, onComplete }) => {
   const sendAnalytics = async (completed) => {
     if (!videoRef.current) return;
 
+    // Sadece son gönderimden bu yana olan duraklatmalar gönderilir
+    const sentPauses = pauseTimestamps;
+
     try {
       await api.post(`/video/${videoId}/analytics`, {
         watch_duration: Math.floor(videoRef.current.currentTime),
         watch_percentage: Math.floor(progress),
-        pause_timestamps: pauseTimestamps,
+        pause_timestamps: sentPauses,
         completed: completed
       });
+      setPauseTimestamps(prev => prev.slice(sentPauses.length));
     } catch (error) {
       console.error('Analytics gönderme hatası:', error);
     }